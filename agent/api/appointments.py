@@ -1,6 +1,6 @@
 import os
 from typing import Any, Dict
-import httpx
+from api.http import get_http_client
 
 
 AGENT_API = os.getenv("AGENT_API")
@@ -8,16 +8,20 @@ AGENT_API = os.getenv("AGENT_API")
 
 async def _appointment_post(path: str, payload: Dict[str, Any]) -> Any:
     """Helper para hacer POST a endpoints de appointment"""
-    async with httpx.AsyncClient() as client:
-        response = await client.post(f"{AGENT_API}/{path}", json=payload)
-        response.raise_for_status()
-        return response.json()
+    client = get_http_client()
+    response = await client.post(f"{AGENT_API}/{path}", json=payload)
+    response.raise_for_status()
+    return response.json()
 
 
 async def appointment_list(payload: Dict[str, Any]) -> Any:
     return await _appointment_post("api/v1/appointment/list", payload)
 
 
+async def appointment_availability(payload: Dict[str, Any]) -> Any:
+    return await _appointment_post("api/v1/appointment/availability", payload)
+
+
 async def appointment_create(payload: Dict[str, Any]) -> Any:
     return await _appointment_post("api/v1/appointment/create", payload)
 
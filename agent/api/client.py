@@ -1,33 +1,37 @@
 import os
 from typing import Any, Dict, Optional
 
-import httpx
+from api.http import get_http_client
 
 AGENT_API = os.getenv("AGENT_API")
 
 
-async def _client_post(path: str, payload: Dict[str, Any]) -> Any:
+async def _client_post(
+    path: str,
+    payload: Optional[Dict[str, Any]] = None,
+    params: Optional[Dict[str, Any]] = None
+) -> Any:
     """Helper para hacer POST a endpoints de clients"""
-    async with httpx.AsyncClient() as client:
-        response = await client.post(f"{AGENT_API}/{path}", json=payload)
-        response.raise_for_status()
-        return response.json()
+    client = get_http_client()
+    response = await client.post(f"{AGENT_API}/{path}", json=payload, params=params)
+    response.raise_for_status()
+    return response.json()
 
 
 async def _client_get(path: str, params: Optional[Dict[str, Any]] = None) -> Any:
     """Helper para hacer GET a endpoints de clients"""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{AGENT_API}/{path}", params=params)
-        response.raise_for_status()
-        return response.json()
+    client = get_http_client()
+    response = await client.get(f"{AGENT_API}/{path}", params=params)
+    response.raise_for_status()
+    return response.json()
 
 
 async def _client_delete(path: str) -> Any:
     """Helper para hacer DELETE a endpoints de clients"""
-    async with httpx.AsyncClient() as client:
-        response = await client.delete(f"{AGENT_API}/{path}")
-        response.raise_for_status()
-        return response.json()
+    client = get_http_client()
+    response = await client.delete(f"{AGENT_API}/{path}")
+    response.raise_for_status()
+    return response.json()
 
 
 async def create_client(name: str, phone: str) -> Dict[str, Any]:
@@ -39,13 +43,16 @@ async def create_client(name: str, phone: str) -> Dict[str, Any]:
     return await _client_post("api/v1/client/create", payload)
 
 
-async def list_clients(limit: int = 100, offset: int = 0) -> Dict[str, Any]:
-    """Lista todos los clientes con paginación."""
-    payload = {
+async def list_clients(limit: int = 100, offset: int = 0, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """Lista todos los clientes con paginación. `cursor` es el `next_cursor` de la página anterior."""
+    # El endpoint los lee como query params, no del cuerpo
+    params = {
         "limit": limit,
         "offset": offset
     }
-    return await _client_post("api/v1/client/list", payload)
+    if cursor:
+        params["cursor"] = cursor
+    return await _client_post("api/v1/client/list", params=params)
 
 
 async def get_client(client_id: str) -> Dict[str, Any]:
@@ -73,7 +80,10 @@ async def delete_client(client_id: str) -> Dict[str, Any]:
     return await _client_delete(f"api/v1/client/delete?id={client_id}")
 
 
-async def search_clients(search_term: str) -> Dict[str, Any]:
+async def search_clients(search_term: str, cursor: Optional[str] = None) -> Dict[str, Any]:
     """Busca clientes por nombre o teléfono."""
-    return await _client_get(f"api/v1/client/search", {"search_term": search_term})
+    params = {"search_term": search_term}
+    if cursor:
+        params["cursor"] = cursor
+    return await _client_get(f"api/v1/client/search", params)
     
@@ -1,6 +1,6 @@
 import os
 from typing import Any, Dict, Optional
-import httpx
+from api.http import get_http_client
 
 
 AGENT_API = os.getenv("AGENT_API")
@@ -11,47 +11,48 @@ async def _calendar_get(
         params: Optional[Dict[str, Any]] = None
         ) -> Any:
     """Helper para hacer GET a endpoints de Google Calendar"""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{AGENT_API}/{path}", params=params)
-        response.raise_for_status()
-        return response.json()
+    client = get_http_client()
+    response = await client.get(f"{AGENT_API}/{path}", params=params)
+    response.raise_for_status()
+    return response.json()
 
 
 async def _calendar_post(path: str, payload: Dict[str, Any]) -> Any:
     """Helper para hacer POST a endpoints de Google Calendar"""
-    async with httpx.AsyncClient() as client:
-        response = await client.post(f"{AGENT_API}/{path}", json=payload)
-        response.raise_for_status()
-        return response.json()
+    client = get_http_client()
+    response = await client.post(f"{AGENT_API}/{path}", json=payload)
+    response.raise_for_status()
+    return response.json()
 
 
 async def _calendar_put(path: str, payload: Dict[str, Any]) -> Any:
     """Helper para hacer PUT a endpoints de Google Calendar"""
-    async with httpx.AsyncClient() as client:
-        response = await client.put(f"{AGENT_API}/{path}", json=payload)
-        response.raise_for_status()
-        return response.json()
+    client = get_http_client()
+    response = await client.put(f"{AGENT_API}/{path}", json=payload)
+    response.raise_for_status()
+    return response.json()
 
 
 async def _calendar_delete(path: str) -> Any:
     """Helper para hacer DELETE a endpoints de Google Calendar"""
-    async with httpx.AsyncClient() as client:
-        response = await client.delete(f"{AGENT_API}/{path}")
-        response.raise_for_status()
-        return response.json()
+    client = get_http_client()
+    response = await client.delete(f"{AGENT_API}/{path}")
+    response.raise_for_status()
+    return response.json()
 
 
 async def calendar_list(
         time_min: str,
         time_max: str,
-        max_results: int = 25
+        max_results: Optional[int] = None
     ) -> Any:
     """Lista eventos del calendario en un rango de tiempo"""
     params = {
         "time_min": time_min,
         "time_max": time_max,
-        "max_results": max_results
     }
+    if max_results:
+        params["max_results"] = max_results
     return await _calendar_get(
         "api/v1/google-calendar/list",
         params=params
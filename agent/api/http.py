@@ -0,0 +1,71 @@
+from typing import Optional
+
+import httpx
+
+from config import (
+    HTTP2_ENABLED,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE,
+    HTTP_TIMEOUT,
+)
+from utils.tracing import trace_headers
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    """HTTP/2 solo se activa si el paquete opcional `h2` está instalado."""
+    if not HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+async def _propagate_trace(request: httpx.Request) -> None:
+    """Agrega la traza actual a cada request hacia el orquestador."""
+    request.headers.update(trace_headers())
+
+
+def _build_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        event_hooks={"request": [_propagate_trace]},
+        http2=_http2_available(),
+        timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Devuelve el cliente HTTP compartido por todos los helpers de `api`.
+
+    Reutiliza las conexiones (keep-alive) entre llamadas para no pagar un
+    handshake TCP/TLS por cada tool call. Si el cliente no fue iniciado por
+    el lifespan de la app, se crea al primer uso.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def start_http_client() -> None:
+    """Crea el cliente compartido al iniciar la aplicación."""
+    get_http_client()
+
+
+async def close_http_client() -> None:
+    """Cierra el cliente compartido y libera el pool de conexiones."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
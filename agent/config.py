@@ -18,6 +18,30 @@ load_dotenv()
 
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2:3b")
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+# Varios hosts separados por coma para repartir las llamadas
+OLLAMA_HOSTS = [
+    host.strip()
+    for host in os.getenv("OLLAMA_HOSTS", OLLAMA_HOST).split(",")
+    if host.strip()
+]
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "8"))
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "120"))
+OLLAMA_HEALTH_INTERVAL = int(os.getenv("OLLAMA_HEALTH_INTERVAL", "15"))
+# Mantiene el modelo cargado entre turnos y fija el tamaño de contexto para
+# que Ollama no recargue el modelo ni descarte su KV cache
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", "4096"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "3000"))
+HISTORY_KEEP_RECENT = int(os.getenv("HISTORY_KEEP_RECENT", "6"))
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "1800"))
+SESSION_MAX = int(os.getenv("SESSION_MAX", "500"))
+SESSION_SWEEP_INTERVAL = int(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_SQLITE_PATH = os.getenv("SESSION_SQLITE_PATH", "sessions.db")
+SESSION_LOCK_TIMEOUT = float(os.getenv("SESSION_LOCK_TIMEOUT", "30"))
+# Duración del lease de SQLite; se renueva mientras dura el turno, así que
+# solo define cuánto tarda en liberarse el de un worker que se cayó
+SESSION_LEASE_TTL = float(os.getenv("SESSION_LEASE_TTL", "15"))
 TIMEZONE = pytz.timezone(os.getenv("GOOGLE_CALENDAR_TIMEZONE", "UTC"))
 
 
@@ -28,3 +52,17 @@ BUSINESS_CONTEXT = load_text_file(
     os.path.join(_config_dir, "bussines_context.txt"),
     "Información del negocio no disponible.",
 )
+
+# Cliente HTTP compartido hacia el orquestador
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+
+# Exportación de trazas: JSON lines (un span OTLP por línea) y/o collector OTLP/HTTP
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "agent")
+TRACE_FILE = os.getenv("TRACE_FILE")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT")
+TRACE_FLUSH_INTERVAL = float(os.getenv("TRACE_FLUSH_INTERVAL", "5"))
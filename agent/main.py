@@ -1,12 +1,79 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException
+from api.http import close_http_client, start_http_client
 from routes.session_route import router
+from services.llm_client import ollama_pool
+from services.session_store import session_store
+from utils import metrics
+from utils.tracing import (
+    add_span_listener,
+    recent_spans,
+    span_exporter,
+    trace_id_for_call,
+    tracing_middleware,
+)
+
+SESSIONS_ACTIVE = metrics.Gauge("sessions_active", "Sesiones abiertas en el session store.")
+OLLAMA_HOST_IN_FLIGHT = metrics.Gauge(
+    "ollama_host_in_flight", "Generaciones en curso por host de Ollama.", labels=("host",)
+)
+OLLAMA_HOST_HEALTHY = metrics.Gauge(
+    "ollama_host_healthy", "1 si el host de Ollama responde, 0 si no.", labels=("host",)
+)
+
+add_span_listener(metrics.observe_span)
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await span_exporter.start()
+    await start_http_client()
+    await session_store.start_sweeper()
+    await ollama_pool.start_health_checks()
+    yield
+    await ollama_pool.stop_health_checks()
+    await session_store.stop_sweeper()
+    await close_http_client()
+    await span_exporter.stop()
 
-app = FastAPI(title="Agent Service")
+
+app = FastAPI(title="Agent Service", lifespan=lifespan)
+app.middleware("http")(tracing_middleware)
+app.add_middleware(metrics.MetricsMiddleware)
 app.include_router(router)
 
 
+@app.get("/health")
+async def health_endpoint():
+    """Estado de los hosts de Ollama"""
+    return {"ollama": ollama_pool.stats()}
+
+
+@app.get("/traces")
+async def traces_endpoint(trace_id: str = None, call_sid: str = None):
+    """Spans recientes de una traza, por trace id o por call_sid"""
+    if call_sid:
+        trace_id = trace_id_for_call(call_sid)
+    if not trace_id:
+        raise HTTPException(status_code=400, detail="Falta trace_id o call_sid")
+    return {
+        "trace_id": trace_id,
+        "spans": recent_spans(trace_id),
+        "exporter": span_exporter.stats(),
+    }
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Métricas en formato Prometheus"""
+    SESSIONS_ACTIVE.set(await session_store.count())
+    for host in ollama_pool.stats():
+        OLLAMA_HOST_IN_FLIGHT.set(host["in_flight"], host["host"])
+        OLLAMA_HOST_HEALTHY.set(int(host["healthy"]), host["host"])
+    return metrics.render()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -1,28 +1,42 @@
 # agent/api/routes.py
+from contextlib import asynccontextmanager
+
 from fastapi import APIRouter, HTTPException
-from services.session import Session
+from fastapi.responses import StreamingResponse
+from services.session_store import SessionLockTimeout, session_store
 from utils.date_utils import get_now_formatted
 import json
 
-sessions: dict[str, Session] = {}
 router = APIRouter(
     prefix="/session",
     tags=["Session"]
 )
 
 
+@asynccontextmanager
+async def _turn(call_sid: str):
+    """Serializa los turnos de una misma llamada entre requests y workers."""
+    try:
+        async with session_store.lock(call_sid):
+            yield
+    except SessionLockTimeout:
+        raise HTTPException(
+            status_code=409,
+            detail="La sesión está procesando otro mensaje."
+        )
+
+
 @router.post("/start")
 async def start_endpoint(call_sid: str):
     """Crea una nueva sesion y devuelve el mensaje de bienvenida"""
-    if call_sid not in sessions:
-        sessions[call_sid] = Session()
-    
-    session = sessions[call_sid]
-    now = get_now_formatted()
-    session.add_context(
-         f"Se inicio una llamada, saluda al cliente. Hoy es {now}."
-    )
-    response = session.generate()
+    async with _turn(call_sid):
+        session = await session_store.get_or_create(call_sid)
+        now = get_now_formatted()
+        session.add_context(
+             f"Se inicio una llamada, saluda al cliente. Hoy es {now}."
+        )
+        response = await session.generate()
+        await session_store.save(call_sid, session)
 
     return {"response": response}
 
@@ -30,33 +44,86 @@ async def start_endpoint(call_sid: str):
 @router.post("/context")
 async def context_endpoint(call_sid: str, context: str):
     """Inyecta contexto en el chat y devuelve un mensaje"""
-    if call_sid not in sessions:
-            raise HTTPException(
-                 status_code=404,
-                 detail="No se pudo finalizar: la sesión no existe."
-            )
-    
-    session = sessions[call_sid]
-    session.add_context(context)
-    response = session.generate()
+    async with _turn(call_sid):
+        session = await session_store.get(call_sid)
+        if session is None:
+                raise HTTPException(
+                     status_code=404,
+                     detail="No se pudo finalizar: la sesión no existe."
+                )
+
+        session.add_context(context)
+        response = await session.generate()
+        await session_store.save(call_sid, session)
 
     print(response)
 
     return {"response": response}
 
 
+def _sse(data: dict, event: str = None) -> str:
+    """Formatea un evento Server-Sent Events."""
+    line = f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+    return f"event: {event}\n{line}" if event else line
+
+
+async def _stream_response(call_sid: str, message: str):
+    """Emite cada oración apenas está lista y al final la respuesta completa."""
+    # Los headers ya se enviaron: los errores van como evento, no como status
+    try:
+        async with session_store.lock(call_sid):
+            session = await session_store.get(call_sid)
+            if session is None:
+                yield _sse({"detail": "La sesión no existe."}, event="error")
+                return
+
+            session.add_message("user", message)
+            async for sentence in session.stream_sentences():
+                yield _sse({"sentence": sentence})
+            await session_store.save(call_sid, session)
+    except SessionLockTimeout:
+        yield _sse({"detail": "La sesión está procesando otro mensaje."}, event="error")
+        return
+
+    yield _sse(
+        {
+            "response": session.messages[-1]["content"],
+            "time_to_first_sentence": session.last_time_to_first_sentence,
+        },
+        event="done",
+    )
+
+
 @router.post("/send")
-async def send_endpoint(call_sid: str, message: str):
-    """Envia un mensaje como usuario"""
-    if call_sid not in sessions:
+async def send_endpoint(call_sid: str, message: str, stream: bool = False):
+    """
+    Envia un mensaje como usuario.
+
+    Con `stream=true` la respuesta se devuelve como SSE, una oración por
+    evento, para que la capa de voz pueda hablar sin esperar al final.
+    """
+    if stream:
+        if await session_store.get(call_sid) is None:
             raise HTTPException(
                 status_code=404,
                 detail="No se pudo finalizar: la sesión no existe."
             )
-    
-    session = sessions[call_sid]
-    session.add_message("user", message)
-    response = session.generate()
+        return StreamingResponse(
+            _stream_response(call_sid, message),
+            media_type="text/event-stream"
+        )
+
+    async with _turn(call_sid):
+        session = await session_store.get(call_sid)
+        if session is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail="No se pudo finalizar: la sesión no existe."
+                )
+
+        session.add_message("user", message)
+        response = await session.generate()
+        await session_store.save(call_sid, session)
 
     return {"response": response}
 
@@ -64,4 +131,24 @@ async def send_endpoint(call_sid: str, message: str):
 @router.delete("/end")
 async def end_endpoint(call_sid: str):
     """Termina y elimina la sesion"""
-    sessions.pop(call_sid, None)
+    # Con el lock: un turno en curso guardaría la sesión después de borrarla
+    async with _turn(call_sid):
+        await session_store.end(call_sid)
+
+
+@router.get("/stats")
+async def stats_endpoint():
+    """Devuelve métricas de sesiones activas y descartadas"""
+    return await session_store.stats()
+
+
+@router.get("/turns")
+async def turns_endpoint(call_sid: str):
+    """Devuelve las métricas de Ollama por turno de una sesión"""
+    session = await session_store.get(call_sid)
+    if session is None:
+        raise HTTPException(
+            status_code=404,
+            detail="La sesión no existe."
+        )
+    return session.get_stats()
@@ -0,0 +1,168 @@
+from config import HISTORY_KEEP_RECENT, HISTORY_TOKEN_BUDGET
+
+# Caracteres por token aproximados para texto en español
+CHARS_PER_TOKEN = 4
+# Largo máximo de cada línea del resumen
+SUMMARY_LINE_CHARS = 200
+# Al compactar se baja hasta esta fracción del presupuesto, para no
+# compactar de nuevo en cada turno
+LOW_WATERMARK = 0.75
+
+# Prefijo de los contextos inyectados cuando se envían al modelo
+CONTEXT_TAG = "[Contexto del sistema]"
+
+_SUMMARY_LABELS = {
+    "user": "Cliente",
+    "assistant": "Asistente",
+    "system": "Contexto",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación rápida de tokens sin depender del tokenizer del modelo."""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+class ConversationHistory:
+    """
+    Historial de mensajes con tamaño acotado.
+
+    El prompt de sistema queda siempre fijo al principio. Cuando el total
+    estimado de tokens supera el presupuesto, los turnos más viejos y los
+    contextos ya desactualizados se condensan en un único mensaje de resumen
+    que va justo después del prompt de sistema.
+    """
+
+    def __init__(
+        self,
+        system_prompt: str,
+        token_budget: int = HISTORY_TOKEN_BUDGET,
+        keep_recent: int = HISTORY_KEEP_RECENT,
+    ):
+        self.system_prompt = {"role": "system", "content": system_prompt}
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.turns: list[dict] = []
+        self.turn_tokens: list[int] = []
+        self.summary_lines: list[str] = []
+        self.compactions = 0
+
+    def to_dict(self) -> dict:
+        """Estado serializable del historial (sin el prompt de sistema fijo)."""
+        return {
+            "turns": self.turns,
+            "summary_lines": self.summary_lines,
+            "compactions": self.compactions,
+        }
+
+    @classmethod
+    def from_dict(cls, system_prompt: str, data: dict) -> "ConversationHistory":
+        history = cls(system_prompt)
+        history.turns = data.get("turns", [])
+        history.turn_tokens = [estimate_tokens(m["content"]) for m in history.turns]
+        history.summary_lines = data.get("summary_lines", [])
+        history.compactions = data.get("compactions", 0)
+        return history
+
+    @property
+    def messages(self) -> list[dict]:
+        """Mensajes listos para enviar al modelo."""
+        messages = [self.system_prompt]
+        if self.summary_lines:
+            messages.append({"role": "system", "content": self.summary})
+        messages.extend(self.turns)
+        return messages
+
+    def prompt(self) -> list[dict]:
+        """
+        Mensajes en el formato que se envía al modelo.
+
+        El prompt de sistema es el único mensaje con rol `system`, así el
+        prefijo del prompt es idéntico byte a byte durante toda la llamada y
+        Ollama puede reutilizar su KV cache. El resumen y los contextos
+        inyectados se envían en su posición como mensajes marcados con
+        `CONTEXT_TAG`, sin tocar lo que ya se envió antes.
+        """
+        messages = [self.system_prompt]
+        if self.summary_lines:
+            messages.append({"role": "user", "content": f"{CONTEXT_TAG} {self.summary}"})
+        for message in self.turns:
+            if message["role"] == "system":
+                message = {"role": "user", "content": f"{CONTEXT_TAG} {message['content']}"}
+            messages.append(message)
+        return messages
+
+    @property
+    def summary(self) -> str:
+        return "Resumen de la conversación anterior:\n" + "\n".join(
+            f"- {line}" for line in self.summary_lines
+        )
+
+    @property
+    def total_tokens(self) -> int:
+        total = estimate_tokens(self.system_prompt["content"])
+        if self.summary_lines:
+            total += estimate_tokens(self.summary)
+        return total + sum(self.turn_tokens)
+
+    def add(self, role: str, content: str):
+        """
+        Añade un mensaje y compacta el historial si supera el presupuesto.
+
+        Args:
+            role (str): Rol del mensaje user/assistant/system.
+            content (str): Contenido del mensaje.
+        """
+        self.turns.append({"role": role, "content": content})
+        self.turn_tokens.append(estimate_tokens(content))
+
+        if self.total_tokens > self.token_budget:
+            self.compact()
+
+    def compact(self):
+        """Condensa turnos viejos y contextos desactualizados en el resumen."""
+        target = int(self.token_budget * LOW_WATERMARK)
+        old = len(self.turns) - self.keep_recent
+
+        # 1. Contextos viejos: solo se conserva el último inyectado
+        last_context = max(
+            (i for i, m in enumerate(self.turns) if m["role"] == "system"),
+            default=None,
+        )
+        stale = [
+            i for i in range(max(old, 0))
+            if self.turns[i]["role"] == "system" and i != last_context
+        ]
+        for removed, i in enumerate(stale):
+            self._summarize(i - removed)
+        old -= len(stale)
+
+        self._trim_summary()
+
+        # 2. Turnos más viejos, de a uno, hasta bajar del objetivo. El resumen
+        # se acota en cada paso: una línea de resumen de un mensaje corto pesa
+        # casi lo mismo que el mensaje, y sin acotarlo el total no bajaría
+        # hasta resumir todos los turnos viejos
+        while old > 0 and self.total_tokens > target:
+            self._summarize(0)
+            self._trim_summary()
+            old -= 1
+
+        self.compactions += 1
+
+    def _trim_summary(self):
+        """El resumen tampoco puede crecer sin límite: se descartan las líneas más viejas."""
+        max_summary = self.token_budget // 4
+        while len(self.summary_lines) > 1 and estimate_tokens(self.summary) > max_summary:
+            self.summary_lines.pop(0)
+
+    def _summarize(self, index: int):
+        message = self.turns.pop(index)
+        self.turn_tokens.pop(index)
+
+        text = " ".join(message["content"].split())
+        if len(text) > SUMMARY_LINE_CHARS:
+            text = text[:SUMMARY_LINE_CHARS].rstrip() + "…"
+
+        label = _SUMMARY_LABELS.get(message["role"], message["role"])
+        self.summary_lines.append(f"{label}: {text}")
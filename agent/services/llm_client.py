@@ -0,0 +1,111 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import httpx
+import ollama
+
+from config import (
+    OLLAMA_HEALTH_INTERVAL,
+    OLLAMA_HOSTS,
+    OLLAMA_MAX_CONCURRENCY,
+    OLLAMA_TIMEOUT,
+)
+
+
+class OllamaHost:
+    """Un servidor de Ollama con su cliente y su carga actual."""
+
+    def __init__(self, host: str, max_concurrency: int = OLLAMA_MAX_CONCURRENCY):
+        self.host = host
+        self.client = ollama.AsyncClient(
+            host=host,
+            timeout=OLLAMA_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            ),
+        )
+        self.slots = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.healthy = True
+        self.last_error: Optional[str] = None
+
+    def stats(self) -> dict:
+        return {
+            "host": self.host,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "last_error": self.last_error,
+        }
+
+
+class OllamaPool:
+    """
+    Clientes de Ollama compartidos por todas las sesiones del proceso.
+
+    Cada host tiene un único cliente con su pool de conexiones y un límite de
+    generaciones en paralelo. Las llamadas se envían al host sano con menos
+    generaciones en curso.
+    """
+
+    def __init__(self, hosts: list[str] = OLLAMA_HOSTS):
+        self.hosts = [OllamaHost(host) for host in hosts]
+        self._health_task: Optional[asyncio.Task] = None
+
+    def _pick(self) -> OllamaHost:
+        candidates = [h for h in self.hosts if h.healthy] or self.hosts
+        return min(candidates, key=lambda h: h.in_flight)
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[ollama.AsyncClient]:
+        """Reserva un lugar en el host menos cargado y devuelve su cliente."""
+        host = self._pick()
+        host.in_flight += 1
+        try:
+            async with host.slots:
+                try:
+                    yield host.client
+                except (httpx.TransportError, ConnectionError) as e:
+                    host.healthy = False
+                    host.last_error = str(e)
+                    raise
+        finally:
+            host.in_flight -= 1
+
+    async def check_health(self) -> None:
+        """Consulta cada host y actualiza su estado."""
+        async def check(host: OllamaHost):
+            try:
+                await asyncio.wait_for(host.client.ps(), timeout=5)
+                host.healthy = True
+                host.last_error = None
+            except Exception as e:
+                host.healthy = False
+                host.last_error = str(e) or type(e).__name__
+
+        await asyncio.gather(*(check(host) for host in self.hosts))
+
+    async def start_health_checks(self, interval: int = OLLAMA_HEALTH_INTERVAL) -> None:
+        if self._health_task is None:
+            self._health_task = asyncio.create_task(self._health_loop(interval))
+
+    async def stop_health_checks(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+
+    async def _health_loop(self, interval: int) -> None:
+        while True:
+            await self.check_health()
+            await asyncio.sleep(interval)
+
+    def stats(self) -> list[dict]:
+        return [host.stats() for host in self.hosts]
+
+
+ollama_pool = OllamaPool()
@@ -1,14 +1,99 @@
-import ollama
+import time
+from typing import AsyncIterator
 
-from config import BUSINESS_CONTEXT, OLLAMA_MODEL, OLLAMA_HOST
+from config import BUSINESS_CONTEXT, OLLAMA_KEEP_ALIVE, OLLAMA_MODEL, OLLAMA_NUM_CTX
+from services.history import ConversationHistory
+from services.llm_client import ollama_pool
+from utils.metrics import Counter, Histogram
+from utils.text_utils import split_sentences
+from utils.tracing import span
+
+# Cantidad de turnos cuyas métricas se conservan por sesión
+MAX_TURN_STATS = 50
+
+OLLAMA_PROMPT_EVAL_SECONDS = Histogram(
+    "ollama_prompt_eval_seconds",
+    "Tiempo de Ollama evaluando el prompt de cada turno.",
+)
+OLLAMA_EVAL_SECONDS = Histogram(
+    "ollama_eval_seconds",
+    "Tiempo de Ollama generando la respuesta de cada turno.",
+)
+OLLAMA_TOKENS_PER_SECOND = Histogram(
+    "ollama_tokens_per_second",
+    "Velocidad de generación de cada turno.",
+    buckets=(5, 10, 15, 20, 30, 40, 60, 80, 120, 160),
+)
+OLLAMA_TOKENS = Counter(
+    "ollama_tokens_total",
+    "Tokens evaluados por Ollama, del prompt o generados.",
+    labels=("kind",),
+)
+
+
+def _ms(nanoseconds) -> float:
+    return round((nanoseconds or 0) / 1_000_000, 1)
+
+
+def turn_stats(response, prompt_tokens: int) -> dict:
+    """
+    Extrae las métricas de un turno desde la respuesta final de Ollama.
+
+    Ollama solo cuenta en `prompt_eval_count` los tokens que tuvo que evaluar,
+    los que reutilizó de su KV cache no aparecen. Comparado con los tokens
+    estimados del prompt da una idea de cuánto del prefijo se reutilizó.
+
+    Args:
+        response: Respuesta de `chat` (o el último chunk en streaming).
+        prompt_tokens (int): Tokens estimados del prompt enviado.
+    """
+    prompt_eval_count = response.prompt_eval_count or 0
+    eval_count = response.eval_count or 0
+    eval_seconds = (response.eval_duration or 0) / 1_000_000_000
+
+    cache_hit_ratio = None
+    if prompt_tokens:
+        cache_hit_ratio = round(max(0.0, 1 - prompt_eval_count / prompt_tokens), 2)
+
+    return {
+        "prompt_tokens_estimated": prompt_tokens,
+        "prompt_eval_count": prompt_eval_count,
+        "prompt_eval_ms": _ms(response.prompt_eval_duration),
+        "eval_count": eval_count,
+        "eval_ms": _ms(response.eval_duration),
+        "load_ms": _ms(response.load_duration),
+        "total_ms": _ms(response.total_duration),
+        "tokens_per_second": round(eval_count / eval_seconds, 1) if eval_seconds else None,
+        "cache_hit_ratio": cache_hit_ratio,
+    }
 
 
 class Session:
     def __init__(self):
-        self.client = ollama.Client(host=OLLAMA_HOST)
-        self.messages = [
-            {"role": "system", "content": BUSINESS_CONTEXT}
-        ]
+        self.history = ConversationHistory(BUSINESS_CONTEXT)
+        self.last_time_to_first_sentence = None
+        self.turn_stats: list[dict] = []
+
+    def to_dict(self) -> dict:
+        """Estado serializable de la sesión, para guardarla fuera del proceso."""
+        return {
+            "history": self.history.to_dict(),
+            "turn_stats": self.turn_stats,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Session":
+        session = cls()
+        session.history = ConversationHistory.from_dict(
+            BUSINESS_CONTEXT, data.get("history", {})
+        )
+        session.turn_stats = data.get("turn_stats", [])
+        return session
+
+    @property
+    def messages(self) -> list[dict]:
+        """Historial compactado de la sesión."""
+        return self.history.messages
 
     def add_message(self, role: str, message: str):
         """
@@ -18,9 +103,7 @@ class Session:
             role (str): Rol del mensaje user/assistant.
             message (str): Mensaje que se añadira.
         """
-        self.messages.append(
-            {"role": role, "content": message}
-        )
+        self.history.add(role, message)
 
     def add_context(self, context: str):
         """
@@ -29,23 +112,123 @@ class Session:
         Args:
             context (str): Mensaje de contexto.
         """
-        self.messages.append(
-            {"role": "system", "content": context}
-        )
+        self.history.add("system", context)
 
-    def generate(self):
+    def get_stats(self) -> dict:
+        """
+        Métricas acumuladas de la sesión.
+
+        Returns:
+            dict: Turnos, tiempos de Ollama, tasa de reutilización del KV
+            cache y métricas del último turno.
+        """
+        turns = self.turn_stats
+        ratios = [t["cache_hit_ratio"] for t in turns if t["cache_hit_ratio"] is not None]
+        return {
+            "turns": len(turns),
+            "messages": len(self.history.turns),
+            "history_tokens": self.history.total_tokens,
+            "compactions": self.history.compactions,
+            "prompt_eval_ms": round(sum(t["prompt_eval_ms"] for t in turns), 1),
+            "eval_ms": round(sum(t["eval_ms"] for t in turns), 1),
+            "avg_cache_hit_ratio": round(sum(ratios) / len(ratios), 2) if ratios else None,
+            "time_to_first_sentence": self.last_time_to_first_sentence,
+            "last_turn": turns[-1] if turns else None,
+        }
+
+    def _chat_kwargs(self) -> dict:
+        return {
+            "model": OLLAMA_MODEL,
+            "messages": self.history.prompt(),
+            "keep_alive": OLLAMA_KEEP_ALIVE,
+            "options": {"num_ctx": OLLAMA_NUM_CTX},
+        }
+
+    def _record_turn(self, response, prompt_tokens: int):
+        stats = turn_stats(response, prompt_tokens)
+        self.turn_stats.append(stats)
+        del self.turn_stats[:-MAX_TURN_STATS]
+
+        OLLAMA_PROMPT_EVAL_SECONDS.observe(stats["prompt_eval_ms"] / 1000)
+        OLLAMA_EVAL_SECONDS.observe(stats["eval_ms"] / 1000)
+        if stats["tokens_per_second"] is not None:
+            OLLAMA_TOKENS_PER_SECOND.observe(stats["tokens_per_second"])
+        OLLAMA_TOKENS.inc("prompt", amount=stats["prompt_eval_count"])
+        OLLAMA_TOKENS.inc("eval", amount=stats["eval_count"])
+
+    async def generate(self):
         """
         Genera un mensaje del modelo en base al historial de mensajes previo.
 
+        La llamada a Ollama es asíncrona, por lo que no bloquea el event loop
+        mientras el modelo genera y otras llamadas pueden atenderse en paralelo.
+
         Returns:
             str: Mensaje generado por el modelo.
         """
-        response = self.client.chat(
-            model=OLLAMA_MODEL,
-            messages=self.messages,
-        )
+        prompt_tokens = self.history.total_tokens
+        with span("ollama.generate", model=OLLAMA_MODEL) as attributes:
+            async with ollama_pool.acquire() as client:
+                response = await client.chat(**self._chat_kwargs())
 
+            self._record_turn(response, prompt_tokens)
+            attributes.update(self.turn_stats[-1])
         assistant_message = response.message.content
         self.add_message("assistant", assistant_message)
 
         return assistant_message
+
+    async def stream(self) -> AsyncIterator[str]:
+        """
+        Genera la respuesta del modelo en streaming, token por token.
+
+        Al terminar, el mensaje completo se guarda en el historial igual que
+        en `generate`.
+
+        Yields:
+            str: Fragmentos de texto a medida que el modelo los produce.
+        """
+        prompt_tokens = self.history.total_tokens
+        parts = []
+        # Sin activar: el generador se reanuda desde el contexto de quien lo consume
+        with span("ollama.stream", activate=False, model=OLLAMA_MODEL) as attributes:
+            async with ollama_pool.acquire() as client:
+                stream = await client.chat(**self._chat_kwargs(), stream=True)
+                async for chunk in stream:
+                    token = chunk.message.content
+                    if token:
+                        parts.append(token)
+                        yield token
+                    if chunk.done:
+                        self._record_turn(chunk, prompt_tokens)
+                        attributes.update(self.turn_stats[-1])
+
+        self.add_message("assistant", "".join(parts))
+
+    async def stream_sentences(self) -> AsyncIterator[str]:
+        """
+        Genera la respuesta del modelo agrupada en oraciones completas.
+
+        Permite que la capa de voz empiece a hablar con la primera oración sin
+        esperar al resto. Registra en `last_time_to_first_sentence` cuántos
+        segundos tardó en estar lista la primera oración.
+
+        Yields:
+            str: Oraciones completas de la respuesta.
+        """
+        started = time.perf_counter()
+        self.last_time_to_first_sentence = None
+        buffer = ""
+
+        async for token in self.stream():
+            buffer += token
+            sentences, buffer = split_sentences(buffer)
+            for sentence in sentences:
+                if self.last_time_to_first_sentence is None:
+                    self.last_time_to_first_sentence = time.perf_counter() - started
+                yield sentence
+
+        if buffer.strip():
+            if self.last_time_to_first_sentence is None:
+                self.last_time_to_first_sentence = time.perf_counter() - started
+            yield buffer.strip()
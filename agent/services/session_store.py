@@ -0,0 +1,383 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from config import (
+    SESSION_BACKEND,
+    SESSION_LEASE_TTL,
+    SESSION_LOCK_TIMEOUT,
+    SESSION_MAX,
+    SESSION_SQLITE_PATH,
+    SESSION_SWEEP_INTERVAL,
+    SESSION_TTL_SECONDS,
+)
+from services.session import Session
+
+
+class SessionLockTimeout(Exception):
+    """No se pudo tomar el lock de una sesión a tiempo."""
+
+
+class SessionStore(ABC):
+    """
+    Almacén de sesiones activas, con expiración por inactividad y límite de
+    cantidad.
+
+    Una sesión que no se usa durante `ttl` segundos se descarta (llamadas que
+    se cortaron sin pasar por /session/end). Si se supera `max_sessions`, se
+    descarta la usada hace más tiempo (LRU).
+
+    Cada turno debe ejecutarse dentro de `lock(call_sid)` y terminar con
+    `save`, así dos webhooks de la misma llamada no intercalan sus mensajes.
+    """
+
+    def __init__(
+        self,
+        ttl: int = SESSION_TTL_SECONDS,
+        max_sessions: int = SESSION_MAX,
+        lock_timeout: float = SESSION_LOCK_TIMEOUT,
+    ):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.lock_timeout = lock_timeout
+        self._sweeper: Optional[asyncio.Task] = None
+        self.created = 0
+        self.ended = 0
+        self.evicted_ttl = 0
+        self.evicted_lru = 0
+
+    @abstractmethod
+    async def get(self, call_sid: str) -> Optional[Session]:
+        """Devuelve la sesión, o None si no existe o expiró."""
+
+    @abstractmethod
+    async def get_or_create(self, call_sid: str) -> Session:
+        """Devuelve la sesión existente o crea una nueva."""
+
+    @abstractmethod
+    async def save(self, call_sid: str, session: Session) -> None:
+        """Persiste el estado de la sesión después de un turno."""
+
+    @abstractmethod
+    async def end(self, call_sid: str) -> None:
+        """Elimina la sesión al terminar la llamada."""
+
+    @abstractmethod
+    async def sweep(self) -> int:
+        """Descarta todas las sesiones expiradas. Devuelve cuántas se eliminaron."""
+
+    @abstractmethod
+    async def count(self) -> int:
+        """Cantidad de sesiones vivas."""
+
+    @abstractmethod
+    def lock(self, call_sid: str):
+        """Context manager asíncrono que serializa los turnos de una llamada."""
+
+    async def stats(self) -> dict:
+        return {
+            "backend": type(self).__name__,
+            "live": await self.count(),
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl,
+            "created": self.created,
+            "ended": self.ended,
+            "evicted_ttl": self.evicted_ttl,
+            "evicted_lru": self.evicted_lru,
+        }
+
+    async def start_sweeper(self, interval: int = SESSION_SWEEP_INTERVAL) -> None:
+        """Lanza la tarea de fondo que limpia sesiones expiradas."""
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_loop(interval))
+
+    async def stop_sweeper(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+    async def _sweep_loop(self, interval: int) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            evicted = await self.sweep()
+            if evicted:
+                print(f"Sesiones expiradas eliminadas: {evicted}")
+
+
+class InMemorySessionStore(SessionStore):
+    """Sesiones guardadas en memoria del proceso. Solo sirve con un worker."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+        self._last_active: dict[str, float] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    async def get(self, call_sid: str) -> Optional[Session]:
+        session = self._sessions.get(call_sid)
+        if session is None:
+            return None
+
+        if self._expired(call_sid, time.monotonic()):
+            self._remove(call_sid)
+            self.evicted_ttl += 1
+            return None
+
+        self._touch(call_sid)
+        return session
+
+    async def get_or_create(self, call_sid: str) -> Session:
+        session = await self.get(call_sid)
+        if session is not None:
+            return session
+
+        session = Session()
+        self._sessions[call_sid] = session
+        self._touch(call_sid)
+        self.created += 1
+
+        while len(self._sessions) > self.max_sessions:
+            oldest = next(iter(self._sessions))
+            self._remove(oldest)
+            self.evicted_lru += 1
+
+        return session
+
+    async def save(self, call_sid: str, session: Session) -> None:
+        # La sesión ya es el mismo objeto en memoria, solo se marca como usada
+        if call_sid in self._sessions:
+            self._touch(call_sid)
+
+    async def end(self, call_sid: str) -> None:
+        if self._remove(call_sid):
+            self.ended += 1
+
+    async def sweep(self) -> int:
+        now = time.monotonic()
+        expired = [sid for sid in self._sessions if self._expired(sid, now)]
+        for call_sid in expired:
+            self._remove(call_sid)
+        self.evicted_ttl += len(expired)
+        return len(expired)
+
+    async def count(self) -> int:
+        return len(self._sessions)
+
+    @asynccontextmanager
+    async def lock(self, call_sid: str) -> AsyncIterator[None]:
+        lock = self._locks.setdefault(call_sid, asyncio.Lock())
+        try:
+            await asyncio.wait_for(lock.acquire(), timeout=self.lock_timeout)
+        except asyncio.TimeoutError:
+            raise SessionLockTimeout(call_sid)
+        try:
+            yield
+        finally:
+            lock.release()
+            if call_sid not in self._sessions and not lock.locked():
+                self._locks.pop(call_sid, None)
+
+    def _touch(self, call_sid: str) -> None:
+        self._last_active[call_sid] = time.monotonic()
+        self._sessions.move_to_end(call_sid)
+
+    def _expired(self, call_sid: str, now: float) -> bool:
+        return now - self._last_active[call_sid] > self.ttl
+
+    def _remove(self, call_sid: str) -> bool:
+        self._last_active.pop(call_sid, None)
+        # Si hay un turno en curso, `lock` lo descarta al liberarlo
+        lock = self._locks.get(call_sid)
+        if lock is not None and not lock.locked():
+            del self._locks[call_sid]
+        return self._sessions.pop(call_sid, None) is not None
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    Sesiones guardadas en un archivo SQLite compartido por todos los workers.
+
+    Los mensajes se guardan como JSON comprimido con zlib. El lock por
+    call_sid es un lease en la tabla `session_locks`, así que también
+    serializa turnos entre procesos distintos. El lease dura `lease_ttl`
+    segundos y se renueva mientras el turno sigue en curso, sin importar
+    cuánto tarde la generación; si el worker se cae, se libera solo al
+    vencer. Los contadores de `stats` son por proceso.
+    """
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(
+        self,
+        path: str = SESSION_SQLITE_PATH,
+        lease_ttl: float = SESSION_LEASE_TTL,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.path = path
+        self.lease_ttl = lease_ttl
+        self._db_lock = threading.Lock()
+        self._local_locks: dict[str, asyncio.Lock] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "call_sid TEXT PRIMARY KEY, data BLOB NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions(updated_at)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_locks ("
+            "call_sid TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    async def get(self, call_sid: str) -> Optional[Session]:
+        row = await self._run(
+            "SELECT data, updated_at FROM sessions WHERE call_sid = ?", (call_sid,),
+            fetch=True,
+        )
+        if not row:
+            return None
+
+        data, updated_at = row[0]
+        if time.time() - updated_at > self.ttl:
+            await self._run("DELETE FROM sessions WHERE call_sid = ?", (call_sid,))
+            self.evicted_ttl += 1
+            return None
+
+        return Session.from_dict(json.loads(zlib.decompress(data)))
+
+    async def get_or_create(self, call_sid: str) -> Session:
+        session = await self.get(call_sid)
+        if session is not None:
+            return session
+
+        session = Session()
+        await self.save(call_sid, session)
+        self.created += 1
+
+        evicted = await self._run(
+            "DELETE FROM sessions WHERE call_sid IN ("
+            "SELECT call_sid FROM sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions,),
+        )
+        self.evicted_lru += evicted
+        return session
+
+    async def save(self, call_sid: str, session: Session) -> None:
+        data = zlib.compress(
+            json.dumps(session.to_dict(), ensure_ascii=False, separators=(",", ":")).encode()
+        )
+        await self._run(
+            "INSERT INTO sessions (call_sid, data, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(call_sid) DO UPDATE SET data = excluded.data, "
+            "updated_at = excluded.updated_at",
+            (call_sid, data, time.time()),
+        )
+
+    async def end(self, call_sid: str) -> None:
+        if await self._run("DELETE FROM sessions WHERE call_sid = ?", (call_sid,)):
+            self.ended += 1
+
+    async def sweep(self) -> int:
+        now = time.time()
+        evicted = await self._run(
+            "DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl,)
+        )
+        await self._run("DELETE FROM session_locks WHERE expires_at < ?", (now,))
+        self.evicted_ttl += evicted
+        return evicted
+
+    async def count(self) -> int:
+        row = await self._run("SELECT COUNT(*) FROM sessions", fetch=True)
+        return row[0][0]
+
+    @asynccontextmanager
+    async def lock(self, call_sid: str) -> AsyncIterator[None]:
+        # Primero se serializa dentro del proceso, así solo un turno por
+        # call_sid compite por el lease en la base
+        local = self._local_locks.setdefault(call_sid, asyncio.Lock())
+        deadline = time.monotonic() + self.lock_timeout
+        try:
+            await asyncio.wait_for(local.acquire(), timeout=self.lock_timeout)
+        except asyncio.TimeoutError:
+            raise SessionLockTimeout(call_sid)
+
+        owner = uuid.uuid4().hex
+        try:
+            while not await self._try_lease(call_sid, owner):
+                if time.monotonic() > deadline:
+                    raise SessionLockTimeout(call_sid)
+                await asyncio.sleep(self.POLL_INTERVAL)
+            renewer = asyncio.create_task(self._renew_lease(call_sid, owner))
+            try:
+                yield
+            finally:
+                renewer.cancel()
+                await self._run(
+                    "DELETE FROM session_locks WHERE call_sid = ? AND owner = ?",
+                    (call_sid, owner),
+                )
+        finally:
+            local.release()
+            if not local.locked():
+                self._local_locks.pop(call_sid, None)
+
+    async def _try_lease(self, call_sid: str, owner: str) -> bool:
+        now = time.time()
+        acquired = await self._run(
+            "INSERT INTO session_locks (call_sid, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(call_sid) DO UPDATE SET owner = excluded.owner, "
+            "expires_at = excluded.expires_at WHERE session_locks.expires_at < ?",
+            (call_sid, owner, now + self.lease_ttl, now),
+        )
+        return acquired > 0
+
+    async def _renew_lease(self, call_sid: str, owner: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease_ttl / 3)
+            try:
+                renewed = await self._run(
+                    "UPDATE session_locks SET expires_at = ? WHERE call_sid = ? AND owner = ?",
+                    (time.time() + self.lease_ttl, call_sid, owner),
+                )
+            except sqlite3.Error as e:
+                print(f"Error renovando el lock de la sesión {call_sid}: {e}")
+                continue
+            if not renewed:
+                print(f"Se perdió el lock de la sesión {call_sid}")
+                return
+
+    async def _run(self, sql: str, params: tuple = (), fetch: bool = False):
+        return await asyncio.to_thread(self._execute, sql, params, fetch)
+
+    def _execute(self, sql: str, params: tuple, fetch: bool):
+        with self._db_lock:
+            cursor = self._conn.execute(sql, params)
+            return cursor.fetchall() if fetch else cursor.rowcount
+
+
+def build_session_store() -> SessionStore:
+    """Crea el store configurado en SESSION_BACKEND (memory/sqlite)."""
+    if SESSION_BACKEND == "sqlite":
+        return SqliteSessionStore()
+    if SESSION_BACKEND == "memory":
+        return InMemorySessionStore()
+    raise ValueError(f"SESSION_BACKEND desconocido: {SESSION_BACKEND}")
+
+
+session_store = build_session_store()
@@ -0,0 +1,82 @@
+"""
+Fixtures de los tests del agente.
+
+Correr desde `agent/` (los módulos se importan como en `main.py`):
+
+    cd agent && python -m pytest -q
+"""
+import asyncio
+import json
+import os
+import sys
+
+import httpx
+import ollama
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.history import estimate_tokens  # noqa: E402
+from services.llm_client import ollama_pool  # noqa: E402
+
+
+class FakeOllama:
+    """
+    Servidor de Ollama falso para `/api/chat`.
+
+    Cada generación tarda `seconds` más `seconds_per_prompt_token` por cada
+    token estimado del prompt, como la evaluación del prompt en Ollama, y
+    responde siempre `reply`. Registra cuántas generaciones llegaron a estar
+    en curso a la vez y el tamaño de cada prompt.
+    """
+
+    def __init__(
+        self,
+        seconds: float = 0.2,
+        seconds_per_prompt_token: float = 0.0,
+        reply: str = "Listo, te anoto.",
+    ):
+        self.seconds = seconds
+        self.seconds_per_prompt_token = seconds_per_prompt_token
+        self.reply = reply
+        self.active = 0
+        self.max_active = 0
+        self.calls = 0
+        self.prompt_tokens: list[int] = []
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/api/chat"
+        body = json.loads(request.content)
+        prompt_tokens = sum(estimate_tokens(m["content"]) for m in body["messages"])
+        self.prompt_tokens.append(prompt_tokens)
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.seconds + prompt_tokens * self.seconds_per_prompt_token)
+        finally:
+            self.active -= 1
+        return httpx.Response(200, json={
+            "model": body["model"],
+            "created_at": "2026-03-02T10:00:00Z",
+            "message": {"role": "assistant", "content": self.reply},
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": 200_000_000,
+            "load_duration": 1_000_000,
+            "prompt_eval_count": 40,
+            "prompt_eval_duration": 20_000_000,
+            "eval_count": 8,
+            "eval_duration": 160_000_000,
+        })
+
+
+@pytest.fixture
+def fake_ollama(monkeypatch) -> FakeOllama:
+    """Apunta todos los hosts del pool de Ollama a un `FakeOllama`."""
+    fake = FakeOllama()
+    for host in ollama_pool.hosts:
+        monkeypatch.setattr(host, "client", ollama.AsyncClient(
+            host=host.host, transport=httpx.MockTransport(fake)
+        ))
+    return fake
@@ -0,0 +1,182 @@
+import asyncio
+import re
+import statistics
+import time
+
+from config import HISTORY_TOKEN_BUDGET
+from services.history import (
+    CONTEXT_TAG,
+    LOW_WATERMARK,
+    SUMMARY_LINE_CHARS,
+    ConversationHistory,
+    estimate_tokens,
+)
+from services.session import Session
+
+SYSTEM = "Sos la recepcionista de la barbería."
+
+
+def _history(budget: int = 100, keep_recent: int = 2) -> ConversationHistory:
+    return ConversationHistory(SYSTEM, token_budget=budget, keep_recent=keep_recent)
+
+
+def _message(n: int) -> str:
+    # 80 caracteres = 20 tokens estimados
+    return f"mensaje {n:02d} ".ljust(80, "x")
+
+
+def _number(text: str) -> int:
+    return int(re.search(r"mensaje (\d+)", text).group(1))
+
+
+def test_under_budget_nothing_is_compacted():
+    history = _history(budget=1000)
+    history.add("user", "Hola")
+    history.add("assistant", "¿En qué te ayudo?")
+
+    assert history.compactions == 0
+    assert history.summary_lines == []
+    assert history.messages[0] == {"role": "system", "content": SYSTEM}
+    assert len(history.messages) == 3
+
+
+def test_compaction_keeps_recent_turns_and_gets_under_the_low_watermark():
+    history = _history(budget=100, keep_recent=2)
+    for n in range(6):
+        history.add("user" if n % 2 == 0 else "assistant", _message(n))
+
+    assert history.compactions >= 1
+    assert history.total_tokens <= history.token_budget
+    assert [turn["content"] for turn in history.turns[-2:]] == [_message(4), _message(5)]
+    # Los viejos quedan en el resumen, en orden y con su rol
+    assert history.summary_lines
+    numbers = [_number(line) for line in history.summary_lines]
+    assert numbers == sorted(numbers) and numbers[-1] < 4
+    for line, n in zip(history.summary_lines, numbers):
+        assert line.startswith("Cliente:" if n % 2 == 0 else "Asistente:")
+
+
+def test_compaction_stops_at_the_low_watermark():
+    history = _history(budget=400, keep_recent=1)
+    history.turns = [{"role": "user", "content": _message(n)} for n in range(20)]
+    history.turn_tokens = [estimate_tokens(_message(n)) for n in range(20)]
+
+    history.compact()
+
+    target = int(history.token_budget * LOW_WATERMARK)
+    assert history.total_tokens <= target
+    # Con mensajes cortos el resumen pesa casi lo mismo que lo resumido:
+    # igual se conservan todos los turnos que entran en el objetivo
+    assert len(history.turns) > history.keep_recent
+    assert history.total_tokens + estimate_tokens(_message(0)) > target
+
+
+def test_only_the_latest_old_context_survives():
+    history = _history(budget=10_000, keep_recent=1)
+    history.add("system", "Turnos libres: 10:00")
+    history.add("user", "Quiero el de las 10")
+    history.add("system", "Turnos libres: 11:00")
+    history.add("assistant", "Te anoto a las 11")
+    history.add("user", "Gracias")
+
+    history.compact()
+
+    contents = [turn["content"] for turn in history.turns]
+    assert "Turnos libres: 10:00" not in contents
+    assert "Turnos libres: 11:00" in contents
+    assert history.summary_lines == ["Contexto: Turnos libres: 10:00"]
+
+
+def test_summary_lines_are_truncated_and_flattened():
+    history = _history(budget=100, keep_recent=0)
+    history.add("user", "línea uno\n\n   línea dos " + "x" * 500)
+
+    [line] = history.summary_lines
+    assert "\n" not in line
+    assert line.startswith("Cliente: línea uno línea dos")
+    assert line.endswith("…")
+    assert len(line) <= len("Cliente: ") + SUMMARY_LINE_CHARS + 1
+
+
+def test_summary_is_bounded():
+    history = _history(budget=100, keep_recent=1)
+    for n in range(40):
+        history.add("user", _message(n))
+
+    assert estimate_tokens(history.summary) <= history.token_budget // 4 or len(history.summary_lines) == 1
+    # Las líneas que se descartan son las más viejas: la última es el turno
+    # justo anterior a los que siguen en el historial
+    assert _number(history.summary_lines[-1]) == _number(history.turns[0]["content"]) - 1
+
+
+def test_prompt_keeps_a_single_system_message_at_the_start():
+    history = _history(budget=100, keep_recent=2)
+    history.add("system", "Hoy es lunes")
+    for n in range(6):
+        history.add("user", _message(n))
+
+    prompt = history.prompt()
+
+    assert prompt[0] == {"role": "system", "content": SYSTEM}
+    assert all(message["role"] != "system" for message in prompt[1:])
+    assert prompt[1]["content"].startswith(f"{CONTEXT_TAG} Resumen de la conversación anterior:")
+
+
+def test_roundtrip_through_dict():
+    history = _history(budget=100, keep_recent=2)
+    for n in range(6):
+        history.add("user", _message(n))
+
+    restored = ConversationHistory.from_dict(SYSTEM, history.to_dict())
+
+    assert restored.messages == history.messages
+    assert restored.total_tokens == history.total_tokens
+
+
+TURNS = 40
+SECONDS_PER_PROMPT_TOKEN = 0.000005
+
+
+async def _synthetic_call(compaction: bool) -> tuple[list[float], list[int]]:
+    """Llamada de 40 turnos con un contexto inyectado cada cinco turnos."""
+    session = Session()
+    if not compaction:
+        session.history.token_budget = 10 ** 9
+    latencies = []
+    for n in range(TURNS):
+        if n % 5 == 0:
+            session.add_context(f"Turnos libres del día {n // 5 + 1}: " + ", ".join(
+                f"{hour}:00" for hour in range(9, 18)
+            ))
+        session.add_message("user", _message(n) * 5)
+        started = time.perf_counter()
+        await session.generate()
+        latencies.append(time.perf_counter() - started)
+    return latencies, session.history.total_tokens
+
+
+def test_benchmark_per_turn_latency_over_a_40_turn_call(fake_ollama):
+    fake_ollama.seconds = 0.001
+    fake_ollama.seconds_per_prompt_token = SECONDS_PER_PROMPT_TOKEN
+    fake_ollama.reply = "Perfecto, te confirmo el turno. " * 10
+
+    unbounded, _ = asyncio.run(_synthetic_call(compaction=False))
+    unbounded_prompts = fake_ollama.prompt_tokens[:]
+    fake_ollama.prompt_tokens.clear()
+    bounded, final_tokens = asyncio.run(_synthetic_call(compaction=True))
+    bounded_prompts = fake_ollama.prompt_tokens[:]
+
+    def ms(latencies: list[float]) -> str:
+        return f"{statistics.mean(latencies) * 1000:.1f}ms"
+
+    print(
+        f"\n{TURNS} turnos, latencia media por turno (primeros 10 / últimos 10): "
+        f"sin compactar {ms(unbounded[:10])} / {ms(unbounded[-10:])}, "
+        f"compactando {ms(bounded[:10])} / {ms(bounded[-10:])}; "
+        f"tokens del último prompt {unbounded_prompts[-1]} vs {bounded_prompts[-1]}"
+    )
+    # Sin compactar el prompt crece con cada turno; compactando queda acotado
+    assert unbounded_prompts[-1] > 2 * HISTORY_TOKEN_BUDGET
+    assert max(bounded_prompts) <= HISTORY_TOKEN_BUDGET * 1.1
+    assert final_tokens <= HISTORY_TOKEN_BUDGET
+    assert statistics.mean(bounded[-10:]) < statistics.mean(unbounded[-10:]) * 0.6
@@ -0,0 +1,128 @@
+import asyncio
+import statistics
+import time
+
+import httpx
+import pytest
+
+from api import client as client_api
+from api import http
+
+CALLS = 30
+# Costo de abrir una conexión nueva contra un orquestador remoto (TCP + TLS)
+HANDSHAKE_SECONDS = 0.005
+
+
+class StandInOrquestator:
+    """
+    Orquestador de prueba sobre un socket local.
+
+    Responde `{}` a cualquier request HTTP/1.1 y mantiene la conexión
+    abierta (keep-alive). Cada conexión nueva espera `HANDSHAKE_SECONDS`
+    antes de atender, como el handshake contra un host remoto.
+    """
+
+    def __init__(self):
+        self.connections = 0
+        self.server = None
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        await asyncio.sleep(HANDSHAKE_SECONDS)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    name, _, value = line.partition(b":")
+                    if name.strip().lower() == b"content-length":
+                        length = int(value)
+                if length:
+                    await reader.readexactly(length)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: application/json\r\n"
+                    b"Content-Length: 2\r\n\r\n{}"
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _fresh_client_get(url: str) -> dict:
+    # Lo que hacían los helpers antes: un cliente (y una conexión) por llamada
+    async with httpx.AsyncClient() as client:
+        response = await client.get(url, params={"id": "c-1"})
+        response.raise_for_status()
+        return response.json()
+
+
+async def _latencies(call) -> list[float]:
+    latencies = []
+    for _ in range(CALLS):
+        started = time.perf_counter()
+        await call()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+@pytest.fixture
+def shared_client():
+    yield
+    asyncio.run(http.close_http_client())
+
+
+def test_benchmark_shared_client_vs_client_per_call(monkeypatch, shared_client):
+    server = StandInOrquestator()
+
+    async def main():
+        base_url = await server.start()
+        monkeypatch.setattr(client_api, "AGENT_API", base_url)
+        try:
+            fresh = await _latencies(
+                lambda: _fresh_client_get(f"{base_url}/api/v1/client/get")
+            )
+            fresh_connections = server.connections
+
+            await http.start_http_client()
+            shared = await _latencies(lambda: client_api.get_client("c-1"))
+            shared_connections = server.connections - fresh_connections
+        finally:
+            await http.close_http_client()
+            await server.stop()
+        return fresh, fresh_connections, shared, shared_connections
+
+    fresh, fresh_connections, shared, shared_connections = asyncio.run(main())
+
+    print(
+        f"\nlatencia por request ({CALLS} llamadas): "
+        f"cliente por llamada p50={statistics.median(fresh) * 1000:.2f}ms, "
+        f"cliente compartido p50={statistics.median(shared) * 1000:.2f}ms"
+    )
+    assert fresh_connections == CALLS
+    assert shared_connections == 1
+    # Solo la primera llamada del cliente compartido paga el handshake
+    assert statistics.median(shared) < HANDSHAKE_SECONDS < statistics.median(fresh)
+
+
+def test_client_is_recreated_after_close(shared_client):
+    async def main():
+        await http.start_http_client()
+        first = http.get_http_client()
+        await http.close_http_client()
+        return first, http.get_http_client()
+
+    first, second = asyncio.run(main())
+    assert first.is_closed
+    assert second is not first and not second.is_closed
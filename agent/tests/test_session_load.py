@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+import pytest
+
+from config import OLLAMA_MAX_CONCURRENCY
+from services.llm_client import ollama_pool
+from services.session import Session
+
+
+async def _generate_concurrently(calls: int) -> float:
+    sessions = [Session() for _ in range(calls)]
+    for session in sessions:
+        session.add_message("user", "Quiero un turno para mañana")
+
+    started = time.perf_counter()
+    responses = await asyncio.gather(*(session.generate() for session in sessions))
+    elapsed = time.perf_counter() - started
+
+    assert responses == ["Listo, te anoto."] * calls
+    return elapsed
+
+
+@pytest.mark.parametrize("calls", [4, 8])
+def test_generations_run_concurrently(fake_ollama, calls):
+    elapsed = asyncio.run(_generate_concurrently(calls))
+
+    # En serie tardaría calls * fake_ollama.seconds
+    assert fake_ollama.max_active == calls
+    assert elapsed < fake_ollama.seconds * calls / 2
+
+
+def test_throughput_scales_with_concurrency(fake_ollama):
+    # Hasta la capacidad del pool: por encima, las llamadas esperan un slot
+    capacity = OLLAMA_MAX_CONCURRENCY * len(ollama_pool.hosts)
+    results = []
+    for calls in sorted({1, 2, 4, capacity}):
+        elapsed = asyncio.run(_generate_concurrently(calls))
+        results.append((calls, calls / elapsed))
+
+    print("\nllamadas concurrentes -> generaciones/s: " + ", ".join(
+        f"{calls} -> {throughput:.1f}" for calls, throughput in results
+    ))
+    assert results[-1][1] > results[0][1] * capacity * 0.75
+
+
+def test_turn_stats_come_from_the_ollama_response(fake_ollama):
+    session = Session()
+    session.add_message("user", "Hola")
+    asyncio.run(session.generate())
+
+    [stats] = session.turn_stats
+    assert stats["eval_count"] == 8
+    assert stats["tokens_per_second"] == 50.0
+    assert stats["prompt_eval_ms"] == 20.0
@@ -0,0 +1,171 @@
+import asyncio
+
+import pytest
+
+from routes import session_route
+from services.session import Session
+from services.session_store import (
+    InMemorySessionStore,
+    SessionLockTimeout,
+    SqliteSessionStore,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemorySessionStore(ttl=60, max_sessions=10, lock_timeout=0.3)
+    return SqliteSessionStore(
+        path=str(tmp_path / "sessions.db"),
+        ttl=60,
+        max_sessions=10,
+        lock_timeout=0.3,
+        lease_ttl=0.2,
+    )
+
+
+def test_turns_of_the_same_call_are_serialized(store):
+    events = []
+
+    async def turn(name: str):
+        async with store.lock("call-1"):
+            events.append(f"{name} start")
+            await asyncio.sleep(0.05)
+            events.append(f"{name} end")
+
+    async def main():
+        await asyncio.gather(turn("a"), turn("b"))
+
+    asyncio.run(main())
+    assert events in (
+        ["a start", "a end", "b start", "b end"],
+        ["b start", "b end", "a start", "a end"],
+    )
+
+
+def test_lock_wait_times_out(store):
+    async def main():
+        async with store.lock("call-1"):
+            with pytest.raises(SessionLockTimeout):
+                async with store.lock("call-1"):
+                    pass
+
+    asyncio.run(main())
+
+
+async def _turn(store, call_sid: str) -> None:
+    async with store.lock(call_sid):
+        session = await store.get_or_create(call_sid)
+        await store.save(call_sid, session)
+
+
+def test_ttl_eviction_drops_the_lock():
+    store = InMemorySessionStore(ttl=60, max_sessions=10)
+
+    async def main():
+        await _turn(store, "call-1")
+        assert set(store._locks) == {"call-1"}
+        # La llamada se cortó sin /session/end y pasó el TTL
+        store._last_active["call-1"] -= 61
+        return await store.sweep()
+
+    assert asyncio.run(main()) == 1
+    assert store._locks == {}
+
+
+def test_lru_eviction_drops_the_lock():
+    store = InMemorySessionStore(ttl=60, max_sessions=2)
+
+    async def main():
+        for call_sid in ("call-1", "call-2", "call-3"):
+            await _turn(store, call_sid)
+        assert "call-1" not in store._locks
+        assert set(store._locks) == set(store._sessions) == {"call-2", "call-3"}
+        await store.end("call-2")
+        await store.end("call-3")
+
+    asyncio.run(main())
+    assert store.evicted_lru == 1
+    assert store._locks == {}
+
+
+def test_session_evicted_during_a_turn_drops_the_lock_on_release():
+    store = InMemorySessionStore(ttl=60, max_sessions=10)
+
+    async def main():
+        async with store.lock("call-1"):
+            await store.get_or_create("call-1")
+            store._last_active["call-1"] -= 61
+            await store.sweep()
+            # El turno sigue en curso: el lock no se puede descartar todavía
+            assert "call-1" in store._locks
+
+    asyncio.run(main())
+    assert store._locks == {}
+
+
+def test_sqlite_lease_is_renewed_while_the_turn_runs(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    # Dos stores sobre el mismo archivo, como dos workers
+    worker_a = SqliteSessionStore(path=path, lock_timeout=2, lease_ttl=0.2)
+    worker_b = SqliteSessionStore(path=path, lock_timeout=0.3, lease_ttl=0.2)
+
+    async def main():
+        async with worker_a.lock("call-1"):
+            # El turno dura varias veces el TTL del lease
+            await asyncio.sleep(0.7)
+            with pytest.raises(SessionLockTimeout):
+                async with worker_b.lock("call-1"):
+                    pass
+        async with worker_b.lock("call-1"):
+            pass
+
+    asyncio.run(main())
+
+
+def test_sqlite_lease_of_a_dead_worker_expires(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    worker_a = SqliteSessionStore(path=path, lock_timeout=1, lease_ttl=0.2)
+    worker_b = SqliteSessionStore(path=path, lock_timeout=1, lease_ttl=0.2)
+
+    async def main():
+        # Un lease que nadie renueva ni libera (el worker se cayó)
+        assert await worker_a._try_lease("call-1", "dead-worker")
+        async with worker_b.lock("call-1"):
+            pass
+
+    asyncio.run(main())
+
+
+def test_end_waits_for_the_turn_in_flight(store, monkeypatch):
+    monkeypatch.setattr(session_route, "session_store", store)
+
+    async def turn():
+        async with store.lock("call-1"):
+            session = await store.get_or_create("call-1")
+            await asyncio.sleep(0.1)
+            session.add_message("user", "hola")
+            await store.save("call-1", session)
+
+    async def main():
+        in_flight = asyncio.create_task(turn())
+        await asyncio.sleep(0.01)
+        await session_route.end_endpoint("call-1")
+        await in_flight
+        return await store.get("call-1")
+
+    assert asyncio.run(main()) is None
+
+
+def test_sqlite_roundtrip(tmp_path):
+    store = SqliteSessionStore(path=str(tmp_path / "sessions.db"))
+    session = Session()
+    session.add_message("user", "Quiero un turno")
+
+    async def main():
+        await store.save("call-1", session)
+        return await store.get("call-1"), await store.count()
+
+    restored, count = asyncio.run(main())
+    assert restored.messages == session.messages
+    assert count == 1
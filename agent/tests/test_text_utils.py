@@ -0,0 +1,29 @@
+import pytest
+
+from utils.text_utils import split_sentences
+
+
+@pytest.mark.parametrize("buffer, sentences, rest", [
+    ("", [], ""),
+    ("Hola", [], "Hola"),
+    ("Hola.", [], "Hola."),
+    ("Hola. ", ["Hola."], ""),
+    ("Hola. ¿Cómo", ["Hola."], "¿Cómo"),
+    ("¡Listo! ¿Algo más? Te", ["¡Listo!", "¿Algo más?"], "Te"),
+    ("Un momento… Ya está.\nChau", ["Un momento…", "Ya está."], "Chau"),
+    ("Son las 10.30 hs. Ok", ["Son las 10.30 hs."], "Ok"),
+])
+def test_split_sentences(buffer, sentences, rest):
+    assert split_sentences(buffer) == (sentences, rest)
+
+
+def test_streaming_tokens_yield_each_sentence_once():
+    tokens = ["Tu turno", " quedó", " confirmado.", " ¿Necesitás", " algo", " más?", " Chau"]
+    emitted, buffer = [], ""
+    for token in tokens:
+        buffer += token
+        sentences, buffer = split_sentences(buffer)
+        emitted.extend(sentences)
+
+    assert emitted == ["Tu turno quedó confirmado.", "¿Necesitás algo más?"]
+    assert buffer == "Chau"
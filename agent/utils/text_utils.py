@@ -0,0 +1,20 @@
+import re
+
+# Fin de oración: . ! ? … seguido de espacio o salto de línea
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+
+
+def split_sentences(buffer: str) -> tuple[list[str], str]:
+    """
+    Separa las oraciones completas de un texto que todavía se está generando.
+
+    Args:
+        buffer (str): Texto acumulado hasta el momento.
+
+    Returns:
+        tuple[list[str], str]: (oraciones completas, resto sin terminar)
+    """
+    parts = _SENTENCE_END.split(buffer)
+    rest = parts.pop()
+    sentences = [part.strip() for part in parts if part.strip()]
+    return sentences, rest
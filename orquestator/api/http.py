@@ -0,0 +1,60 @@
+import os
+from typing import Optional
+
+import httpx
+
+from utils.tracing import trace_headers
+
+# Tiempo máximo entre fragmentos: en streaming el agente puede tardar en
+# generar la siguiente oración
+AGENT_HTTP_TIMEOUT = float(os.getenv("AGENT_HTTP_TIMEOUT", "30"))
+AGENT_HTTP_CONNECT_TIMEOUT = float(os.getenv("AGENT_HTTP_CONNECT_TIMEOUT", "5"))
+AGENT_HTTP_MAX_CONNECTIONS = int(os.getenv("AGENT_HTTP_MAX_CONNECTIONS", "100"))
+AGENT_HTTP_MAX_KEEPALIVE = int(os.getenv("AGENT_HTTP_MAX_KEEPALIVE", "20"))
+AGENT_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("AGENT_HTTP_KEEPALIVE_EXPIRY", "30"))
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+async def _propagate_trace(request: httpx.Request) -> None:
+    """Agrega la traza actual a cada request hacia el agente."""
+    request.headers.update(trace_headers())
+
+
+def _build_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        event_hooks={"request": [_propagate_trace]},
+        timeout=httpx.Timeout(AGENT_HTTP_TIMEOUT, connect=AGENT_HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=AGENT_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=AGENT_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=AGENT_HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Devuelve el cliente HTTP compartido hacia el agente.
+
+    Reutiliza las conexiones entre turnos, así cada mensaje de la llamada no
+    paga un handshake nuevo antes de empezar a recibir la respuesta. Si el
+    cliente no fue iniciado por el lifespan de la app, se crea al primer uso.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def start_http_client() -> None:
+    """Crea el cliente compartido al iniciar la aplicación."""
+    get_http_client()
+
+
+async def close_http_client() -> None:
+    """Cierra el cliente compartido y libera el pool de conexiones."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
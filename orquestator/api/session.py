@@ -1,47 +1,98 @@
+import json
 import os
-from typing import Any, Dict
+import time
+from typing import Any, AsyncIterator, Dict
 
-import httpx
+from api.http import get_http_client
 
 AGENT_API = os.getenv("AGENT_API")
 
 
+class AgentStreamError(Exception):
+    """El agente cortó la respuesta en streaming con un evento `error`."""
+
+
 async def start_session(call_sid: str) -> Dict[str, Any]:
     """Inicia una nueva sesión"""
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"{AGENT_API}/api/session/start", params={"call_sid": call_sid}
-        )
-        response.raise_for_status()
-        return response.json()
+    client = get_http_client()
+    response = await client.post(
+        f"{AGENT_API}/api/session/start", params={"call_sid": call_sid}
+    )
+    response.raise_for_status()
+    return response.json()
 
 
 async def send_message(call_sid: str, message: str) -> Dict[str, Any]:
     """Envía un mensaje a la sesión"""
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"{AGENT_API}/api/session/send",
-            params={"call_sid": call_sid, "message": message},
-        )
+    client = get_http_client()
+    response = await client.post(
+        f"{AGENT_API}/api/session/send",
+        params={"call_sid": call_sid, "message": message},
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def stream_message(call_sid: str, message: str) -> AsyncIterator[str]:
+    """
+    Envía un mensaje a la sesión y devuelve la respuesta oración por oración.
+
+    La primera oración llega apenas el agente la genera, así la capa de voz
+    puede empezar a hablar antes de que termine la respuesta completa.
+
+    Raises:
+        AgentStreamError: Si el agente envía un evento `error` (la sesión no
+            existe o está procesando otro mensaje).
+    """
+    started = time.perf_counter()
+    first_sentence_at = None
+
+    client = get_http_client()
+    async with client.stream(
+        "POST",
+        f"{AGENT_API}/api/session/send",
+        params={"call_sid": call_sid, "message": message, "stream": True},
+    ) as response:
         response.raise_for_status()
-        return response.json()
+        event = None
+        async for line in response.aiter_lines():
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+                continue
+            if not line.startswith("data:"):
+                continue
+
+            data = json.loads(line[len("data:"):])
+            if event == "error":
+                raise AgentStreamError(data.get("detail", "Error del agente"))
+            if event == "done":
+                print(
+                    f"[{call_sid}] time_to_first_sentence "
+                    f"agente={data.get('time_to_first_sentence')}s "
+                    f"orquestador={first_sentence_at}s"
+                )
+                break
+
+            if first_sentence_at is None:
+                first_sentence_at = time.perf_counter() - started
+            yield data["sentence"]
 
 
 async def add_context(call_sid: str, context: str) -> Dict[str, Any]:
     """Agrega contexto a la sesión"""
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"{AGENT_API}/api/session/context",
-            params={"call_sid": call_sid, "context": context},
-        )
-        response.raise_for_status()
-        return response.json()
+    client = get_http_client()
+    response = await client.post(
+        f"{AGENT_API}/api/session/context",
+        params={"call_sid": call_sid, "context": context},
+    )
+    response.raise_for_status()
+    return response.json()
 
 
 async def end_session(call_sid: str):
     """Termina y elimina una sesión"""
-    async with httpx.AsyncClient() as client:
-        response = await client.delete(
-            f"{AGENT_API}/api/session/end", params={"call_sid": call_sid}
-        )
-        response.raise_for_status()
+    client = get_http_client()
+    response = await client.delete(
+        f"{AGENT_API}/api/session/end", params={"call_sid": call_sid}
+    )
+    response.raise_for_status()
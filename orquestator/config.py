@@ -1,11 +1,73 @@
+import asyncio
 import os
 import pytz
+from services.calendar_mirror import CalendarMirror
+from services.calendar_sync import CalendarSyncWorker
 from services.google_calendar import GoogleCalendarClient
+from utils.tracing import SpanExporter
 
 
 TIMEZONE = pytz.timezone(os.getenv("GOOGLE_CALENDAR_TIMEZONE", "UTC"))
 
+# Horario de atención para calcular turnos libres (días: 0=lunes ... 6=domingo)
+BUSINESS_OPEN = os.getenv("BUSINESS_OPEN", "09:00")
+BUSINESS_CLOSE = os.getenv("BUSINESS_CLOSE", "18:00")
+BUSINESS_DAYS = [int(day) for day in os.getenv("BUSINESS_DAYS", "0,1,2,3,4").split(",")]
+SLOT_MINUTES = int(os.getenv("SLOT_MINUTES", "30"))
+
+SYNC_CONCURRENCY = int(os.getenv("SYNC_CONCURRENCY", "4"))
+SYNC_BATCH_SIZE = int(os.getenv("SYNC_BATCH_SIZE", "100"))
+SYNC_POLL_INTERVAL = float(os.getenv("SYNC_POLL_INTERVAL", "30"))
+SYNC_MAX_BACKOFF = float(os.getenv("SYNC_MAX_BACKOFF", "300"))
+
+MIRROR_MAX_EVENTS = int(os.getenv("MIRROR_MAX_EVENTS", "50000"))
+MIRROR_RETENTION_DAYS = int(os.getenv("MIRROR_RETENTION_DAYS", "30"))
+MIRROR_REFRESH_INTERVAL = float(os.getenv("MIRROR_REFRESH_INTERVAL", "30"))
+
+# Exportación de trazas: JSON lines (un span OTLP por línea) y/o collector OTLP/HTTP
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "orquestator")
+TRACE_FILE = os.getenv("TRACE_FILE")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT")
+TRACE_FLUSH_INTERVAL = float(os.getenv("TRACE_FLUSH_INTERVAL", "5"))
+
+SPAN_EXPORTER = SpanExporter(
+    TRACE_SERVICE_NAME,
+    file_path=TRACE_FILE,
+    endpoint=TRACE_OTLP_ENDPOINT,
+    flush_interval=TRACE_FLUSH_INTERVAL,
+)
+
 try:
     CALENDAR_CLIENT = GoogleCalendarClient.from_env()
 except Exception:
     CALENDAR_CLIENT = None
+
+CALENDAR_SYNC = (
+    CalendarSyncWorker(
+        CALENDAR_CLIENT,
+        concurrency=SYNC_CONCURRENCY,
+        batch_size=SYNC_BATCH_SIZE,
+        poll_interval=SYNC_POLL_INTERVAL,
+        max_backoff=SYNC_MAX_BACKOFF,
+    )
+    if CALENDAR_CLIENT
+    else None
+)
+
+# El espejo usa su propio cliente: el de googleapiclient no es thread-safe y
+# el worker de sincronización usa CALENDAR_CLIENT desde otro hilo
+CALENDAR_MIRROR = (
+    CalendarMirror(
+        GoogleCalendarClient.from_env(),
+        max_events=MIRROR_MAX_EVENTS,
+        retention_days=MIRROR_RETENTION_DAYS,
+        refresh_interval=MIRROR_REFRESH_INTERVAL,
+    )
+    if CALENDAR_CLIENT
+    else None
+)
+
+# Cliente para las llamadas puntuales de los endpoints, por la misma razón.
+# Todos los endpoints lo usan de a una llamada por vez, con este lock
+CALENDAR_ENDPOINT_CLIENT = GoogleCalendarClient.from_env() if CALENDAR_CLIENT else None
+CALENDAR_ENDPOINT_LOCK = asyncio.Lock()
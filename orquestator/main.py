@@ -1,17 +1,69 @@
 import os
+from contextlib import asynccontextmanager
+
 import uvicorn
 from dotenv import load_dotenv
 from fastapi import FastAPI
+from api.http import close_http_client, start_http_client
 from routes import (
     client_route,
     appointment_route,
     google_calendar_route,
     calendar_events_route
 )
+from config import CALENDAR_MIRROR, CALENDAR_SYNC, SPAN_EXPORTER
+from services.appointment_service import day_cache
+from services.calendar_events_service import count_pending_sync
+from services.client_service import client_cache
+from supabase_conn.connection import close_supabase, get_supabase
+from utils import metrics
+from utils.request_stats import endpoint_stats, request_stats_middleware
+from utils.tracing import add_span_listener, recent_spans, tracing_middleware
 
 load_dotenv()
 
-app = FastAPI()
+SYNC_BACKLOG = metrics.Gauge(
+    "calendar_sync_backlog",
+    "Eventos de calendario pendientes de sincronizar con Google.",
+)
+SYNC_IN_FLIGHT = metrics.Gauge("calendar_sync_in_flight", "Eventos sincronizándose ahora.")
+SYNC_RETRYING = metrics.Gauge("calendar_sync_retrying", "Eventos esperando reintento.")
+SYNC_EVENTS = metrics.Counter(
+    "calendar_sync_events_total", "Eventos procesados por el worker.", labels=("outcome",)
+)
+CACHE_LOOKUPS = metrics.Counter(
+    "cache_lookups_total", "Búsquedas en los caches en memoria.", labels=("cache", "result")
+)
+CACHE_SIZE = metrics.Gauge("cache_entries", "Entradas en los caches en memoria.", labels=("cache",))
+MIRROR_EVENTS = metrics.Gauge("calendar_mirror_events", "Eventos en el espejo de Google Calendar.")
+
+add_span_listener(metrics.observe_span)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await SPAN_EXPORTER.start()
+    await start_http_client()
+    await get_supabase()
+    if CALENDAR_SYNC:
+        await CALENDAR_SYNC.start()
+    if CALENDAR_MIRROR:
+        await CALENDAR_MIRROR.start()
+    yield
+    if CALENDAR_MIRROR:
+        await CALENDAR_MIRROR.stop()
+    if CALENDAR_SYNC:
+        await CALENDAR_SYNC.stop()
+    await close_supabase()
+    await close_http_client()
+    await SPAN_EXPORTER.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(metrics.MetricsMiddleware)
+app.middleware("http")(request_stats_middleware)
+# Registrado último para quedar por fuera: la traza cubre todo el request
+app.middleware("http")(tracing_middleware)
 
 API_PREFIX = "/api/v1"
 
@@ -21,6 +73,56 @@ app.include_router(appointment_route.router, prefix=API_PREFIX)
 app.include_router(google_calendar_route.router, prefix=API_PREFIX)
 app.include_router(calendar_events_route.router, prefix=API_PREFIX)
 
+
+@app.get(f"{API_PREFIX}/stats/endpoints")
+async def endpoint_stats_endpoint():
+    """Latencia y consultas a Supabase por endpoint."""
+    return endpoint_stats.report()
+
+
+@app.get(f"{API_PREFIX}/traces")
+async def traces_endpoint(trace_id: str):
+    """
+    Spans recientes de una traza.
+
+    Para una llamada, el trace id lo da el `/traces?call_sid=` del agente:
+    la traza llega al orquestador con el mismo id.
+    """
+    return {
+        "trace_id": trace_id,
+        "spans": recent_spans(trace_id),
+        "exporter": SPAN_EXPORTER.stats(),
+    }
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Métricas en formato Prometheus."""
+    # Los valores que llevan los workers y caches se copian al exportar, así
+    # el camino de cada request no paga nada extra
+    if CALENDAR_SYNC:
+        sync = CALENDAR_SYNC.stats()
+        # Conteo exacto (con el índice parcial de migrations/007): el lote
+        # del worker está acotado y no muestra el tamaño real del backlog
+        try:
+            SYNC_BACKLOG.set(await count_pending_sync())
+        except Exception as e:
+            # Sin Supabase se exporta el resto; el backlog queda con el último valor
+            print(f"Error contando eventos pendientes: {e}")
+        SYNC_IN_FLIGHT.set(sync["in_flight"])
+        SYNC_RETRYING.set(sync["retrying"])
+        SYNC_EVENTS.set_total(sync["synced"], "synced")
+        SYNC_EVENTS.set_total(sync["failed"], "failed")
+    for name, cache in (("client", client_cache), ("day", day_cache)):
+        stats = cache.stats()
+        CACHE_LOOKUPS.set_total(stats["hits"], name, "hit")
+        CACHE_LOOKUPS.set_total(stats["misses"], name, "miss")
+        CACHE_SIZE.set(stats["size"], name)
+    if CALENDAR_MIRROR:
+        MIRROR_EVENTS.set(CALENDAR_MIRROR.stats()["events"])
+    return metrics.render()
+
+
 if __name__ == "__main__":
     host = os.getenv("HOST", "127.0.0.1")
     port = int(os.getenv("PORT", "3000"))
@@ -0,0 +1,45 @@
+-- Reserva de turnos en una sola llamada.
+--
+-- Crea la cita y su evento de calendario dentro de la misma transacción y
+-- devuelve la fila con el cliente y el evento embebidos, con la misma forma
+-- que `get_appointment`. Si falla cualquier paso no queda nada a medio
+-- escribir.
+--
+-- Aplicar desde el SQL editor de Supabase o con:
+--   psql "$DATABASE_URL" -f migrations/001_book_appointment.sql
+
+create or replace function public.book_appointment(
+    p_client_id uuid,
+    p_start_time timestamptz,
+    p_end_time timestamptz,
+    p_summary text,
+    p_description text default null
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_client public.clients;
+    v_appointment public.appointments;
+    v_event public.calendar_events;
+begin
+    select * into v_client from public.clients where id = p_client_id;
+    if not found then
+        raise exception 'Cliente no encontrado: %', p_client_id
+            using errcode = 'P0002';
+    end if;
+
+    insert into public.appointments (client_id, start_time, end_time, status, sync_status)
+    values (p_client_id, p_start_time, p_end_time, 'confirmed', 'pending')
+    returning * into v_appointment;
+
+    insert into public.calendar_events (appointment_id, summary, description, sync_status)
+    values (v_appointment.id, p_summary, p_description, 'pending')
+    returning * into v_event;
+
+    return to_jsonb(v_appointment) || jsonb_build_object(
+        'client', jsonb_build_object('name', v_client.name, 'phone', v_client.phone),
+        'calendar_events', to_jsonb(v_event)
+    );
+end;
+$$;
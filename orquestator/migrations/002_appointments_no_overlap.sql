@@ -0,0 +1,40 @@
+-- Evita turnos superpuestos.
+--
+-- La restricción de exclusión garantiza en la base que dos citas no
+-- eliminadas no se pisen, aunque lleguen dos reservas a la vez. El índice
+-- GiST que crea sobre tstzrange(start_time, end_time) es el mismo que usa
+-- `find_overlapping_appointment`, así el chequeo previo es una sola
+-- búsqueda indexada.
+--
+-- Los rangos son semiabiertos ([inicio, fin)): un turno que termina a las
+-- 10:00 no choca con uno que empieza a las 10:00.
+--
+-- Si ya hay citas superpuestas el `alter table` falla: hay que resolverlas
+-- (o marcarlas como 'deleted') antes de aplicar la migración.
+--
+-- Aplicar desde el SQL editor de Supabase o con:
+--   psql "$DATABASE_URL" -f migrations/002_appointments_no_overlap.sql
+
+create extension if not exists btree_gist;
+
+alter table public.appointments
+    add constraint appointments_no_overlap
+    exclude using gist (tstzrange(start_time, end_time, '[)') with &&)
+    where (status <> 'deleted');
+
+create or replace function public.find_overlapping_appointment(
+    p_start_time timestamptz,
+    p_end_time timestamptz,
+    p_exclude_id uuid default null
+)
+returns setof public.appointments
+language sql
+stable
+as $$
+    select *
+    from public.appointments
+    where tstzrange(start_time, end_time, '[)') && tstzrange(p_start_time, p_end_time, '[)')
+      and status <> 'deleted'
+      and (p_exclude_id is null or id <> p_exclude_id)
+    limit 1;
+$$;
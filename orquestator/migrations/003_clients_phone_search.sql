@@ -0,0 +1,52 @@
+-- Búsqueda de clientes con índices.
+--
+-- `phone_e164` es una columna generada con el teléfono normalizado: la
+-- escribe la base en cada insert/update, así que el código sigue guardando
+-- `phone` tal como llega. El índice único sobre ella resuelve la
+-- identificación del que llama con una búsqueda exacta.
+--
+-- Los índices trigram (pg_trgm) permiten que `ilike '%texto%'` sobre el
+-- nombre y `like '%dígitos%'` sobre el teléfono usen un índice en lugar de
+-- recorrer toda la tabla (para términos de 3 caracteres o más).
+--
+-- El código de país por defecto ('54') tiene que coincidir con
+-- DEFAULT_COUNTRY_CODE de utils/phone_utils.py. Si hay dos clientes
+-- con el mismo teléfono normalizado el índice único falla: hay que
+-- unificarlos antes de aplicar la migración.
+--
+-- Aplicar desde el SQL editor de Supabase o con:
+--   psql "$DATABASE_URL" -f migrations/003_clients_phone_search.sql
+
+create extension if not exists pg_trgm;
+
+create or replace function public.normalize_phone(p_phone text)
+returns text
+language sql
+immutable
+as $$
+    select case
+        when regexp_replace(coalesce(p_phone, ''), '\D', '', 'g') = '' then null
+        when btrim(p_phone) like '+%'
+            then '+' || regexp_replace(p_phone, '\D', '', 'g')
+        when regexp_replace(p_phone, '\D', '', 'g') like '00%'
+            then '+' || substr(regexp_replace(p_phone, '\D', '', 'g'), 3)
+        else '+54' || ltrim(regexp_replace(p_phone, '\D', '', 'g'), '0')
+    end;
+$$;
+
+alter table public.clients
+    add column if not exists phone_e164 text
+    generated always as (public.normalize_phone(phone)) stored;
+
+create unique index if not exists clients_phone_e164_key
+    on public.clients (phone_e164);
+
+create index if not exists clients_phone_e164_trgm_idx
+    on public.clients using gin (phone_e164 gin_trgm_ops);
+
+create index if not exists clients_name_trgm_idx
+    on public.clients using gin (name gin_trgm_ops);
+
+-- Citas de un cliente (búsqueda por teléfono y listado por cliente)
+create index if not exists appointments_client_id_idx
+    on public.appointments (client_id);
@@ -0,0 +1,22 @@
+-- Índices para la paginación por cursor.
+--
+-- Los listados ordenan por (created_at, id) o (start_time, id) y cada
+-- página filtra por "después de la última fila", así que con estos índices
+-- la página N se resuelve igual de rápido que la primera. Con `offset` la
+-- base tiene que recorrer y descartar todas las filas anteriores.
+--
+-- Aplicar desde el SQL editor de Supabase o con:
+--   psql "$DATABASE_URL" -f migrations/004_keyset_pagination.sql
+
+create index if not exists clients_created_at_id_idx
+    on public.clients (created_at desc, id desc);
+
+-- Citas de un cliente en orden (reemplaza a appointments_client_id_idx)
+create index if not exists appointments_client_start_id_idx
+    on public.appointments (client_id, start_time, id);
+
+drop index if exists public.appointments_client_id_idx;
+
+-- Exportación de todas las citas
+create index if not exists appointments_start_id_idx
+    on public.appointments (start_time, id);
@@ -0,0 +1,39 @@
+-- Reserva de turnos en lote (importación y creación masiva).
+--
+-- Recibe un array JSON de citas con su id ya generado y crea las citas y
+-- sus eventos de calendario en la misma transacción. Si una fila falla
+-- (cliente inexistente, turno superpuesto) no se escribe ninguna del lote:
+-- el código reintenta ese lote fila por fila con `book_appointment` para
+-- informar qué filas fallaron.
+--
+-- Aplicar desde el SQL editor de Supabase o con:
+--   psql "$DATABASE_URL" -f migrations/005_book_appointments.sql
+
+create or replace function public.book_appointments(p_rows jsonb)
+returns integer
+language plpgsql
+as $$
+declare
+    v_count integer;
+begin
+    insert into public.appointments (id, client_id, start_time, end_time, status, sync_status)
+    select r.id, r.client_id, r.start_time, r.end_time, 'confirmed', 'pending'
+    from jsonb_to_recordset(p_rows) as r(
+        id uuid,
+        client_id uuid,
+        start_time timestamptz,
+        end_time timestamptz
+    );
+    get diagnostics v_count = row_count;
+
+    insert into public.calendar_events (appointment_id, summary, description, sync_status)
+    select r.id, r.summary, r.description, 'pending'
+    from jsonb_to_recordset(p_rows) as r(
+        id uuid,
+        summary text,
+        description text
+    );
+
+    return v_count;
+end;
+$$;
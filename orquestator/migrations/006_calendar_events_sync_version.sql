@@ -0,0 +1,33 @@
+-- Versión de sincronización de los eventos de calendario.
+--
+-- El worker lee un evento pendiente, lo envía a Google y recién después lo
+-- marca como 'synced'. Si mientras tanto un endpoint lo vuelve a marcar
+-- pendiente (la cita se movió o se eliminó), esa marca no se puede perder:
+-- el trigger incrementa `sync_version` cada vez que la fila queda
+-- 'pending' y el worker solo la marca 'synced' si la versión sigue siendo
+-- la que leyó. Si no coincide, el evento queda pendiente para la próxima
+-- pasada.
+--
+-- Aplicar desde el SQL editor de Supabase o con:
+--   psql "$DATABASE_URL" -f migrations/006_calendar_events_sync_version.sql
+
+alter table public.calendar_events
+    add column if not exists sync_version bigint not null default 0;
+
+create or replace function public.bump_calendar_event_sync_version()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.sync_version := old.sync_version + 1;
+    return new;
+end;
+$$;
+
+drop trigger if exists calendar_events_sync_version on public.calendar_events;
+
+create trigger calendar_events_sync_version
+    before update on public.calendar_events
+    for each row
+    when (new.sync_status = 'pending')
+    execute function public.bump_calendar_event_sync_version();
@@ -0,0 +1,13 @@
+-- Índice de los eventos pendientes de sincronizar.
+--
+-- El worker lista los pendientes en orden de creación y /metrics cuenta
+-- cuántos hay (`calendar_sync_backlog`). Con un índice parcial las dos
+-- consultas recorren solo las filas pendientes, que son pocas comparadas
+-- con las ya sincronizadas, aunque el backlog crezca.
+--
+-- Aplicar desde el SQL editor de Supabase o con:
+--   psql "$DATABASE_URL" -f migrations/007_calendar_events_pending_index.sql
+
+create index if not exists calendar_events_pending_idx
+    on public.calendar_events (created_at)
+    where sync_status = 'pending';
@@ -1,12 +1,24 @@
+from models.appointment_availability import AppointmentAvailabilityRequest
+from models.appointment_batch import (
+    AppointmentBatchCreateRequest,
+    AppointmentBatchDeleteRequest,
+    AppointmentImportRow,
+)
 from models.appointment_list import AppointmentListRequest
 from models.appointment_create import AppointmentCreateRequest
+from models.appointment_search import AppointmentSearchRequest
 from models.appointment_update import AppointmentUpdateRequest
 from models.client_update import ClientUpdateRequest
 
 
 __all__ = [
+    "AppointmentAvailabilityRequest",
+    "AppointmentBatchCreateRequest",
+    "AppointmentBatchDeleteRequest",
+    "AppointmentImportRow",
     "AppointmentListRequest",
     "AppointmentCreateRequest",
+    "AppointmentSearchRequest",
     "AppointmentUpdateRequest",
     "ClientUpdateRequest",
 ]
@@ -0,0 +1,10 @@
+from datetime import date
+from typing import Optional
+from pydantic import BaseModel
+
+
+class AppointmentAvailabilityRequest(BaseModel):
+    start_day: date
+    end_day: Optional[date] = None
+    duration_minutes: Optional[int] = None
+    limit: int = 20
@@ -0,0 +1,24 @@
+from typing import Any, Optional
+from uuid import UUID
+from pydantic import BaseModel
+
+
+class AppointmentImportRow(BaseModel):
+    """Cita a crear en lote. El cliente va por ID o por nombre y teléfono."""
+    client_id: Optional[UUID] = None
+    client_name: Optional[str] = None
+    client_phone: Optional[str] = None
+    summary: str
+    description: Optional[str] = None
+    start_time: str
+    end_time: str
+
+
+class AppointmentBatchCreateRequest(BaseModel):
+    # Se validan fila por fila (`AppointmentImportRow`) para que una fila
+    # inválida quede en el reporte sin rechazar el lote entero
+    appointments: list[dict[str, Any]]
+
+
+class AppointmentBatchDeleteRequest(BaseModel):
+    ids: list[UUID]
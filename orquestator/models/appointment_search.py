@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+from typing import Optional
+
+
+class AppointmentSearchRequest(BaseModel):
+    client_phone: str
+    limit: int = 100
+    cursor: Optional[str] = None
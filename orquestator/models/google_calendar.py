@@ -14,3 +14,4 @@ class GoogleCalendarUpdate(BaseModel):
     start_rfc3339: Optional[str] = None
     end_rfc3339: Optional[str] = None
     description: Optional[str] = None
+    etag: Optional[str] = None
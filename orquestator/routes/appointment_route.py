@@ -1,191 +1,470 @@
-from config import CALENDAR_CLIENT, TIMEZONE
-from fastapi import APIRouter, HTTPException
+import asyncio
+import codecs
+import csv
+import io
+import json
+import re
+from datetime import timedelta
+from typing import AsyncIterator
+
+from config import (
+    BUSINESS_CLOSE,
+    BUSINESS_DAYS,
+    BUSINESS_OPEN,
+    CALENDAR_SYNC,
+    SLOT_MINUTES,
+    TIMEZONE
+)
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from models import (
+    AppointmentAvailabilityRequest,
+    AppointmentBatchCreateRequest,
+    AppointmentBatchDeleteRequest,
+    AppointmentImportRow,
     AppointmentCreateRequest,
     AppointmentListRequest,
+    AppointmentSearchRequest,
     AppointmentUpdateRequest
 )
 from services.appointment_service import (
+    AppointmentOverlapError,
+    book_appointment,
+    day_cache,
+    find_overlapping,
     get_appointment,
+    iter_appointments,
+    list_busy_intervals,
     list_events_by_phone_sql,
     list_events_sql,
     mark_deleted,
     upsert_appointment
 )
 from services.calendar_events_service import (
-    update_external_event_id,
     update_sync_status,
     upsert_calendar_event
 )
-from services.client_service import get_client
+from pydantic import ValidationError
+from services.appointment_import import (
+    CHUNK_SIZE as IMPORT_CHUNK_SIZE,
+    delete_appointments,
+    import_appointments
+)
+from services.availability import AvailabilityEngine
 from utils.date_utils import get_day_range, localize_datetime
+from utils.pagination import NEXT_CURSOR_HEADER, ndjson_lines, next_cursor
 
 router = APIRouter(
     prefix="/appointment",
     tags=["Appointment"]
 )
 
+availability = AvailabilityEngine(
+    timezone=TIMEZONE,
+    open_time=BUSINESS_OPEN,
+    close_time=BUSINESS_CLOSE,
+    business_days=BUSINESS_DAYS,
+    slot_minutes=SLOT_MINUTES
+)
+
+# Comillas y saltos de línea: marcan dónde termina cada registro de un CSV
+_CSV_BREAKS = re.compile(r'["\n]')
+
 
 @router.post("/list")
 async def appointment_list_endpoint(payload: AppointmentListRequest):
     start_iso, end_iso = get_day_range(payload.day, TIMEZONE)
-    return list_events_sql(start_iso, end_iso)
+    return await list_events_sql(start_iso, end_iso)
 
 
-@router.post("/create")
-async def appointment_create_endpoint(payload: AppointmentCreateRequest):
-    # 1. Obtener datos del cliente
-    client = get_client(id=payload.client_id)
-    if not client:
-        raise HTTPException(status_code=404, detail="Cliente no encontrado")
+@router.get("/cache-stats")
+async def appointment_cache_stats_endpoint():
+    """Aciertos, fallos e invalidaciones del cache de listados por día."""
+    return day_cache.stats()
 
-    client_name = client["name"]
-    client_phone = client["phone"]
 
+def _overlap_error() -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail="El horario se superpone con otro turno."
+    )
+
+
+@router.post("/availability")
+async def appointment_availability_endpoint(payload: AppointmentAvailabilityRequest):
+    """Devuelve los próximos turnos libres en un rango de días."""
+    end_day = payload.end_day or payload.start_day
+    start_iso, end_iso = availability.day_range(payload.start_day, end_day)
+
+    index = availability.build_index(await list_busy_intervals(start_iso, end_iso))
+    duration = (
+        timedelta(minutes=payload.duration_minutes)
+        if payload.duration_minutes
+        else None
+    )
+    slots = availability.free_slots(
+        index,
+        payload.start_day,
+        end_day,
+        duration=duration,
+        limit=payload.limit
+    )
+    return {"total": len(slots), "slots": slots}
+
+
+@router.post("/create")
+async def appointment_create_endpoint(payload: AppointmentCreateRequest):
     start_iso = localize_datetime(payload.start_time, TIMEZONE).isoformat()
     end_iso = localize_datetime(payload.end_time, TIMEZONE).isoformat()
 
-    # 2. Crear la cita en Supabase
-    appointment = upsert_appointment(
-        client_id=payload.client_id,
-        start_time=start_iso,
-        end_time=end_iso,
-        status="confirmed",
-        sync_status="pending"
-    )
-    appointment_id = appointment["id"]
+    # 1. Rechazar horarios ocupados antes de escribir
+    if await find_overlapping(start_iso, end_iso):
+        raise _overlap_error()
 
-    # 3. Crear el evento de calendario vinculado a la cita
-    calendar_event = upsert_calendar_event(
-        appointment_id=appointment_id,
-        summary=payload.summary,
-        description=payload.description,
-        sync_status="pending"
-    )
-    calendar_event_id = calendar_event["id"]
+    # 2. Crear cita y evento de calendario en una sola transacción. La
+    # restricción de la base cubre dos reservas simultáneas del mismo turno
+    try:
+        appointment = await book_appointment(
+            client_id=payload.client_id,
+            start_time=start_iso,
+            end_time=end_iso,
+            summary=payload.summary,
+            description=payload.description
+        )
+    except AppointmentOverlapError:
+        raise _overlap_error()
+    if not appointment:
+        raise HTTPException(status_code=404, detail="Cliente no encontrado")
 
-    # 4. Sincronizar con Google Calendar
-    if CALENDAR_CLIENT:
-        try:
-            google_resp = CALENDAR_CLIENT.create_event(
-                summary=f"{payload.summary}: {client_name}",
-                start_rfc3339=start_iso,
-                end_rfc3339=end_iso,
-                description=(
-                    f"Nombre: {client_name}\n\n"
-                    f"Tel: {client_phone}\n\n"
-                    f"{payload.description or ''}"
-                ),
-            )
+    appointment_id = appointment["id"]
 
-            g_id = google_resp.get("id")
-            if g_id:
-                update_external_event_id(id=calendar_event_id, external_event_id=g_id)
-                upsert_appointment(
-                    id=appointment_id,
-                    client_id=payload.client_id,
-                    start_time=start_iso,
-                    end_time=end_iso,
-                    status="confirmed",
-                    sync_status="synced"
-                )
-                return {"status": "confirmed", "id": appointment_id, "synced": True}
-        except Exception as e:
-            print(f"Error sincronizando Google: {e}")
+    # 3. La sincronización con Google Calendar la hace el worker en segundo plano
+    if CALENDAR_SYNC:
+        CALENDAR_SYNC.notify()
 
     return {"status": "confirmed", "id": appointment_id, "synced": False}
 
 
 @router.post("/update")
 async def appointment_update_endpoint(payload: AppointmentUpdateRequest):
-    # 1. Obtener cita actual con cliente y calendar_event anidados
-    current = get_appointment(id=payload.id)
+    new_start = localize_datetime(payload.start_time, TIMEZONE).isoformat() if payload.start_time else None
+    new_end = localize_datetime(payload.end_time, TIMEZONE).isoformat() if payload.end_time else None
+
+    # 1. Obtener cita actual con cliente y calendar_event anidados. Si vienen
+    # los dos horarios, el chequeo de superposición no depende de la cita
+    # actual y se hace en paralelo
+    overlapping = None
+    if new_start and new_end:
+        current, overlapping = await asyncio.gather(
+            get_appointment(id=payload.id),
+            find_overlapping(new_start, new_end, exclude_id=payload.id)
+        )
+    else:
+        current = await get_appointment(id=payload.id)
     if not current:
         raise HTTPException(status_code=404, detail="Cita no encontrada")
 
     current_cal = current.get("calendar_event") or {}
-    current_client = current.get("client") or {}
 
-    start_iso = (
-        localize_datetime(payload.start_time, TIMEZONE).isoformat()
-        if payload.start_time
-        else current["start_time"]
-    )
-    end_iso = (
-        localize_datetime(payload.end_time, TIMEZONE).isoformat()
-        if payload.end_time
-        else current["end_time"]
-    )
+    start_iso = new_start or current["start_time"]
+    end_iso = new_end or current["end_time"]
 
     updated_summary = payload.summary if payload.summary is not None else current_cal.get("summary")
     updated_desc = payload.description if payload.description is not None else current_cal.get("description")
 
-    upsert_appointment(
-        id=payload.id,
-        client_id=current["client_id"],
-        start_time=start_iso,
-        end_time=end_iso,
-        status=current["status"],
-        sync_status="pending"
-    )
+    moved = (start_iso, end_iso) != (current["start_time"], current["end_time"])
+    if moved and current["status"] != "deleted":
+        if not (new_start and new_end):
+            overlapping = await find_overlapping(start_iso, end_iso, exclude_id=payload.id)
+        if overlapping:
+            raise _overlap_error()
 
-    if current_cal.get("id"):
-        upsert_calendar_event(
-            id=current_cal["id"],
-            appointment_id=payload.id,
-            external_event_id=current_cal.get("external_event_id"),
-            summary=updated_summary,
-            description=updated_desc,
-            sync_status="pending"
+    async def update_appointment():
+        await upsert_appointment(
+            id=payload.id,
+            client_id=current["client_id"],
+            start_time=start_iso,
+            end_time=end_iso,
+            status=current["status"],
+            sync_status="pending",
+            refetch=False
         )
 
-    if CALENDAR_CLIENT and current_cal.get("external_event_id"):
-        try:
-            CALENDAR_CLIENT.update_event(
-                event_id=current_cal["external_event_id"],
-                summary=f"{updated_summary}: {current_client.get('name', '')}",
-                start_rfc3339=start_iso,
-                end_rfc3339=end_iso,
-                description=f"Tel: {current_client.get('phone', '')}\n{updated_desc or ''}"
-            )
-            upsert_appointment(
-                id=payload.id,
-                client_id=current["client_id"],
-                start_time=start_iso,
-                end_time=end_iso,
-                status=current["status"],
-                sync_status="synced"
+    async def update_calendar_event():
+        if current_cal.get("id"):
+            await upsert_calendar_event(
+                id=current_cal["id"],
+                appointment_id=payload.id,
+                summary=updated_summary,
+                description=updated_desc,
+                sync_status="pending",
+                refetch=False
             )
-            if current_cal.get("id"):
-                update_sync_status(id=current_cal["id"], sync_status="synced")
-        except Exception as e:
-            print(f"Error actualizando Google: {e}")
+
+    # 2. Si la cita se mueve puede chocar con otra reserva concurrente: el
+    # evento se actualiza recién cuando la cita quedó guardada. Si no, las
+    # dos escrituras son independientes
+    try:
+        if moved:
+            await update_appointment()
+            await update_calendar_event()
+        else:
+            await asyncio.gather(update_appointment(), update_calendar_event())
+    except AppointmentOverlapError:
+        raise _overlap_error()
+
+    if CALENDAR_SYNC:
+        CALENDAR_SYNC.notify()
 
     return {"status": "confirmed", "id": payload.id}
 
 
 @router.post("/delete")
 async def appointment_delete_endpoint(payload: str):
-    # 1. Obtener cita para tener el external_event_id antes de borrar
-    current = get_appointment(id=payload)
+    # 1. Obtener cita para tener su evento de calendario
+    current = await get_appointment(id=payload)
     if not current:
         raise HTTPException(status_code=404, detail="Cita no encontrada")
 
-    mark_deleted(id=payload)
+    # Secuencial a propósito: si el worker viera el evento pendiente antes
+    # de que la cita figure como eliminada, lo actualizaría en vez de borrarlo
+    await mark_deleted(id=payload)
 
-    if CALENDAR_CLIENT:
-        cal_ev = current.get("calendar_event") or {}
-        external_id = cal_ev.get("external_event_id")
-        if external_id:
-            try:
-                CALENDAR_CLIENT.delete_event(external_id)
-            except Exception as e:
-                print(f"No se pudo borrar en Google: {e}")
+    # El worker borra el evento de Google al ver la cita como eliminada
+    cal_ev = current.get("calendar_event") or {}
+    if cal_ev.get("id"):
+        await update_sync_status(id=cal_ev["id"], sync_status="pending")
+        if CALENDAR_SYNC:
+            CALENDAR_SYNC.notify()
 
     return {"ok": True}
 
 
+def _batch_report(results: list[dict]) -> dict:
+    created = sum(1 for result in results if result["status"] == "created")
+    return {
+        "total": len(results),
+        "created": created,
+        "failed": len(results) - created,
+        "results": results,
+    }
+
+
+def _validate_rows(
+    records: list,
+    from_json: bool = False,
+    start: int = 1
+) -> tuple[list[dict], list[dict]]:
+    """
+    Valida cada registro como `AppointmentImportRow`.
+
+    Returns:
+        tuple: Las filas válidas y los errores, numeradas desde `start`.
+    """
+    rows, invalid = [], []
+    for i, record in enumerate(records, start=start):
+        try:
+            if from_json:
+                record = json.loads(record)
+            # En CSV las columnas vacías llegan como ""
+            record = {key: value for key, value in record.items() if value not in ("", None)}
+            row = AppointmentImportRow(**record)
+        except (ValidationError, json.JSONDecodeError, AttributeError, TypeError) as e:
+            invalid.append({"row": i, "status": "error", "error": str(e)})
+            continue
+        # En modo json los UUID quedan como texto, listos para los filtros de PostgREST
+        rows.append({"row": i, **row.model_dump(mode="json")})
+    return rows, invalid
+
+
+async def _import(rows: list[dict], invalid: list[dict]) -> dict:
+    results = invalid + await import_appointments(rows, TIMEZONE)
+    results.sort(key=lambda result: result["row"])
+
+    # La sincronización con Google Calendar la hace el worker en segundo plano
+    if CALENDAR_SYNC:
+        CALENDAR_SYNC.notify()
+
+    return _batch_report(results)
+
+
+@router.post("/batch-create")
+async def appointment_batch_create_endpoint(payload: AppointmentBatchCreateRequest):
+    """
+    Crea varias citas en una llamada.
+
+    Cada cita indica el cliente por `client_id` o por `client_phone` (y
+    `client_name`, que se usa si hay que crearlo). Devuelve el resultado de
+    cada fila, numeradas desde 1.
+    """
+    return await _import(*_validate_rows(payload.appointments))
+
+
+@router.post("/import")
+async def appointment_import_endpoint(request: Request):
+    """
+    Importa citas desde CSV (`text/csv`, con encabezado) o NDJSON.
+
+    Las columnas son las de `batch-create`. El cuerpo se procesa a medida
+    que llega, de a `IMPORT_CHUNK_SIZE` filas: cada tanda se valida y se
+    guarda antes de leer la siguiente. La superposición entre filas de
+    distintas tandas la detecta la base. El reporte numera las filas de
+    datos desde 1.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "csv" in content_type:
+        from_json = False
+        records = _csv_records(_decoded(request.stream()))
+    elif "ndjson" in content_type or "jsonl" in content_type:
+        from_json = True
+        records = _ndjson_records(_decoded(request.stream()))
+    else:
+        raise HTTPException(
+            status_code=415,
+            detail="El cuerpo tiene que ser text/csv o application/x-ndjson"
+        )
+
+    results = []
+    first_row = 1
+    batch = []
+    try:
+        async for record in records:
+            batch.append(record)
+            if len(batch) == IMPORT_CHUNK_SIZE:
+                results += await _import_chunk(batch, first_row, from_json=from_json)
+                first_row += len(batch)
+                batch = []
+    except csv.Error as e:
+        # Se guardan las filas leídas hasta ahí y se informa dónde se cortó
+        results.append({
+            "row": first_row + len(batch),
+            "status": "error",
+            "error": f"No se pudo leer el CSV: {e}",
+        })
+    if batch:
+        results += await _import_chunk(batch, first_row, from_json=from_json)
+
+    return _batch_report(sorted(results, key=lambda result: result["row"]))
+
+
+async def _import_chunk(records: list, first_row: int, from_json: bool) -> list[dict]:
+    rows, invalid = _validate_rows(records, from_json=from_json, start=first_row)
+    results = invalid + await import_appointments(rows, TIMEZONE)
+    # La sincronización con Google la hace el worker, que empieza con esta
+    # tanda mientras se lee el resto
+    if CALENDAR_SYNC:
+        CALENDAR_SYNC.notify()
+    return results
+
+
+async def _decoded(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Texto UTF-8 (con o sin BOM) de un cuerpo que llega por partes."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+async def _csv_records(texts: AsyncIterator[str]) -> AsyncIterator[dict]:
+    """
+    Registros de un CSV que llega por partes.
+
+    Al lector de `csv` se le pasa solo el texto hasta el último salto de
+    línea que no está entre comillas, con sus fines de línea, así un campo
+    con saltos de línea adentro no queda cortado entre dos partes.
+    """
+    reader = None
+    pending = io.StringIO()
+    in_quotes = False
+    async for text in texts:
+        # Un `"` escapado como `""` cambia dos veces de estado: no altera el resultado
+        boundary = None
+        for match in _CSV_BREAKS.finditer(text):
+            if match.group() == '"':
+                in_quotes = not in_quotes
+            elif not in_quotes:
+                boundary = match.end()
+        if boundary is None:
+            pending.write(text)
+            continue
+
+        pending.write(text[:boundary])
+        complete = io.StringIO(pending.getvalue(), newline="")
+        pending = io.StringIO()
+        pending.write(text[boundary:])
+
+        # El encabezado se lee una vez y se reusa en las partes siguientes
+        fieldnames = reader.fieldnames if reader else None
+        reader = csv.DictReader(complete, fieldnames=fieldnames)
+        for record in reader:
+            yield record
+
+    fieldnames = reader.fieldnames if reader else None
+    for record in csv.DictReader(io.StringIO(pending.getvalue(), newline=""), fieldnames=fieldnames):
+        yield record
+
+
+async def _ndjson_records(texts: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Líneas no vacías de un NDJSON que llega por partes."""
+    buffer = ""
+    async for text in texts:
+        buffer += text
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+@router.post("/batch-delete")
+async def appointment_batch_delete_endpoint(payload: AppointmentBatchDeleteRequest):
+    """Marca como borradas varias citas; el worker borra sus eventos de Google."""
+    results = await delete_appointments([str(id) for id in payload.ids])
+    if CALENDAR_SYNC:
+        CALENDAR_SYNC.notify()
+
+    deleted = sum(1 for result in results if result["status"] == "deleted")
+    return {
+        "total": len(results),
+        "deleted": deleted,
+        "not_found": len(results) - deleted,
+        "results": results,
+    }
+
+
 @router.post("/search")
-async def appointment_search_endpoint(payload: str):
-    """Busca todos los turnos asociados a un número de teléfono."""
-    return list_events_by_phone_sql(payload.client_phone)
\ No newline at end of file
+async def appointment_search_endpoint(payload: AppointmentSearchRequest, response: Response):
+    """
+    Busca los turnos asociados a un número de teléfono.
+
+    Devuelve la lista de turnos, como siempre. Para pedir la página
+    siguiente pasar como `cursor` el valor de la cabecera `X-Next-Cursor`
+    (no viene si esta fue la última página).
+    """
+    try:
+        appointments = await list_events_by_phone_sql(
+            payload.client_phone,
+            limit=payload.limit,
+            cursor=payload.cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    cursor = next_cursor(appointments, "from", payload.limit)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return appointments
+
+
+@router.get("/export")
+async def appointment_export_endpoint():
+    """Exporta todas las citas como NDJSON, paginando por cursor."""
+    return StreamingResponse(
+        ndjson_lines(iter_appointments()),
+        media_type="application/x-ndjson"
+    )
\ No newline at end of file
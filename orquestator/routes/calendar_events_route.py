@@ -1,4 +1,6 @@
-from config import CALENDAR_CLIENT
+import asyncio
+
+from config import CALENDAR_ENDPOINT_CLIENT, CALENDAR_ENDPOINT_LOCK, CALENDAR_SYNC
 from fastapi import APIRouter, HTTPException
 from services.calendar_events_service import (
     delete_calendar_event,
@@ -18,24 +20,27 @@ router = APIRouter(
 @router.post("/delete")
 async def calendar_event_delete_endpoint(payload: str):
     """Elimina un evento de calendario y lo borra en Google si está sincronizado."""
-    current = get_calendar_event(id=payload)
+    current = await get_calendar_event(id=payload)
     if not current:
         raise HTTPException(status_code=404, detail="Evento de calendario no encontrado")
 
-    if CALENDAR_CLIENT and current.get("external_event_id"):
+    if CALENDAR_ENDPOINT_CLIENT and current.get("external_event_id"):
         try:
-            CALENDAR_CLIENT.delete_event(current["external_event_id"])
+            async with CALENDAR_ENDPOINT_LOCK:
+                await asyncio.to_thread(
+                    CALENDAR_ENDPOINT_CLIENT.delete_event, current["external_event_id"]
+                )
         except Exception as e:
             print(f"No se pudo borrar en Google: {e}")
 
-    delete_calendar_event(id=payload)
+    await delete_calendar_event(id=payload)
     return {"ok": True}
 
 
 @router.get("/get/{id}")
 async def calendar_event_get_endpoint(id: str):
     """Obtiene un evento de calendario por su ID interno."""
-    event = get_calendar_event(id=id)
+    event = await get_calendar_event(id=id)
     if not event:
         raise HTTPException(status_code=404, detail="Evento de calendario no encontrado")
     return event
@@ -44,7 +49,7 @@ async def calendar_event_get_endpoint(id: str):
 @router.get("/by-appointment/{appointment_id}")
 async def calendar_event_by_appointment_endpoint(appointment_id: str):
     """Obtiene el evento de calendario vinculado a una cita."""
-    event = get_calendar_event_by_appointment_id(appointment_id=appointment_id)
+    event = await get_calendar_event_by_appointment_id(appointment_id=appointment_id)
     if not event:
         raise HTTPException(status_code=404, detail="No se encontró evento para esta cita")
     return event
@@ -53,7 +58,7 @@ async def calendar_event_by_appointment_endpoint(appointment_id: str):
 @router.get("/by-external/{external_event_id}")
 async def calendar_event_by_external_endpoint(external_event_id: str):
     """Obtiene un evento de calendario por su ID externo (ej: Google Calendar)."""
-    event = get_calendar_event_by_external_id(external_event_id=external_event_id)
+    event = await get_calendar_event_by_external_id(external_event_id=external_event_id)
     if not event:
         raise HTTPException(status_code=404, detail="No se encontró evento con ese ID externo")
     return event
@@ -62,4 +67,12 @@ async def calendar_event_by_external_endpoint(external_event_id: str):
 @router.get("/pending-sync")
 async def calendar_event_pending_sync_endpoint():
     """Lista todos los eventos de calendario pendientes de sincronización."""
-    return list_pending_sync()
+    return await list_pending_sync()
+
+
+@router.get("/sync-stats")
+async def calendar_event_sync_stats_endpoint():
+    """Estado del worker de sincronización con Google Calendar."""
+    if not CALENDAR_SYNC:
+        raise HTTPException(status_code=404, detail="Google Calendar no está configurado")
+    return CALENDAR_SYNC.stats()
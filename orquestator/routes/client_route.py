@@ -1,13 +1,19 @@
 import uuid
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from utils.phone_utils import normalize_phone
 from services.client_service import (
+    DuplicatePhoneError,
+    client_cache,
     search_clients,
     upsert_client,
     get_client,
     list_clients,
     delete_client,
     get_client_with_appointments,
+    iter_clients,
 )
+from utils.pagination import ndjson_lines, next_cursor
 
 
 router = APIRouter(
@@ -16,15 +22,27 @@ router = APIRouter(
 )
 
 
+def _duplicate_phone_error() -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail="Ya existe un cliente con ese teléfono"
+    )
+
+
 @router.post("/create")
 async def create_client_endpoint(name, phone: str):
     """Crea un nuevo cliente."""
+    if not normalize_phone(phone):
+        raise HTTPException(status_code=400, detail="Teléfono inválido")
     client_id = str(uuid.uuid4())
-    result = upsert_client(
-        id=client_id,
-        name=name,
-        phone=phone
-    )
+    try:
+        result = await upsert_client(
+            id=client_id,
+            name=name,
+            phone=phone
+        )
+    except DuplicatePhoneError:
+        raise _duplicate_phone_error()
     return {
         "status": "created",
         "id": result["id"],
@@ -34,22 +52,42 @@ async def create_client_endpoint(name, phone: str):
 
 
 @router.post("/list")
-async def list_clients_endpoint(limit: int = 100, offset: int = 0):
-    """Lista todos los clientes con paginación."""
-    clients = list_clients(
-        limit=limit,
-        offset=offset
-    )
+async def list_clients_endpoint(limit: int = 100, offset: int = 0, cursor: str = None):
+    """
+    Lista todos los clientes con paginación.
+
+    Para pedir la página siguiente pasar el `next_cursor` de la respuesta;
+    `offset` se mantiene por compatibilidad.
+    """
+    try:
+        clients = await list_clients(
+            limit=limit,
+            offset=offset,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     return {
         "total": len(clients),
-        "clients": clients
+        "clients": clients,
+        "next_cursor": next_cursor(clients, "created_at", limit)
     }
 
 
+@router.get("/export")
+async def export_clients_endpoint():
+    """Exporta todos los clientes como NDJSON, paginando por cursor."""
+    return StreamingResponse(
+        ndjson_lines(iter_clients()),
+        media_type="application/x-ndjson"
+    )
+
+
 @router.get("/get")
 async def get_client_endpoint(id: str):
     """Obtiene un cliente por ID."""
-    client = get_client(id=id)
+    client = await get_client(id=id)
     if not client:
         raise HTTPException(
             status_code=404,
@@ -61,7 +99,7 @@ async def get_client_endpoint(id: str):
 @router.get("/get-with-appointments")
 async def get_client_with_appointments_endpoint(id: str):
     """Obtiene un cliente con todas sus citas."""
-    client = get_client_with_appointments(id=id)
+    client = await get_client_with_appointments(id=id)
     if not client:
         raise HTTPException(
             status_code=404,
@@ -73,7 +111,7 @@ async def get_client_with_appointments_endpoint(id: str):
 @router.put("/update/{id}")
 async def update_client_endpoint(id: str, name: str, phone: str):
     """Actualiza un cliente existente."""
-    current = get_client(id=id)
+    current = await get_client(id=id)
     if not current:
         raise HTTPException(
             status_code=404,
@@ -82,12 +120,17 @@ async def update_client_endpoint(id: str, name: str, phone: str):
     
     updated_name = name if name is not None else current["name"]
     updated_phone = phone if phone is not None else current["phone"]
+    if not normalize_phone(updated_phone):
+        raise HTTPException(status_code=400, detail="Teléfono inválido")
     
-    result = upsert_client(
-        id=id,
-        name=updated_name,
-        phone=updated_phone
-    )
+    try:
+        result = await upsert_client(
+            id=id,
+            name=updated_name,
+            phone=updated_phone
+        )
+    except DuplicatePhoneError:
+        raise _duplicate_phone_error()
     return {
         "status": "updated",
         "id": result["id"],
@@ -99,22 +142,37 @@ async def update_client_endpoint(id: str, name: str, phone: str):
 @router.delete("/delete")
 async def delete_client_endpoint(id: str):
     """Elimina un cliente por ID."""
-    current = get_client(id=id)
+    current = await get_client(id=id)
     if not current:
         raise HTTPException(
             status_code=404,
             detail="Cliente no encontrado"
         )
     
-    delete_client(id=id)
+    await delete_client(id=id)
     return {"ok": True}
 
 
 @router.get("/search")
-async def search_clients_endpoint(search_term: str):
+async def search_clients_endpoint(search_term: str, limit: int = 100, cursor: str = None):
     """Busca clientes por nombre o teléfono."""
-    results = search_clients(search_term=search_term)
+    try:
+        results = await search_clients(
+            search_term=search_term,
+            limit=limit,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     return {
         "total": len(results),
-        "clients": results
+        "clients": results,
+        "next_cursor": next_cursor(results, "created_at", limit)
     }
+
+
+@router.get("/cache-stats")
+async def client_cache_stats_endpoint():
+    """Aciertos y fallos del cache de clientes."""
+    return client_cache.stats()
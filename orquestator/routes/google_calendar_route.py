@@ -1,33 +1,72 @@
+import asyncio
+from typing import Callable, Optional
+
+from config import CALENDAR_ENDPOINT_CLIENT, CALENDAR_ENDPOINT_LOCK, CALENDAR_MIRROR
 from fastapi import APIRouter, HTTPException
-from services.google_calendar import GoogleCalendarClient
+from services.google_calendar import EventConflictError, GoogleCalendarClient
 from models.google_calendar import (
     GoogleCalendarCreate,
     GoogleCalendarUpdate,
 )
 
 
-calendar = GoogleCalendarClient.from_env()
-
 router = APIRouter(
     prefix="/google-calendar",
     tags=["Google calendar"]
 )
 
 
+def _calendar() -> GoogleCalendarClient:
+    if not CALENDAR_ENDPOINT_CLIENT:
+        raise HTTPException(status_code=404, detail="Google Calendar no está configurado")
+    return CALENDAR_ENDPOINT_CLIENT
+
+
+async def _call_google(method: Callable, **kwargs):
+    """
+    Ejecuta una llamada de googleapiclient en un hilo aparte.
+
+    Las llamadas son bloqueantes y el cliente no es thread-safe: se hacen de
+    a una, sin frenar el event loop mientras esperan a Google.
+    """
+    async with CALENDAR_ENDPOINT_LOCK:
+        return await asyncio.to_thread(method, **kwargs)
+
+
 @router.get("/list")
 async def calendar_list_endpoint(
     time_min: str,
     time_max: str,
-    max_results: int = 25
+    max_results: Optional[int] = None
 ):
+    """
+    Lista eventos del rango desde el espejo local del calendario.
+
+    Si el rango cae fuera de la ventana que cubre el espejo, se consulta a
+    Google.
+    """
     try:
-        calendars = calendar.list_events(
+        if CALENDAR_MIRROR:
+            if not CALENDAR_MIRROR.ready:
+                await CALENDAR_MIRROR.refresh()
+            if CALENDAR_MIRROR.covers(time_min, time_max):
+                return CALENDAR_MIRROR.list_events(
+                    time_min=time_min,
+                    time_max=time_max,
+                    max_results=max_results
+                )
+
+        calendars = await _call_google(
+            _calendar().list_events,
             time_min=time_min,
             time_max=time_max,
-            max_results=max_results
+            max_results=max_results or 25
         )
         return calendars
-    
+
+    except HTTPException:
+        raise
+
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -35,10 +74,20 @@ async def calendar_list_endpoint(
         )
 
 
+@router.get("/mirror-stats")
+async def calendar_mirror_stats_endpoint():
+    """Estado del espejo local de Google Calendar."""
+    if not CALENDAR_MIRROR:
+        raise HTTPException(status_code=404, detail="Google Calendar no está configurado")
+    return CALENDAR_MIRROR.stats()
+
+
 @router.post("/create")
 async def calendar_create_endpoint(payload: GoogleCalendarCreate):
+    calendar = _calendar()
     try:
-        event = calendar.create_event(
+        event = await _call_google(
+            calendar.create_event,
             summary=payload.summary,
             start_rfc3339=payload.start_rfc3339,
             end_rfc3339=payload.end_rfc3339,
@@ -55,16 +104,25 @@ async def calendar_create_endpoint(payload: GoogleCalendarCreate):
 
 @router.put("/update/{event_id}")
 async def calendar_update_endpoint(event_id: str, payload: GoogleCalendarUpdate):
+    calendar = _calendar()
     try:
-        event = calendar.update_event(
+        event = await _call_google(
+            calendar.update_event,
             event_id=event_id,
             summary=payload.summary,
             start_rfc3339=payload.start_rfc3339,
             end_rfc3339=payload.end_rfc3339,
-            description=payload.description
+            description=payload.description,
+            etag=payload.etag
         )
         return event
     
+    except EventConflictError:
+        raise HTTPException(
+            status_code=409,
+            detail="El evento fue modificado en Google Calendar, volvé a leerlo."
+        )
+
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -74,8 +132,9 @@ async def calendar_update_endpoint(event_id: str, payload: GoogleCalendarUpdate)
 
 @router.delete("/delete/{event_id}")
 async def calendar_delete_endpoint(event_id: str):
+    calendar = _calendar()
     try:
-        calendar.delete_event(event_id=event_id)
+        await _call_google(calendar.delete_event, event_id=event_id)
         return {"message": "Evento eliminado correctamente", "event_id": event_id}
     
     except Exception as e:
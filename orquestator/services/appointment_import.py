@@ -0,0 +1,181 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime
+
+import pytz
+from postgrest.exceptions import APIError
+
+from services.appointment_service import (
+    AppointmentOverlapError,
+    book_appointment,
+    book_appointments,
+    mark_deleted_many,
+)
+from services.calendar_events_service import mark_pending_by_appointment_ids
+from services.client_service import existing_client_ids, get_or_create_clients
+from utils.date_utils import localize_datetime
+from utils.phone_utils import normalize_phone
+
+# Filas por llamada a book_appointments (una transacción por lote)
+CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+# IDs o teléfonos por filtro `in`: van en la URL de PostgREST
+LOOKUP_CHUNK_SIZE = 200
+# Altas en paralelo al reintentar fila por fila un lote rechazado
+RETRY_CONCURRENCY = 8
+
+
+def _chunks(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _error(row: dict, message: str) -> dict:
+    return {"row": row["row"], "status": "error", "error": message}
+
+
+async def import_appointments(rows: list[dict], timezone: pytz.BaseTzInfo) -> list[dict]:
+    """
+    Crea citas en lote y devuelve un resultado por fila.
+
+    Cada fila trae `row` (su posición en la entrada, para el reporte) y los
+    campos de `AppointmentImportRow`. Primero se valida todo en memoria
+    (horarios, cliente, superposición dentro del mismo lote), después se
+    resuelven los clientes con unas pocas consultas `in` y se crean las citas
+    de a `CHUNK_SIZE` por transacción. Si un lote falla (por ejemplo, una
+    fila choca con un turno existente) se reintenta fila por fila para
+    informar cuáles fallaron sin perder las demás.
+
+    Returns:
+        list[dict]: `{"row", "status": "created", "id"}` o
+        `{"row", "status": "error", "error"}` por fila.
+    """
+    report = []
+    valid = []
+
+    # 1. Validación de cada fila
+    for row in rows:
+        try:
+            start = localize_datetime(row["start_time"], timezone)
+            end = localize_datetime(row["end_time"], timezone)
+        except ValueError:
+            report.append(_error(row, "Fecha inválida"))
+            continue
+        if end <= start:
+            report.append(_error(row, "El fin tiene que ser posterior al inicio"))
+            continue
+
+        phone = normalize_phone(row.get("client_phone"))
+        if not row.get("client_id") and not phone:
+            report.append(_error(row, "Falta client_id o client_phone"))
+            continue
+
+        valid.append({**row, "start": start, "end": end, "phone": phone})
+
+    # 2. Superposición dentro del mismo lote (la base solo la vería al insertar)
+    valid = _reject_overlaps(valid, report)
+
+    # 3. Clientes: los IDs se verifican y los teléfonos se crean si hacen falta
+    by_id = [row for row in valid if row.get("client_id")]
+    known_ids = set()
+    for chunk in _chunks(sorted({row["client_id"] for row in by_id}), LOOKUP_CHUNK_SIZE):
+        known_ids |= await existing_client_ids(chunk)
+
+    by_phone = {row["phone"]: row.get("client_name") or "" for row in valid if not row.get("client_id")}
+    phone_ids = {}
+    for chunk in _chunks(list(by_phone), LOOKUP_CHUNK_SIZE):
+        phone_ids.update(await get_or_create_clients({phone: by_phone[phone] for phone in chunk}))
+
+    ready = []
+    for row in valid:
+        client_id = row.get("client_id") or phone_ids.get(row["phone"])
+        if not client_id or (row.get("client_id") and client_id not in known_ids):
+            report.append(_error(row, "Cliente no encontrado"))
+            continue
+        ready.append({**row, "client_id": client_id})
+
+    # 4. Alta por lotes, con reintento fila por fila si el lote falla
+    for chunk in _chunks(ready, CHUNK_SIZE):
+        report.extend(await _book_chunk(chunk))
+
+    return sorted(report, key=lambda entry: entry["row"])
+
+
+def _reject_overlaps(rows: list[dict], report: list[dict]) -> list[dict]:
+    """Descarta las filas que se superponen con otra anterior del mismo lote."""
+    accepted = []
+    latest_end: datetime = None
+    latest_row: dict = None
+    for row in sorted(rows, key=lambda row: row["start"]):
+        if latest_end is not None and row["start"] < latest_end:
+            report.append(_error(row, f"Se superpone con la fila {latest_row['row']}"))
+            continue
+        accepted.append(row)
+        latest_end, latest_row = row["end"], row
+    return accepted
+
+
+async def _book_chunk(chunk: list[dict]) -> list[dict]:
+    payload = [
+        {
+            "id": str(uuid.uuid4()),
+            "client_id": row["client_id"],
+            "start_time": row["start"].isoformat(),
+            "end_time": row["end"].isoformat(),
+            "summary": row["summary"],
+            "description": row.get("description"),
+        }
+        for row in chunk
+    ]
+    try:
+        await book_appointments(payload)
+        return [
+            {"row": row["row"], "status": "created", "id": item["id"]}
+            for row, item in zip(chunk, payload)
+        ]
+    except (APIError, AppointmentOverlapError) as e:
+        print(f"Lote de {len(chunk)} citas rechazado, reintentando fila por fila: {e}")
+
+    slots = asyncio.Semaphore(RETRY_CONCURRENCY)
+
+    async def book_one(row: dict, item: dict) -> dict:
+        async with slots:
+            try:
+                appointment = await book_appointment(
+                    client_id=item["client_id"],
+                    start_time=item["start_time"],
+                    end_time=item["end_time"],
+                    summary=item["summary"],
+                    description=item["description"]
+                )
+            except AppointmentOverlapError:
+                return _error(row, "El horario se superpone con otro turno")
+            except APIError as e:
+                return _error(row, e.message)
+
+        if appointment is None:
+            return _error(row, "Cliente no encontrado")
+        return {"row": row["row"], "status": "created", "id": appointment["id"]}
+
+    return await asyncio.gather(*(book_one(row, item) for row, item in zip(chunk, payload)))
+
+
+async def delete_appointments(ids: list[str]) -> list[dict]:
+    """
+    Marca como borradas varias citas y deja sus eventos pendientes de sincronizar.
+
+    Returns:
+        list[dict]: `{"id", "status": "deleted" | "not_found"}` por ID.
+    """
+    deleted = set()
+    for chunk in _chunks(list(dict.fromkeys(ids)), LOOKUP_CHUNK_SIZE):
+        # Primero la cita: el worker tiene que verla eliminada al tomar el evento
+        chunk_deleted = await mark_deleted_many(chunk)
+        if chunk_deleted:
+            await mark_pending_by_appointment_ids(chunk_deleted)
+        deleted.update(chunk_deleted)
+
+    return [
+        {"id": id, "status": "deleted" if id in deleted else "not_found"}
+        for id in ids
+    ]
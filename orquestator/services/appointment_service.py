@@ -1,17 +1,48 @@
-from typing import Optional
-from supabase_conn.connection import supabase
+import os
+from typing import AsyncIterator, Optional
+from postgrest.exceptions import APIError
+from supabase_conn.connection import get_supabase
+from utils.cache import RangeCache
+from utils.pagination import after_cursor, next_cursor
+from utils.phone_utils import normalize_phone
 
+# Código que devuelve la función book_appointment cuando el cliente no existe
+CLIENT_NOT_FOUND = "P0002"
+# Violación de la restricción appointments_no_overlap (migrations/002)
+EXCLUSION_VIOLATION = "23P01"
 
-def upsert_appointment(
+
+class AppointmentOverlapError(Exception):
+    """El horario pedido se superpone con otra cita."""
+
+
+# Listados de `list_events_sql` por rango (en la práctica, por día). Las
+# escrituras de este módulo invalidan solo los días que tocan; el TTL acota
+# lo desactualizado si otro proceso escribe en la base.
+day_cache = RangeCache(
+    maxsize=int(os.getenv("DAY_CACHE_SIZE", "64")),
+    ttl=float(os.getenv("DAY_CACHE_TTL", "60")),
+)
+
+
+async def upsert_appointment(
     *,
     id: str = None,
     client_id: str,
     start_time: str,
     end_time: str,
     status: str = "confirmed",
-    sync_status: str = "pending"
+    sync_status: str = "pending",
+    refetch: bool = True
 ) -> dict:
-    """Crea o actualiza una cita. Si no se provee id, Supabase genera el UUID."""
+    """
+    Crea o actualiza una cita. Si no se provee id, Supabase genera el UUID.
+
+    Con `refetch=False` devuelve directamente la fila que retorna el upsert,
+    sin la consulta extra para traer cliente y evento de calendario
+    (`client` y `calendar_event` quedan en None).
+    """
+    supabase = await get_supabase()
     data = {
         "client_id": client_id,
         "start_time": start_time,
@@ -23,23 +54,147 @@ def upsert_appointment(
     if id:
         data["id"] = id
 
-    result = supabase.table("appointments").upsert(data).execute()
+    try:
+        result = await supabase.table("appointments").upsert(data).execute()
+    except APIError as e:
+        if e.code == EXCLUSION_VIOLATION:
+            raise AppointmentOverlapError(e.message) from e
+        raise
+    # El día anterior (si la cita se movió) lo cubre el id
+    day_cache.invalidate(id=id, at=start_time)
+
+    if not refetch:
+        return _format_appointment(result.data[0])
+
     inserted_id = id or result.data[0]["id"]
-    return get_appointment(id=inserted_id)
+    return await get_appointment(id=inserted_id)
+
+
+async def book_appointment(
+    *,
+    client_id: str,
+    start_time: str,
+    end_time: str,
+    summary: str,
+    description: str = None
+) -> Optional[dict]:
+    """
+    Crea la cita y su evento de calendario en una sola transacción.
+
+    Usa la función `book_appointment` de la base (migrations/001), que
+    devuelve la cita con el cliente y el evento de calendario embebidos.
+    Devuelve None si el cliente no existe y lanza `AppointmentOverlapError`
+    si el horario choca con otra cita.
+    """
+    supabase = await get_supabase()
+    try:
+        result = await supabase.rpc(
+            "book_appointment",
+            {
+                "p_client_id": client_id,
+                "p_start_time": start_time,
+                "p_end_time": end_time,
+                "p_summary": summary,
+                "p_description": description,
+            }
+        ).execute()
+    except APIError as e:
+        if e.code == CLIENT_NOT_FOUND:
+            return None
+        if e.code == EXCLUSION_VIOLATION:
+            raise AppointmentOverlapError(e.message) from e
+        raise
+
+    day_cache.invalidate(at=start_time)
+    return _format_appointment(result.data)
 
 
-def mark_deleted(*, id: str) -> None:
+async def book_appointments(rows: list[dict]) -> None:
+    """
+    Crea varias citas con sus eventos de calendario en una sola transacción.
+
+    Usa la función `book_appointments` de la base (migrations/005). Cada fila
+    lleva `id` (generado por el llamador), `client_id`, `start_time`,
+    `end_time`, `summary` y `description`. Si falla una fila no se escribe
+    ninguna.
+
+    Raises:
+        AppointmentOverlapError: Si algún horario choca con otra cita.
+    """
+    supabase = await get_supabase()
+    try:
+        await supabase.rpc("book_appointments", {"p_rows": rows}).execute()
+    except APIError as e:
+        if e.code == EXCLUSION_VIOLATION:
+            raise AppointmentOverlapError(e.message) from e
+        raise
+
+    for row in rows:
+        day_cache.invalidate(at=row["start_time"])
+
+
+async def find_overlapping(
+    start_time: str,
+    end_time: str,
+    exclude_id: str = None
+) -> Optional[dict]:
+    """
+    Devuelve una cita no eliminada que se superpone con el rango, o None.
+
+    Usa la función `find_overlapping_appointment` (migrations/002), que
+    resuelve la consulta con el índice GiST de la restricción de exclusión.
+    `exclude_id` permite ignorar la propia cita al moverla.
+    """
+    supabase = await get_supabase()
+    result = await supabase.rpc(
+        "find_overlapping_appointment",
+        {
+            "p_start_time": start_time,
+            "p_end_time": end_time,
+            "p_exclude_id": exclude_id,
+        }
+    ).execute()
+
+    return result.data[0] if result.data else None
+
+
+async def mark_deleted(*, id: str) -> None:
     """Marca como borrado usando el ID interno."""
+    supabase = await get_supabase()
     update_data = {
         "status": "deleted",
         "sync_status": "pending"
     }
-    supabase.table("appointments").update(update_data).eq("id", id).execute()
+    await supabase.table("appointments").update(update_data).eq("id", id).execute()
+    day_cache.invalidate(id=id)
+
+
+async def mark_deleted_many(ids: list[str]) -> list[str]:
+    """Marca como borradas varias citas. Devuelve los IDs que existían."""
+    supabase = await get_supabase()
+    result = await supabase.table("appointments").update({
+        "status": "deleted",
+        "sync_status": "pending"
+    }).in_("id", ids).execute()
+
+    deleted = [row["id"] for row in result.data]
+    for id in deleted:
+        day_cache.invalidate(id=id)
+    return deleted
 
 
-def get_appointment(*, id: str) -> Optional[dict]:
+async def update_appointment_sync_status(*, id: str, sync_status: str) -> None:
+    """Actualiza solo el estado de sincronización de una cita."""
+    supabase = await get_supabase()
+    await supabase.table("appointments").update(
+        {"sync_status": sync_status}
+    ).eq("id", id).execute()
+
+
+async def get_appointment(*, id: str) -> Optional[dict]:
     """Obtiene una cita por su ID interno con datos del cliente y del evento de calendario."""
-    result = (
+    supabase = await get_supabase()
+    result = await (
         supabase.table("appointments")
         .select("*, client:client_id(name, phone), calendar_events(*)")
         .eq("id", id)
@@ -50,8 +205,11 @@ def get_appointment(*, id: str) -> Optional[dict]:
     if not result.data:
         return None
 
-    data = result.data
+    return _format_appointment(result.data)
+
 
+def _format_appointment(data: dict) -> dict:
+    """Normaliza una fila de appointments, con sus relaciones si vinieron embebidas."""
     client_data = None
     if data.get("client"):
         client_data = {
@@ -89,9 +247,19 @@ def get_appointment(*, id: str) -> Optional[dict]:
     }
 
 
-def list_events_sql(start_iso: str, end_iso: str) -> list[dict]:
-    """Lista citas en un rango de fechas con información del cliente y del evento de calendario."""
-    result = (
+async def list_events_sql(start_iso: str, end_iso: str) -> list[dict]:
+    """
+    Lista citas en un rango de fechas con información del cliente y del evento de calendario.
+
+    El resultado se guarda en `day_cache` hasta que una escritura toque el rango.
+    """
+    cached = day_cache.get(start_iso, end_iso)
+    if cached is not None:
+        return [dict(event) for event in cached]
+
+    generation = day_cache.generation
+    supabase = await get_supabase()
+    result = await (
         supabase.table("appointments")
         .select(
             "id, start_time, end_time, "
@@ -133,21 +301,60 @@ def list_events_sql(start_iso: str, end_iso: str) -> list[dict]:
             "status": "Turno ocupado",
         })
 
-    return events
+    day_cache.set(start_iso, end_iso, events, generation)
+    return [dict(event) for event in events]
 
 
-def list_events_by_phone_sql(phone: str) -> list[dict]:
-    """Lista todas las citas de un cliente por su teléfono."""
-    result = (
+async def list_busy_intervals(start_iso: str, end_iso: str) -> list[dict]:
+    """Lista inicio y fin de las citas no eliminadas que se superponen con el rango."""
+    supabase = await get_supabase()
+    result = await (
+        supabase.table("appointments")
+        .select("start_time, end_time")
+        .neq("status", "deleted")
+        .lt("start_time", end_iso)
+        .gt("end_time", start_iso)
+        .order("start_time", desc=False)
+        .execute()
+    )
+    return result.data
+
+
+async def list_events_by_phone_sql(
+    phone: str,
+    limit: int = 100,
+    cursor: str = None
+) -> list[dict]:
+    """
+    Lista las citas de un cliente por su teléfono, paginadas por (inicio, id).
+
+    El join con `!inner` filtra las citas en la base por el teléfono
+    normalizado del cliente (índice único sobre `clients.phone_e164`).
+
+    Raises:
+        ValueError: Si el cursor no es válido.
+    """
+    phone = normalize_phone(phone)
+    if not phone:
+        return []
+
+    supabase = await get_supabase()
+    query = (
         supabase.table("appointments")
         .select(
             "id, start_time, end_time, status, "
-            "client:client_id(name, phone), "
+            "client:client_id!inner(name, phone), "
             "calendar_events(summary, description)"
         )
-        .eq("client.phone", phone)
+        .eq("client.phone_e164", phone)
         .neq("status", "deleted")
-        .order("start_time", desc=False)
+    )
+    if cursor:
+        query = query.or_(after_cursor("start_time", cursor))
+    result = await (
+        query.order("start_time", desc=False)
+        .order("id", desc=False)
+        .limit(limit)
         .execute()
     )
 
@@ -179,9 +386,19 @@ def list_events_by_phone_sql(phone: str) -> list[dict]:
     return events
 
 
-def list_events_by_client_id(client_id: str) -> list[dict]:
-    """Lista todas las citas de un cliente por su ID."""
-    result = (
+async def list_events_by_client_id(
+    client_id: str,
+    limit: int = 100,
+    cursor: str = None
+) -> list[dict]:
+    """
+    Lista las citas de un cliente por su ID, paginadas por (inicio, id).
+
+    Raises:
+        ValueError: Si el cursor no es válido.
+    """
+    supabase = await get_supabase()
+    query = (
         supabase.table("appointments")
         .select(
             "id, start_time, end_time, status, "
@@ -189,7 +406,13 @@ def list_events_by_client_id(client_id: str) -> list[dict]:
         )
         .eq("client_id", client_id)
         .neq("status", "deleted")
-        .order("start_time", desc=False)
+    )
+    if cursor:
+        query = query.or_(after_cursor("start_time", cursor))
+    result = await (
+        query.order("start_time", desc=False)
+        .order("id", desc=False)
+        .limit(limit)
         .execute()
     )
 
@@ -213,4 +436,40 @@ def list_events_by_client_id(client_id: str) -> list[dict]:
             "status": row["status"],
         })
 
-    return events
\ No newline at end of file
+    return events
+
+
+async def list_appointments(limit: int = 1000, cursor: str = None) -> list[dict]:
+    """
+    Lista todas las citas (incluidas las eliminadas), paginadas por (inicio, id).
+
+    Raises:
+        ValueError: Si el cursor no es válido.
+    """
+    supabase = await get_supabase()
+    query = supabase.table("appointments").select(
+        "id, client_id, start_time, end_time, status, sync_status, created_at, updated_at"
+    )
+    if cursor:
+        query = query.or_(after_cursor("start_time", cursor))
+
+    result = await (
+        query.order("start_time", desc=False)
+        .order("id", desc=False)
+        .limit(limit)
+        .execute()
+    )
+    return [_format_appointment(row) for row in result.data]
+
+
+async def iter_appointments(page_size: int = 1000) -> AsyncIterator[dict]:
+    """Recorre todas las citas de a una página, sin cargarlas todas en memoria."""
+    cursor = None
+    while True:
+        appointments = await list_appointments(limit=page_size, cursor=cursor)
+        for appointment in appointments:
+            yield appointment
+
+        cursor = next_cursor(appointments, "start_time", page_size)
+        if not cursor:
+            return
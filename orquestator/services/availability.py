@@ -0,0 +1,136 @@
+import bisect
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Iterator
+
+import pytz
+
+
+def _parse(value: datetime | str) -> datetime:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return value
+
+
+class IntervalIndex:
+    """
+    Intervalos ocupados agrupados por día y ordenados por inicio.
+
+    Cada día guarda los inicios ordenados y el máximo fin acumulado, así
+    saber si un rango choca con algún turno es una búsqueda binaria dentro
+    del día, aunque haya turnos superpuestos entre sí.
+    """
+
+    def __init__(self, timezone: pytz.BaseTzInfo):
+        self.timezone = timezone
+        self._starts: dict[date, list[datetime]] = {}
+        self._ends: dict[date, list[datetime]] = {}
+        self._max_end: dict[date, list[datetime]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(starts) for starts in self._starts.values())
+
+    def add(self, start: datetime | str, end: datetime | str) -> None:
+        """Agrega un intervalo ocupado en cada día que toca."""
+        start, end = _parse(start), _parse(end)
+        for day in self._days(start, end):
+            starts = self._starts.setdefault(day, [])
+            ends = self._ends.setdefault(day, [])
+            i = bisect.bisect_right(starts, start)
+            starts.insert(i, start)
+            ends.insert(i, end)
+            self._max_end[day] = self._running_max(ends)
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        """True si [start, end) se superpone con algún intervalo ocupado."""
+        for day in self._days(start, end):
+            starts = self._starts.get(day)
+            if not starts:
+                continue
+            # Candidatos: los que empiezan antes de `end`
+            i = bisect.bisect_left(starts, end)
+            if i and self._max_end[day][i - 1] > start:
+                return True
+        return False
+
+    def _days(self, start: datetime, end: datetime) -> Iterator[date]:
+        day = start.astimezone(self.timezone).date()
+        last = (end - timedelta(microseconds=1)).astimezone(self.timezone).date()
+        while day <= last:
+            yield day
+            day += timedelta(days=1)
+
+    @staticmethod
+    def _running_max(ends: list[datetime]) -> list[datetime]:
+        running = []
+        for end in ends:
+            running.append(max(end, running[-1]) if running else end)
+        return running
+
+
+class AvailabilityEngine:
+    """Calcula turnos libres según el horario de atención y los turnos ocupados."""
+
+    def __init__(
+        self,
+        timezone: pytz.BaseTzInfo,
+        open_time: str,
+        close_time: str,
+        business_days: Iterable[int],
+        slot_minutes: int,
+    ):
+        self.timezone = timezone
+        self.open_time = time.fromisoformat(open_time)
+        self.close_time = time.fromisoformat(close_time)
+        self.business_days = set(business_days)
+        self.slot = timedelta(minutes=slot_minutes)
+
+    def build_index(self, busy: Iterable[dict]) -> IntervalIndex:
+        """Arma el índice a partir de filas con `start_time` y `end_time`."""
+        index = IntervalIndex(self.timezone)
+        for row in busy:
+            index.add(row["start_time"], row["end_time"])
+        return index
+
+    def free_slots(
+        self,
+        index: IntervalIndex,
+        start_day: date,
+        end_day: date,
+        duration: timedelta = None,
+        limit: int = None,
+        now: datetime = None,
+    ) -> list[dict]:
+        """
+        Próximos turnos libres entre `start_day` y `end_day` (inclusive).
+
+        Los turnos empiezan cada `slot_minutes` dentro del horario de atención;
+        se omiten los que ya pasaron y los que chocan con un turno ocupado.
+        """
+        duration = duration or self.slot
+        now = now or datetime.now(self.timezone)
+        slots = []
+
+        day = start_day
+        while day <= end_day:
+            if day.weekday() in self.business_days:
+                slot_start = self.timezone.localize(datetime.combine(day, self.open_time))
+                close = self.timezone.localize(datetime.combine(day, self.close_time))
+                while slot_start + duration <= close:
+                    slot_end = slot_start + duration
+                    if slot_start >= now and not index.overlaps(slot_start, slot_end):
+                        slots.append({
+                            "from": slot_start.isoformat(),
+                            "to": slot_end.isoformat(),
+                        })
+                        if limit and len(slots) >= limit:
+                            return slots
+                    slot_start += self.slot
+            day += timedelta(days=1)
+
+        return slots
+
+    def day_range(self, start_day: date, end_day: date) -> tuple[str, str]:
+        """Rango ISO que cubre desde el inicio de `start_day` hasta el fin de `end_day`."""
+        start = self.timezone.localize(datetime.combine(start_day, time.min))
+        end = self.timezone.localize(datetime.combine(end_day, time.max))
+        return start.isoformat(), end.isoformat()
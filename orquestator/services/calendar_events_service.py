@@ -1,20 +1,27 @@
 from typing import Optional
-from supabase_conn.connection import supabase
+from services.appointment_service import day_cache
+from supabase_conn.connection import get_supabase
 
 
-def upsert_calendar_event(
+async def upsert_calendar_event(
     *,
     id: str = None,
     appointment_id: str,
     external_event_id: str = None,
     summary: str,
     description: str = None,
-    sync_status: str = "pending"
+    sync_status: str = "pending",
+    refetch: bool = True
 ) -> dict:
-    """Crea o actualiza un evento de calendario. Si no se provee id, Supabase genera el UUID."""
+    """
+    Crea o actualiza un evento de calendario. Si no se provee id, Supabase genera el UUID.
+
+    Con `refetch=False` devuelve directamente la fila que retorna el upsert,
+    sin la consulta extra para traer la cita (`appointment` queda en None).
+    """
+    supabase = await get_supabase()
     data = {
         "appointment_id": appointment_id,
-        "external_event_id": external_event_id,
         "summary": summary,
         "description": description,
         "sync_status": sync_status,
@@ -22,15 +29,25 @@ def upsert_calendar_event(
 
     if id:
         data["id"] = id
+    # Si no viene no se toca: el worker pudo haberlo guardado después de
+    # que el llamador leyó la fila
+    if external_event_id:
+        data["external_event_id"] = external_event_id
+
+    result = await supabase.table("calendar_events").upsert(data).execute()
+    # El listado por día muestra el título y la descripción del evento
+    day_cache.invalidate(id=appointment_id)
+    if not refetch:
+        return _format_calendar_event(result.data[0])
 
-    result = supabase.table("calendar_events").upsert(data).execute()
     inserted_id = id or result.data[0]["id"]
-    return get_calendar_event(id=inserted_id)
+    return await get_calendar_event(id=inserted_id)
 
 
-def get_calendar_event(*, id: str) -> Optional[dict]:
+async def get_calendar_event(*, id: str) -> Optional[dict]:
     """Obtiene un evento de calendario por su ID interno."""
-    result = (
+    supabase = await get_supabase()
+    result = await (
         supabase.table("calendar_events")
         .select("*, appointment:appointment_id(id, start_time, end_time, status, client_id)")
         .eq("id", id)
@@ -41,8 +58,11 @@ def get_calendar_event(*, id: str) -> Optional[dict]:
     if not result.data:
         return None
 
-    data = result.data
+    return _format_calendar_event(result.data)
 
+
+def _format_calendar_event(data: dict) -> dict:
+    """Normaliza una fila de calendar_events, con su cita si vino embebida."""
     appointment_data = None
     if data.get("appointment"):
         appt = data["appointment"]
@@ -67,9 +87,10 @@ def get_calendar_event(*, id: str) -> Optional[dict]:
     }
 
 
-def get_calendar_event_by_appointment_id(*, appointment_id: str) -> Optional[dict]:
+async def get_calendar_event_by_appointment_id(*, appointment_id: str) -> Optional[dict]:
     """Obtiene el evento de calendario vinculado a una cita."""
-    result = (
+    supabase = await get_supabase()
+    result = await (
         supabase.table("calendar_events")
         .select("*")
         .eq("appointment_id", appointment_id)
@@ -93,9 +114,10 @@ def get_calendar_event_by_appointment_id(*, appointment_id: str) -> Optional[dic
     }
 
 
-def get_calendar_event_by_external_id(*, external_event_id: str) -> Optional[dict]:
+async def get_calendar_event_by_external_id(*, external_event_id: str) -> Optional[dict]:
     """Obtiene un evento de calendario por su ID externo (ej: Google Calendar)."""
-    result = (
+    supabase = await get_supabase()
+    result = await (
         supabase.table("calendar_events")
         .select("*")
         .eq("external_event_id", external_event_id)
@@ -119,32 +141,71 @@ def get_calendar_event_by_external_id(*, external_event_id: str) -> Optional[dic
     }
 
 
-def update_sync_status(*, id: str, sync_status: str) -> None:
+async def update_sync_status(*, id: str, sync_status: str) -> None:
     """Actualiza el estado de sincronización de un evento de calendario."""
-    supabase.table("calendar_events").update(
+    supabase = await get_supabase()
+    await supabase.table("calendar_events").update(
         {"sync_status": sync_status}
     ).eq("id", id).execute()
 
 
-def update_external_event_id(*, id: str, external_event_id: str) -> None:
-    """Actualiza el ID externo y marca como synced."""
-    supabase.table("calendar_events").update(
-        {"external_event_id": external_event_id, "sync_status": "synced"}
-    ).eq("id", id).execute()
+async def mark_pending_by_appointment_ids(appointment_ids: list[str]) -> None:
+    """Deja pendientes de sincronizar los eventos de varias citas."""
+    supabase = await get_supabase()
+    await supabase.table("calendar_events").update(
+        {"sync_status": "pending"}
+    ).in_("appointment_id", appointment_ids).execute()
+
+
+async def mark_synced(*, id: str, sync_version: int, external_event_id: str = None) -> bool:
+    """
+    Marca el evento como synced si nadie lo volvió a dejar pendiente.
+
+    Solo escribe si `sync_version` sigue siendo la que leyó el worker (el
+    trigger de la migración 006 la incrementa en cada marca 'pending'). Si
+    no coincide el evento queda pendiente; el `external_event_id` de un
+    evento recién creado en Google se guarda igual, para que la próxima
+    pasada lo actualice en vez de crear otro.
+
+    Returns:
+        bool: True si el evento quedó synced.
+    """
+    supabase = await get_supabase()
+    data = {"sync_status": "synced"}
+    if external_event_id:
+        data["external_event_id"] = external_event_id
+    result = await (
+        supabase.table("calendar_events")
+        .update(data)
+        .eq("id", id)
+        .eq("sync_version", sync_version)
+        .execute()
+    )
+    if result.data:
+        return True
 
+    if external_event_id:
+        await supabase.table("calendar_events").update(
+            {"external_event_id": external_event_id}
+        ).eq("id", id).execute()
+    return False
 
-def list_pending_sync() -> list[dict]:
-    """Lista todos los eventos de calendario con sync_status 'pending'."""
-    result = (
+
+async def list_pending_sync(limit: int = None) -> list[dict]:
+    """Lista los eventos de calendario con sync_status 'pending', del más viejo al más nuevo."""
+    supabase = await get_supabase()
+    query = (
         supabase.table("calendar_events")
         .select(
             "id, appointment_id, external_event_id, summary, description, sync_status, "
-            "appointment:appointment_id(start_time, end_time, status)"
+            "sync_version, appointment:appointment_id(start_time, end_time, status, client:client_id(name, phone))"
         )
         .eq("sync_status", "pending")
         .order("created_at", desc=False)
-        .execute()
     )
+    if limit:
+        query = query.limit(limit)
+    result = await query.execute()
 
     events = []
     for row in result.data:
@@ -155,6 +216,7 @@ def list_pending_sync() -> list[dict]:
                 "start_time": appt["start_time"],
                 "end_time": appt["end_time"],
                 "status": appt["status"],
+                "client": appt.get("client"),
             }
 
         events.append({
@@ -164,12 +226,27 @@ def list_pending_sync() -> list[dict]:
             "summary": row["summary"],
             "description": row.get("description"),
             "sync_status": row["sync_status"],
+            "sync_version": row["sync_version"],
             "appointment": appointment_data,
         })
 
     return events
 
 
-def delete_calendar_event(*, id: str) -> None:
+async def count_pending_sync() -> int:
+    """Cantidad exacta de eventos con sync_status 'pending' (sin traer filas)."""
+    supabase = await get_supabase()
+    result = await (
+        supabase.table("calendar_events")
+        .select("id", count="exact", head=True)
+        .eq("sync_status", "pending")
+        .execute()
+    )
+    return result.count or 0
+
+
+async def delete_calendar_event(*, id: str) -> None:
     """Elimina un evento de calendario por su ID interno."""
-    supabase.table("calendar_events").delete().eq("id", id).execute()
\ No newline at end of file
+    supabase = await get_supabase()
+    await supabase.table("calendar_events").delete().eq("id", id).execute()
+    day_cache.clear()
\ No newline at end of file
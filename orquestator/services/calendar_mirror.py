@@ -0,0 +1,229 @@
+import asyncio
+import bisect
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from googleapiclient.errors import HttpError
+
+from services.google_calendar import GoogleCalendarClient
+from utils.tracing import span, start_trace
+
+# Campos del evento de Google que se guardan en el espejo
+_EVENT_FIELDS = ("id", "status", "summary", "description", "start", "end", "etag", "updated")
+
+
+def _parse_time(value: dict | str) -> datetime:
+    """Convierte un `start`/`end` de Google (o un RFC3339) a datetime en UTC."""
+    if isinstance(value, dict):
+        value = value.get("dateTime") or value.get("date")
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+class CalendarMirror:
+    """
+    Copia local de Google Calendar mantenida con sync incremental.
+
+    La primera sincronización trae todos los eventos (con paginación); las
+    siguientes usan el `nextSyncToken` para traer solo los cambios. Si Google
+    invalida el token (410) se vuelve a hacer una sincronización completa.
+
+    Las consultas por rango se responden desde memoria con búsqueda binaria
+    sobre los eventos ordenados por inicio. Para acotar la memoria se
+    descartan los eventos que terminaron hace más de `retention_days` y, si
+    se supera `max_events`, los que empiezan más lejos en el futuro: el
+    espejo pasa a cubrir solo hasta `horizon` y `covers` indica si un rango
+    se puede responder desde memoria. Los cambios que llegan después del
+    horizonte se ignoran hasta la próxima sincronización completa.
+    """
+
+    def __init__(
+        self,
+        calendar: GoogleCalendarClient,
+        max_events: int = 50_000,
+        retention_days: int = 30,
+        refresh_interval: float = 30,
+    ):
+        self.calendar = calendar
+        self.max_events = max_events
+        self.retention_days = retention_days
+        self.refresh_interval = refresh_interval
+        self.sync_token: Optional[str] = None
+        self.last_sync: Optional[datetime] = None
+        # Inicio del primer evento descartado por `max_events`; None si no hay límite
+        self.horizon: Optional[datetime] = None
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+        self._events: dict[str, dict] = {}
+        self._bounds: dict[str, tuple[datetime, datetime]] = {}
+        # (inicio, fin, id) ordenado por inicio; se reconstruye si hubo cambios
+        self._index: list[tuple[datetime, datetime, str]] = []
+        self._index_dirty = False
+        self._max_span = timedelta(0)
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.sync_token is not None
+
+    async def refresh(self) -> None:
+        """Trae los cambios desde Google y los aplica al espejo."""
+        async with self._lock:
+            token = self.sync_token
+            try:
+                items, next_token = await asyncio.to_thread(self.calendar.sync_events, token)
+            except HttpError as e:
+                if e.resp.status != 410:
+                    raise
+                print("Sync token de Google Calendar inválido, sincronización completa")
+                token = None
+                items, next_token = await asyncio.to_thread(self.calendar.sync_events, None)
+
+            if token is None:
+                self._events.clear()
+                self._bounds.clear()
+                self.horizon = None
+                self._index_dirty = True
+                self.full_syncs += 1
+            else:
+                self.incremental_syncs += 1
+
+            for item in items:
+                self._apply(item)
+            self._trim()
+
+            self.sync_token = next_token
+            self.last_sync = datetime.now(timezone.utc)
+
+    def covers(self, time_min: Optional[str] = None, time_max: Optional[str] = None) -> bool:
+        """
+        True si el espejo tiene todos los eventos que se superponen con el rango.
+
+        No cubre rangos que empiezan antes de la retención (esos eventos se
+        descartaron) ni que terminan después del horizonte.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.retention_days)
+        if time_min is None or _parse_time(time_min) < cutoff:
+            return False
+        if self.horizon is not None and (time_max is None or _parse_time(time_max) > self.horizon):
+            return False
+        return True
+
+    def list_events(
+        self,
+        time_min: Optional[str] = None,
+        time_max: Optional[str] = None,
+        max_results: Optional[int] = None,
+    ) -> dict:
+        """
+        Eventos que se superponen con el rango, ordenados por inicio.
+
+        Devuelve la misma forma que `events().list` (`{"items": [...]}`).
+        """
+        if self._index_dirty:
+            self._rebuild_index()
+
+        start = _parse_time(time_min) if time_min else None
+        end = _parse_time(time_max) if time_max else None
+
+        # Solo pueden superponerse los eventos que empiezan antes del fin y
+        # después de (inicio - duración del evento más largo)
+        first = bisect.bisect_left(self._index, (start - self._max_span,)) if start else 0
+        stop = bisect.bisect_left(self._index, (end,)) if end else len(self._index)
+        items = []
+        for _, ev_end, event_id in self._index[first:stop]:
+            if start and ev_end <= start:
+                continue
+            items.append(self._events[event_id])
+            if max_results and len(items) >= max_results:
+                break
+
+        return {"items": items}
+
+    def stats(self) -> dict:
+        return {
+            "events": len(self._events),
+            "ready": self.ready,
+            "last_sync": self.last_sync.isoformat() if self.last_sync else None,
+            "horizon": self.horizon.isoformat() if self.horizon else None,
+            "full_syncs": self.full_syncs,
+            "incremental_syncs": self.incremental_syncs,
+        }
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                with start_trace(), span("calendar_mirror.refresh"):
+                    await self.refresh()
+            except Exception as e:
+                print(f"Error sincronizando el espejo de Google Calendar: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def _apply(self, item: dict) -> None:
+        event_id = item["id"]
+        if item.get("status") == "cancelled" or "start" not in item:
+            self._remove(event_id)
+            return
+
+        start = _parse_time(item["start"])
+        if self.horizon is not None and start >= self.horizon:
+            # Fuera de la ventana cubierta: si estaba adentro y se movió, sale
+            self._remove(event_id)
+            return
+
+        self._events[event_id] = {key: item[key] for key in _EVENT_FIELDS if key in item}
+        self._bounds[event_id] = (start, _parse_time(item["end"]))
+        self._index_dirty = True
+
+    def _remove(self, event_id: str) -> None:
+        if self._events.pop(event_id, None) is not None:
+            self._bounds.pop(event_id, None)
+            self._index_dirty = True
+
+    def _trim(self) -> None:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.retention_days)
+        drop = [event_id for event_id, (_, end) in self._bounds.items() if end < cutoff]
+
+        excess = len(self._bounds) - len(drop) - self.max_events
+        if excess > 0:
+            # Se achica la ventana desde el final: los eventos próximos son los
+            # que más se consultan y el sync incremental no los vuelve a enviar
+            dropped = set(drop)
+            remaining = sorted(
+                (start, event_id)
+                for event_id, (start, _) in self._bounds.items()
+                if event_id not in dropped
+            )
+            self.horizon = remaining[-excess][0]
+            drop.extend(event_id for start, event_id in remaining if start >= self.horizon)
+
+        for event_id in drop:
+            del self._events[event_id]
+            del self._bounds[event_id]
+        if drop:
+            self._index_dirty = True
+
+    def _rebuild_index(self) -> None:
+        self._index = sorted(
+            (start, end, event_id) for event_id, (start, end) in self._bounds.items()
+        )
+        self._max_span = max(
+            (end - start for start, end, _ in self._index), default=timedelta(0)
+        )
+        self._index_dirty = False
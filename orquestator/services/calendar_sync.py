@@ -0,0 +1,219 @@
+import asyncio
+import time
+from typing import Optional
+
+from services.appointment_service import update_appointment_sync_status
+from services.calendar_events_service import list_pending_sync, mark_synced
+from services.google_calendar import GoogleCalendarClient, is_gone
+from utils.tracing import span, start_trace
+
+
+def event_summary(summary: str, client: dict) -> str:
+    """Título del evento en Google Calendar."""
+    return f"{summary}: {client.get('name', '')}"
+
+
+def event_description(description: Optional[str], client: dict) -> str:
+    """Descripción del evento en Google Calendar."""
+    return (
+        f"Nombre: {client.get('name', '')}\n\n"
+        f"Tel: {client.get('phone', '')}\n\n"
+        f"{description or ''}"
+    )
+
+
+class CalendarSyncWorker:
+    """
+    Sincroniza con Google Calendar los eventos con sync_status 'pending'.
+
+    Los endpoints de citas solo escriben en la base y llaman a `notify`; el
+    worker toma los pendientes en segundo plano y los envía a Google en
+    requests batch (hasta 50 operaciones por request). Después marca cada
+    fila según su resultado, con un máximo de `concurrency` escrituras en
+    paralelo. Si una operación falla el evento queda pendiente y se
+    reintenta con backoff exponencial.
+    """
+
+    def __init__(
+        self,
+        calendar: GoogleCalendarClient,
+        concurrency: int = 4,
+        batch_size: int = 100,
+        poll_interval: float = 30,
+        base_backoff: float = 2,
+        max_backoff: float = 300,
+    ):
+        self.calendar = calendar
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._in_flight: set[str] = set()
+        # id -> (intentos fallidos, momento del próximo intento)
+        self._retries: dict[str, tuple[int, float]] = {}
+        self.synced = 0
+        self.failed = 0
+        # Filas del último lote leído (está acotado por batch_size: no es el
+        # total pendiente, para eso está `count_pending_sync`)
+        self.last_batch = 0
+
+    def notify(self) -> None:
+        """Avisa al worker que hay eventos nuevos para sincronizar."""
+        self._wakeup.set()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "last_batch": self.last_batch,
+            "in_flight": len(self._in_flight),
+            "retrying": len(self._retries),
+            "synced": self.synced,
+            "failed": self.failed,
+        }
+
+    async def run_once(self) -> int:
+        """Sincroniza un lote de pendientes. Devuelve cuántos se sincronizaron."""
+        # Los que esperan reintento no deben tapar a los nuevos
+        limit = self.batch_size + len(self._retries)
+        pending = await list_pending_sync(limit=limit)
+        self.last_batch = len(pending)
+
+        if len(pending) < limit:
+            # Lista completa: se olvidan los reintentos de eventos que ya no están pendientes
+            pending_ids = {row["id"] for row in pending}
+            for event_id in list(self._retries):
+                if event_id not in pending_ids:
+                    self._retries.pop(event_id)
+
+        now = time.monotonic()
+        due = [
+            row for row in pending
+            if row["id"] not in self._in_flight
+            and self._retries.get(row["id"], (0, 0))[1] <= now
+        ]
+        if not due:
+            return 0
+
+        ids = {row["id"] for row in due}
+        self._in_flight |= ids
+        try:
+            operations = [self._operation(row) for row in due]
+            to_send = [i for i, op in enumerate(operations) if op["op"] != "skip"]
+
+            results = [(None, None)] * len(due)
+            if to_send:
+                # El cliente de Google no es thread-safe: un solo hilo por lote
+                sent = await asyncio.to_thread(
+                    self.calendar.batch_execute,
+                    [operations[i] for i in to_send],
+                )
+                for i, result in zip(to_send, sent):
+                    results[i] = result
+
+            slots = asyncio.Semaphore(self.concurrency)
+
+            async def run(row: dict, operation: dict, result: tuple) -> bool:
+                async with slots:
+                    return await self._complete(row, operation, *result)
+
+            synced = await asyncio.gather(*(
+                run(row, operation, result)
+                for row, operation, result in zip(due, operations, results)
+            ))
+        finally:
+            self._in_flight -= ids
+
+        failed = len(due) - sum(synced)
+        if failed:
+            print(f"Lote de sincronización: {sum(synced)} ok, {failed} con error")
+        return sum(synced)
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                # Cada lote es su propia traza: no hay request que lo origine
+                with start_trace(), span("calendar_sync.run_once") as attributes:
+                    synced = await self.run_once()
+                    attributes["synced"] = synced
+            except Exception as e:
+                print(f"Error sincronizando pendientes: {e}")
+                synced = 0
+
+            # Si el lote vino lleno y avanzó, seguir drenando sin esperar
+            if synced and self.last_batch >= self.batch_size:
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def _operation(self, row: dict) -> dict:
+        """Operación de Google Calendar que refleja el estado actual de la fila."""
+        appointment = row.get("appointment") or {}
+        client = appointment.get("client") or {}
+        external_id = row.get("external_event_id")
+
+        if appointment.get("status") == "deleted":
+            if external_id:
+                return {"op": "delete", "event_id": external_id}
+            return {"op": "skip"}
+
+        fields = {
+            "summary": event_summary(row["summary"], client),
+            "start_rfc3339": appointment.get("start_time"),
+            "end_rfc3339": appointment.get("end_time"),
+            "description": event_description(row.get("description"), client),
+        }
+        if external_id:
+            return {"op": "update", "event_id": external_id, **fields}
+        return {"op": "insert", **fields}
+
+    async def _complete(self, row: dict, operation: dict, response, error) -> bool:
+        """Guarda en la base el resultado de la operación de una fila."""
+        event_id = row["id"]
+        # Un delete de un evento que ya no existe en Google cuenta como hecho
+        if error is not None and not (operation["op"] == "delete" and is_gone(error)):
+            self._fail(event_id, error)
+            return False
+
+        try:
+            # Si la fila se volvió a marcar pendiente durante la llamada a
+            # Google queda pendiente: la próxima pasada envía el cambio nuevo
+            synced = await mark_synced(
+                id=event_id,
+                sync_version=row["sync_version"],
+                external_event_id=response["id"] if operation["op"] == "insert" else None,
+            )
+            if synced:
+                await update_appointment_sync_status(id=row["appointment_id"], sync_status="synced")
+        except Exception as e:
+            self._fail(event_id, e)
+            return False
+
+        self._retries.pop(event_id, None)
+        self.synced += 1
+        return True
+
+    def _fail(self, event_id: str, error: Exception) -> None:
+        attempts = self._retries.get(event_id, (0, 0))[0] + 1
+        delay = min(self.base_backoff * 2 ** attempts, self.max_backoff)
+        self._retries[event_id] = (attempts, time.monotonic() + delay)
+        self.failed += 1
+        print(f"Error sincronizando evento {event_id} (intento {attempts}): {error}")
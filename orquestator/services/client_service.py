@@ -1,42 +1,114 @@
-from typing import Optional
-from supabase_conn.connection import supabase
+import os
+import uuid
+from typing import AsyncIterator, Optional
+from postgrest.exceptions import APIError
+from services.appointment_service import day_cache
+from supabase_conn.connection import get_supabase
+from utils.cache import TTLCache
+from utils.pagination import after_cursor, next_cursor
+from utils.phone_utils import normalize_phone, phone_digits
 
+# Violación del índice único sobre phone_e164 (migrations/003)
+UNIQUE_VIOLATION = "23505"
 
-def upsert_client(
+
+class DuplicatePhoneError(Exception):
+    """Ya existe otro cliente con el mismo teléfono normalizado."""
+
+
+# Clientes por "id:<id>" y "phone:<teléfono E.164>". Cada llamada entrante busca
+# al cliente por teléfono, así que los que vuelven a llamar se resuelven sin
+# ir a Supabase. El TTL acota cuánto puede quedar desactualizado si otro
+# proceso modifica el cliente.
+client_cache = TTLCache(
+    maxsize=int(os.getenv("CLIENT_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("CLIENT_CACHE_TTL", "300")),
+)
+
+
+async def upsert_client(
     *,
     id: str,
     name: str,
     phone: str
 ) -> dict:
-    """Crea o actualiza un cliente."""
+    """
+    Crea o actualiza un cliente. Devuelve la fila que retorna el upsert.
+
+    Raises:
+        DuplicatePhoneError: Si el teléfono ya es de otro cliente.
+    """
+    supabase = await get_supabase()
     data = {
         "id": id,
         "name": name,
         "phone": phone,
     }
-    
-    supabase.table("clients").upsert(data).execute()
-    return get_client(id=id)
+
+    try:
+        result = await supabase.table("clients").upsert(data).execute()
+    except APIError as e:
+        if e.code == UNIQUE_VIOLATION:
+            raise DuplicatePhoneError(e.message) from e
+        raise
+    client = _format_client(result.data[0])
+
+    _forget_client(id)
+    _remember_client(client)
+    # Los listados por día incluyen nombre y teléfono del cliente
+    day_cache.clear()
+    return dict(client)
 
 
-def get_client(*, id: str = None, phone: str = None) -> Optional[dict]:
-    """Obtiene un cliente por ID o por teléfono."""
+async def get_client(*, id: str = None, phone: str = None) -> Optional[dict]:
+    """
+    Obtiene un cliente por ID o por teléfono.
+
+    El teléfono se normaliza a E.164 y se busca por igualdad sobre
+    `phone_e164` (índice único, migrations/003), así "011 4444-5555" y
+    "+54 11 4444 5555" encuentran al mismo cliente.
+    """
+    if not id:
+        phone = normalize_phone(phone)
     if not id and not phone:
         return None
+
+    cached = client_cache.get(f"id:{id}" if id else f"phone:{phone}")
+    if cached is not None:
+        return dict(cached)
     
+    supabase = await get_supabase()
     query = supabase.table("clients").select(
         "id, name, phone, created_at, updated_at"
     )
     
     if id:
-        result = query.eq("id", id).single().execute()
+        result = await query.eq("id", id).single().execute()
     else:
-        result = query.eq("phone", phone).single().execute()
+        result = await query.eq("phone_e164", phone).single().execute()
     
     if not result.data:
         return None
     
-    data = result.data
+    client = _format_client(result.data)
+    _remember_client(client)
+    return dict(client)
+
+
+def _remember_client(client: dict) -> None:
+    client_cache.set(f"id:{client['id']}", client)
+    client_cache.set(f"phone:{normalize_phone(client['phone'])}", client)
+
+
+def _forget_client(id: str) -> None:
+    """Saca del cache al cliente, incluida la clave de su teléfono anterior."""
+    cached = client_cache.peek(f"id:{id}")
+    if cached is not None:
+        client_cache.delete(f"phone:{normalize_phone(cached['phone'])}")
+    client_cache.delete(f"id:{id}")
+
+
+def _format_client(data: dict) -> dict:
     return {
         "id": data["id"],
         "name": data["name"],
@@ -46,87 +118,203 @@ def get_client(*, id: str = None, phone: str = None) -> Optional[dict]:
     }
 
 
-def list_clients(limit: int = 100, offset: int = 0) -> list[dict]:
-    """Lista todos los clientes con paginación."""
-    result = (
+async def list_clients(
+    limit: int = 100,
+    offset: int = 0,
+    cursor: str = None
+) -> list[dict]:
+    """
+    Lista todos los clientes con paginación, de los más nuevos a los más viejos.
+
+    Con `cursor` (el `next_cursor` de la página anterior) pagina por
+    (created_at, id) y se ignora `offset`, que se mantiene por
+    compatibilidad pero se vuelve más lento cuanto más profunda es la página.
+
+    Raises:
+        ValueError: Si el cursor no es válido.
+    """
+    supabase = await get_supabase()
+    query = (
         supabase.table("clients")
         .select("id, name, phone, created_at, updated_at")
         .order("created_at", desc=True)
-        .limit(limit)
-        .range(offset, offset + limit - 1)
-        .execute()
+        .order("id", desc=True)
     )
+    if cursor:
+        query = query.or_(after_cursor("created_at", cursor, desc=True)).limit(limit)
+    else:
+        query = query.range(offset, offset + limit - 1)
+
+    result = await query.execute()
     
-    clients = []
-    for row in result.data:
-        clients.append({
-            "id": row["id"],
-            "name": row["name"],
-            "phone": row["phone"],
-            "created_at": row["created_at"],
-            "updated_at": row["updated_at"],
-        })
-    
-    return clients
+    return [_format_client(row) for row in result.data]
 
 
-def delete_client(*, id: str) -> None:
-    """Elimina un cliente (hard delete)."""
-    supabase.table("clients").delete().eq("id", id).execute()
+async def iter_clients(page_size: int = 1000) -> AsyncIterator[dict]:
+    """Recorre todos los clientes de a una página, sin cargarlos todos en memoria."""
+    cursor = None
+    while True:
+        clients = await list_clients(limit=page_size, cursor=cursor)
+        for client in clients:
+            yield client
 
+        cursor = next_cursor(clients, "created_at", page_size)
+        if not cursor:
+            return
 
-def search_clients(search_term: str) -> list[dict]:
-    """Busca clientes por nombre o teléfono."""
-    result = (
+
+async def existing_client_ids(ids: list[str]) -> set[str]:
+    """De los IDs dados, los que corresponden a un cliente."""
+    supabase = await get_supabase()
+    result = await supabase.table("clients").select("id").in_("id", ids).execute()
+    return {row["id"] for row in result.data}
+
+
+async def get_or_create_clients(clients: dict[str, str]) -> dict[str, str]:
+    """
+    Resuelve varios clientes por teléfono, creando los que no existen.
+
+    Args:
+        clients (dict[str, str]): Teléfono E.164 -> nombre.
+
+    Returns:
+        dict[str, str]: Teléfono E.164 -> ID del cliente.
+    """
+    supabase = await get_supabase()
+    phones = list(clients)
+    result = await (
         supabase.table("clients")
-        .select("id, name, phone, created_at, updated_at")
-        .or_(f"name.ilike.%{search_term}%,phone.ilike.%{search_term}%")
-        .order("created_at", desc=True)
+        .select("id, phone_e164")
+        .in_("phone_e164", phones)
+        .execute()
+    )
+    ids = {row["phone_e164"]: row["id"] for row in result.data}
+
+    missing = [phone for phone in phones if phone not in ids]
+    if missing:
+        # Si otro proceso creó alguno mientras tanto, se ignora y se relee
+        await supabase.table("clients").upsert(
+            [
+                {"id": str(uuid.uuid4()), "name": clients[phone], "phone": phone}
+                for phone in missing
+            ],
+            on_conflict="phone_e164",
+            ignore_duplicates=True
+        ).execute()
+        result = await (
+            supabase.table("clients")
+            .select("id, phone_e164")
+            .in_("phone_e164", missing)
+            .execute()
+        )
+        ids.update({row["phone_e164"]: row["id"] for row in result.data})
+
+    return ids
+
+
+async def delete_client(*, id: str) -> None:
+    """Elimina un cliente (hard delete)."""
+    supabase = await get_supabase()
+    await supabase.table("clients").delete().eq("id", id).execute()
+    _forget_client(id)
+    day_cache.clear()
+
+
+async def search_clients(
+    search_term: str,
+    limit: int = 100,
+    cursor: str = None
+) -> list[dict]:
+    """
+    Busca clientes por nombre o teléfono.
+
+    Si el término son solo dígitos (con espacios, guiones o `+`) se busca
+    sobre el teléfono normalizado: como prefijo si empieza con `+` o `0`
+    (un número con código de país o de área) y como fragmento si no. Si no,
+    se busca sobre el nombre. Las búsquedas usan los índices trigram de
+    migrations/003 en lugar de recorrer la tabla.
+
+    Pagina por cursor igual que `list_clients`.
+    """
+    supabase = await get_supabase()
+    query = supabase.table("clients").select("id, name, phone, created_at, updated_at")
+
+    digits = phone_digits(search_term)
+    if digits and search_term.strip().startswith(("+", "0")):
+        query = query.like("phone_e164", f"{normalize_phone(search_term)}%")
+    elif digits:
+        query = query.like("phone_e164", f"%{digits}%")
+    else:
+        query = query.ilike("name", f"%{search_term.strip()}%")
+
+    if cursor:
+        query = query.or_(after_cursor("created_at", cursor, desc=True))
+
+    result = await (
+        query.order("created_at", desc=True)
+        .order("id", desc=True)
+        .limit(limit)
         .execute()
     )
     
-    clients = []
-    for row in result.data:
-        clients.append({
-            "id": row["id"],
-            "name": row["name"],
-            "phone": row["phone"],
-            "created_at": row["created_at"],
-            "updated_at": row["updated_at"],
-        })
-    
-    return clients
+    return [_format_client(row) for row in result.data]
 
 
-def get_client_with_appointments(
+async def get_client_with_appointments(
     *,
     id: str = None,
     phone: str = None
 ) -> Optional[dict]:
-    """Obtiene un cliente con todas sus citas."""
-    client = get_client(id=id, phone=phone)
-    if not client:
+    """
+    Obtiene un cliente con todas sus citas.
+
+    Cliente, citas y eventos de calendario se traen en una sola consulta
+    con selects embebidos, en lugar de buscar primero el cliente y después
+    sus citas.
+    """
+    if not id:
+        phone = normalize_phone(phone)
+    if not id and not phone:
         return None
-    
-    result = (
-        supabase.table("appointments")
-        .select("id, summary, start_time, end_time, description, status")
-        .eq("client_id", client["id"])
-        .neq("status", "deleted")
-        .order("start_time", desc=True)
-        .execute()
+
+    supabase = await get_supabase()
+    query = (
+        supabase.table("clients")
+        .select(
+            "id, name, phone, created_at, updated_at, "
+            "appointments(id, start_time, end_time, status, "
+            "calendar_events(summary, description))"
+        )
+        .neq("appointments.status", "deleted")
+        .order("start_time", desc=True, foreign_table="appointments")
     )
-    
+    if id:
+        query = query.eq("id", id)
+    else:
+        query = query.eq("phone_e164", phone)
+
+    result = await query.limit(1).execute()
+    if not result.data:
+        return None
+
+    row = result.data[0]
+    client = _format_client(row)
+    _remember_client(client)
+
     appointments = []
-    for row in result.data:
+    for appointment in row.get("appointments") or []:
+        cal_ev = appointment.get("calendar_events")
+        if isinstance(cal_ev, list):
+            cal_ev = cal_ev[0] if cal_ev else None
+        cal_ev = cal_ev or {}
+
         appointments.append({
-            "id": row["id"],
-            "summary": row["summary"],
-            "from": row["start_time"],
-            "to": row["end_time"],
-            "description": row.get("description"),
-            "status": row["status"],
+            "id": appointment["id"],
+            "summary": cal_ev.get("summary"),
+            "from": appointment["start_time"],
+            "to": appointment["end_time"],
+            "description": cal_ev.get("description"),
+            "status": appointment["status"],
         })
-    
-    client["appointments"] = appointments
-    return client
+
+    return {**client, "appointments": appointments}
@@ -6,9 +6,19 @@ from typing import Any, Optional
 
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+
+from utils.tracing import traced
 
 
 SCOPES = ["https://www.googleapis.com/auth/calendar"]
+# Máximo de operaciones por request batch que acepta la API de Calendar
+BATCH_MAX_SIZE = 50
+
+
+class EventConflictError(Exception):
+    """El evento cambió en Google desde que se leyó su etag."""
+
 
 @dataclass
 class GoogleCalendarClient:
@@ -53,6 +63,7 @@ class GoogleCalendarClient:
             timezone_str=tz
         )
 
+    @traced("google")
     def list_events(
         self,
         time_min: Optional[str] = None,
@@ -74,6 +85,39 @@ class GoogleCalendarClient:
             .execute()
         )
 
+    @traced("google")
+    def sync_events(self, sync_token: Optional[str] = None) -> tuple[list[dict], str]:
+        """
+        Trae todos los eventos (o solo los cambios desde `sync_token`),
+        recorriendo todas las páginas.
+
+        Returns:
+            tuple[list[dict], str]: (eventos, nextSyncToken). En modo
+            incremental los eventos borrados vienen con status "cancelled".
+
+        Raises:
+            HttpError: 410 si el sync_token ya no es válido.
+        """
+        items = []
+        page_token = None
+        while True:
+            response = (
+                self.service.events()
+                .list(
+                    calendarId=self.calendar_id,
+                    singleEvents=True,
+                    maxResults=2500,
+                    syncToken=sync_token,
+                    pageToken=page_token,
+                )
+                .execute()
+            )
+            items.extend(response.get("items", []))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return items, response.get("nextSyncToken")
+
+    @traced("google")
     def create_event(
         self,
         summary: str,
@@ -81,7 +125,129 @@ class GoogleCalendarClient:
         end_rfc3339: str,
         description: str = "",
     ):
-        body = {
+        body = self._event_body(summary, start_rfc3339, end_rfc3339, description)
+        return (
+            self.service.events()
+            .insert(calendarId=self.calendar_id, body=body)
+            .execute()
+        )
+
+    @traced("google")
+    def update_event(
+        self,
+        event_id: str,
+        summary: Optional[str] = None,
+        start_rfc3339: Optional[str] = None,
+        end_rfc3339: Optional[str] = None,
+        description: Optional[str] = None,
+        etag: Optional[str] = None,
+    ):
+        """
+        Actualiza solo los campos indicados con `events().patch`.
+
+        Si se pasa `etag`, la escritura es condicional: si el evento cambió
+        en Google desde que se leyó ese etag se lanza `EventConflictError`.
+        """
+        request = self._patch_request(
+            event_id,
+            self._patch_body(summary, start_rfc3339, end_rfc3339, description),
+            etag,
+        )
+        try:
+            return request.execute()
+        except HttpError as e:
+            if e.resp.status == 412:
+                raise EventConflictError(event_id) from e
+            raise
+
+    @traced("google")
+    def delete_event(self, event_id: str) -> None:
+        self.service.events().delete(
+            calendarId=self.calendar_id, eventId=event_id
+        ).execute()
+
+    @traced("google")
+    def batch_execute(
+        self,
+        operations: list[dict],
+    ) -> list[tuple[Optional[dict], Optional[Exception]]]:
+        """
+        Ejecuta muchas operaciones agrupadas en requests batch de hasta
+        `BATCH_MAX_SIZE` operaciones cada uno.
+
+        Cada operación es un dict con `op` ("insert", "update" o "delete"),
+        `event_id` para update/delete y los campos del evento (`summary`,
+        `start_rfc3339`, `end_rfc3339`, `description`). Los update solo
+        envían los campos presentes (patch) y aceptan `etag` opcional.
+
+        Returns:
+            list: Un `(respuesta, error)` por operación, en el mismo orden. Un
+            error en una operación no afecta a las demás.
+        """
+        results: list[tuple[Optional[dict], Optional[Exception]]] = [
+            (None, None)
+        ] * len(operations)
+
+        def callback(request_id, response, exception):
+            results[int(request_id)] = (response, exception)
+
+        for offset in range(0, len(operations), BATCH_MAX_SIZE):
+            batch = self.service.new_batch_http_request(callback=callback)
+            chunk = operations[offset:offset + BATCH_MAX_SIZE]
+            for index, operation in enumerate(chunk, start=offset):
+                batch.add(self._batch_request(operation), request_id=str(index))
+            batch.execute()
+
+        return results
+
+    def _batch_request(self, operation: dict):
+        events = self.service.events()
+        op = operation["op"]
+
+        if op == "insert":
+            body = self._event_body(
+                operation["summary"],
+                operation["start_rfc3339"],
+                operation["end_rfc3339"],
+                operation.get("description", ""),
+            )
+            return events.insert(calendarId=self.calendar_id, body=body)
+
+        if op == "update":
+            body = self._patch_body(
+                summary=operation.get("summary"),
+                start_rfc3339=operation.get("start_rfc3339"),
+                end_rfc3339=operation.get("end_rfc3339"),
+                description=operation.get("description"),
+            )
+            return self._patch_request(operation["event_id"], body, operation.get("etag"))
+
+        if op == "delete":
+            return events.delete(
+                calendarId=self.calendar_id,
+                eventId=operation["event_id"],
+            )
+
+        raise ValueError(f"Operación desconocida: {op}")
+
+    def _patch_request(self, event_id: str, body: dict, etag: Optional[str] = None):
+        request = self.service.events().patch(
+            calendarId=self.calendar_id,
+            eventId=event_id,
+            body=body,
+        )
+        if etag:
+            request.headers["If-Match"] = etag
+        return request
+
+    def _event_body(
+        self,
+        summary: str,
+        start_rfc3339: str,
+        end_rfc3339: str,
+        description: str = "",
+    ) -> dict:
+        return {
             "summary": summary,
             "description": description,
             "start": {
@@ -93,55 +259,36 @@ class GoogleCalendarClient:
                 "timeZone": self.timezone_str,
             },
         }
-        return (
-            self.service.events()
-            .insert(calendarId=self.calendar_id, body=body)
-            .execute()
-        )
 
-    def update_event(
+    def _patch_body(
         self,
-        event_id: str,
         summary: Optional[str] = None,
         start_rfc3339: Optional[str] = None,
         end_rfc3339: Optional[str] = None,
         description: Optional[str] = None,
-    ):
-        event = (
-            self.service.events()
-            .get(calendarId=self.calendar_id, eventId=event_id)
-            .execute()
-        )
-
+    ) -> dict:
+        """Cuerpo con solo los campos que cambian."""
+        body = {}
         if summary is not None:
-            event["summary"] = summary
+            body["summary"] = summary
         if description is not None:
-            event["description"] = description
+            body["description"] = description
         if start_rfc3339 is not None:
-            event["start"] = {
+            body["start"] = {
                 "dateTime": start_rfc3339,
                 "timeZone": self.timezone_str,
             }
         if end_rfc3339 is not None:
-            event["end"] = {
+            body["end"] = {
                 "dateTime": end_rfc3339,
                 "timeZone": self.timezone_str,
             }
+        return body
 
-        return (
-            self.service.events()
-            .update(
-                calendarId=self.calendar_id,
-                eventId=event_id,
-                body=event
-            )
-            .execute()
-        )
 
-    def delete_event(self, event_id: str) -> None:
-        self.service.events().delete(
-            calendarId=self.calendar_id, eventId=event_id
-        ).execute()
+def is_gone(error: Exception) -> bool:
+    """True si Google responde que el evento ya no existe (404/410)."""
+    return isinstance(error, HttpError) and error.resp.status in (404, 410)
 
 
 def to_rfc3339(dt: datetime) -> str:
@@ -1,9 +1,69 @@
+import asyncio
 import os
-from supabase import create_client, Client
+from typing import Optional
+
+import httpx
+from supabase import AsyncClient, acreate_client
 from dotenv import load_dotenv
+from utils.request_stats import count_round_trip
+from utils.tracing import end_span, start_span
 
 load_dotenv()
 
 url: str = os.getenv("SUPABASE_URL")
 key: str = os.getenv("SUPABASE_KEY")
-supabase: Client = create_client(url, key)
+
+_client: Optional[AsyncClient] = None
+_client_lock = asyncio.Lock()
+
+
+async def get_supabase() -> AsyncClient:
+    """
+    Devuelve el cliente asíncrono de Supabase compartido por todo el proceso.
+
+    Se crea una sola vez (al iniciar la app o en el primer uso) y reutiliza
+    su pool de conexiones HTTP hacia PostgREST.
+    """
+    global _client
+    if _client is None:
+        async with _client_lock:
+            if _client is None:
+                _client = await acreate_client(url, key)
+                _instrument(_client.postgrest.session)
+    return _client
+
+
+def _instrument(session: httpx.AsyncClient) -> None:
+    """
+    Cuenta y mide cada consulta a PostgREST con los event hooks de httpx.
+
+    Se mide en el cliente HTTP y no en las funciones de los servicios: así
+    las respuestas desde cache no cuentan como consultas y una función que
+    llama a otra no suma la misma consulta dos veces.
+    """
+    session.event_hooks["request"].append(_on_request)
+    session.event_hooks["response"].append(_on_response)
+
+
+async def _on_request(request: httpx.Request) -> None:
+    count_round_trip()
+    # /rest/v1/clients -> clients, /rest/v1/rpc/book_appointment -> rpc/book_appointment
+    resource = request.url.path.split("/rest/v1/", 1)[-1]
+    request.extensions["span"] = start_span(f"supabase.{request.method} {resource}")
+
+
+async def _on_response(response: httpx.Response) -> None:
+    # Si la conexión falla no hay respuesta y el span queda sin registrar
+    record = response.request.extensions.pop("span", None)
+    if record is not None:
+        record["attributes"]["http.status_code"] = response.status_code
+    error = f"HTTP {response.status_code}" if response.is_error else None
+    end_span(record, error)
+
+
+async def close_supabase() -> None:
+    """Cierra las conexiones del cliente al apagar la app."""
+    global _client
+    if _client is not None:
+        await _client.postgrest.aclose()
+        _client = None
@@ -0,0 +1,99 @@
+"""
+Fixtures de los tests del orquestador.
+
+Correr desde `orquestator/` (los módulos se importan como en `main.py`):
+
+    cd orquestator && python -m pytest -q
+"""
+import json
+import os
+import sys
+from types import SimpleNamespace
+from typing import Awaitable, Callable
+
+import httpx
+import postgrest
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from supabase_conn import connection  # noqa: E402
+
+BASE_URL = "http://supabase.test/rest/v1"
+CLIENT_ID = "6f9619ff-8b86-d011-b42d-00c04fc964ff"
+
+Handler = Callable[[httpx.Request], Awaitable[httpx.Response]]
+
+
+def json_response(data, status_code: int = 200) -> httpx.Response:
+    return httpx.Response(status_code, json=data)
+
+
+def api_error(code: str, message: str, status_code: int = 409) -> httpx.Response:
+    """Respuesta de error de PostgREST, como la que genera una violación de restricción."""
+    return httpx.Response(
+        status_code,
+        json={"code": code, "message": message, "details": None, "hint": None},
+    )
+
+
+class FakePostgrest:
+    """
+    PostgREST falso detrás del cliente real de `postgrest`.
+
+    Cada ruta (`"GET clients"`, `"POST rpc/book_appointment"`) se atiende
+    con un handler asíncrono; `requests` guarda todas las consultas en orden
+    para contar round trips.
+    """
+
+    def __init__(self):
+        self.handlers: dict[str, Handler] = {}
+        self.requests: list[str] = []
+
+    def route(self, name: str, handler: Handler) -> None:
+        self.handlers[name] = handler
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        resource = request.url.path.split("/rest/v1/", 1)[-1]
+        name = f"{request.method} {resource}"
+        self.requests.append(name)
+        handler = self.handlers.get(name)
+        if handler is None:
+            return api_error("PGRST000", f"Ruta no simulada: {name}", status_code=500)
+        return await handler(request)
+
+
+def request_json(request: httpx.Request):
+    return json.loads(request.content or b"null")
+
+
+def appointment_row(id: str, params: dict) -> dict:
+    """Fila de `appointments` con sus joins, como la devuelve `book_appointment`."""
+    return {
+        "id": id,
+        "client_id": params["p_client_id"],
+        "start_time": params["p_start_time"],
+        "end_time": params["p_end_time"],
+        "status": "confirmed",
+        "sync_status": "pending",
+        "created_at": "2026-01-01T00:00:00+00:00",
+        "updated_at": "2026-01-01T00:00:00+00:00",
+        "client": {"name": "Ana", "phone": "+5491144445555"},
+        "calendar_events": {"id": f"ev-{id}", "summary": "Corte", "sync_status": "pending"},
+    }
+
+
+@pytest.fixture
+def fake_postgrest(monkeypatch) -> FakePostgrest:
+    """Reemplaza el cliente compartido de Supabase por uno contra `FakePostgrest`."""
+    fake = FakePostgrest()
+    client = postgrest.AsyncPostgrestClient(
+        BASE_URL,
+        http_client=httpx.AsyncClient(base_url=BASE_URL, transport=httpx.MockTransport(fake)),
+    )
+    monkeypatch.setattr(
+        connection,
+        "_client",
+        SimpleNamespace(table=client.from_, rpc=client.rpc, postgrest=client),
+    )
+    return fake
@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from api import http
+from api import session as agent_session
+from api.session import AgentStreamError
+
+
+def _sse(*events: tuple[str, dict]) -> bytes:
+    return "".join(
+        f"event: {event}\ndata: {json.dumps(data)}\n\n" for event, data in events
+    ).encode()
+
+
+@pytest.fixture
+def fake_agent(monkeypatch):
+    """Reemplaza el cliente compartido por uno contra un agente falso."""
+    requests = []
+    replies = {}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(
+            200,
+            content=replies[request.url.params["call_sid"]],
+            headers={"content-type": "text/event-stream"},
+        )
+
+    monkeypatch.setattr(agent_session, "AGENT_API", "http://agent.test")
+    monkeypatch.setattr(http, "_client", httpx.AsyncClient(
+        transport=httpx.MockTransport(handler),
+        event_hooks={"request": [http._propagate_trace]},
+    ))
+    return requests, replies
+
+
+async def _collect(call_sid: str, message: str) -> list[str]:
+    return [sentence async for sentence in agent_session.stream_message(call_sid, message)]
+
+
+def test_stream_message_yields_sentences(fake_agent):
+    _, replies = fake_agent
+    replies["call-1"] = _sse(
+        ("sentence", {"sentence": "Listo."}),
+        ("sentence", {"sentence": "¿Algo más?"}),
+        ("done", {"time_to_first_sentence": 0.1}),
+        ("sentence", {"sentence": "no se lee"}),
+    )
+
+    assert asyncio.run(_collect("call-1", "hola")) == ["Listo.", "¿Algo más?"]
+
+
+def test_stream_message_raises_on_error_event(fake_agent):
+    _, replies = fake_agent
+    replies["call-1"] = _sse(
+        ("error", {"detail": "La sesión está procesando otro mensaje."}),
+    )
+
+    with pytest.raises(AgentStreamError, match="procesando otro mensaje"):
+        asyncio.run(_collect("call-1", "hola"))
+
@@ -0,0 +1,194 @@
+import asyncio
+import csv
+import json
+import time
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from routes import appointment_route
+from tests.conftest import CLIENT_ID, appointment_row, json_response, request_json
+
+REQUEST_SECONDS = 0.005
+ROWS = 10_000
+SINGLE_CREATES = 100
+
+app = FastAPI()
+app.include_router(appointment_route.router)
+
+
+async def _call(method: str, path: str, **kwargs) -> httpx.Response:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.request(method, path, **kwargs)
+
+
+def _slot(n: int) -> tuple[str, str]:
+    start = datetime(2026, 3, 2, 9) + timedelta(minutes=30 * n)
+    return start.isoformat(), (start + timedelta(minutes=30)).isoformat()
+
+
+def _csv(rows: int, description: str = "Primera vez") -> str:
+    lines = ["client_id,summary,description,start_time,end_time"]
+    for n in range(rows):
+        start, end = _slot(n)
+        lines.append(f'{CLIENT_ID},Corte,"{description}",{start},{end}')
+    return "\r\n".join(lines) + "\r\n"
+
+
+class Booking:
+    """Supabase falso para la importación: clientes conocidos y `book_appointments`."""
+
+    def __init__(self, fake_postgrest, request_seconds: float = 0.0):
+        self.request_seconds = request_seconds
+        self.batches: list[list[dict]] = []
+        fake_postgrest.route("GET clients", self.clients)
+        fake_postgrest.route("POST rpc/book_appointments", self.book_many)
+        fake_postgrest.route("POST rpc/find_overlapping_appointment", self.no_overlap)
+        fake_postgrest.route("POST rpc/book_appointment", self.book_one)
+
+    async def clients(self, request):
+        await asyncio.sleep(self.request_seconds)
+        return json_response([{"id": CLIENT_ID}])
+
+    async def book_many(self, request):
+        await asyncio.sleep(self.request_seconds)
+        self.batches.append(request_json(request)["p_rows"])
+        return json_response(None)
+
+    async def no_overlap(self, request):
+        await asyncio.sleep(self.request_seconds)
+        return json_response([])
+
+    async def book_one(self, request):
+        await asyncio.sleep(self.request_seconds)
+        return json_response(appointment_row("appt-1", request_json(request)))
+
+
+def test_csv_keeps_quoted_newlines_split_across_chunks(fake_postgrest):
+    booking = Booking(fake_postgrest)
+    body = _csv(3, description="Alérgica al tinte\r\nTraer foto").encode()
+
+    async def parts():
+        # Partes de 7 bytes: cortan el campo entre comillas y la "é" en dos
+        for i in range(0, len(body), 7):
+            yield body[i:i + 7]
+
+    response = asyncio.run(_call(
+        "POST", "/appointment/import", content=parts(), headers={"content-type": "text/csv"}
+    ))
+
+    assert response.json()["created"] == 3
+    [batch] = booking.batches
+    assert [row["description"] for row in batch] == ["Alérgica al tinte\r\nTraer foto"] * 3
+
+
+def test_import_books_each_chunk_before_reading_the_rest(fake_postgrest, monkeypatch):
+    monkeypatch.setattr(appointment_route, "IMPORT_CHUNK_SIZE", 3)
+    booking = Booking(fake_postgrest)
+    sent = []
+    sent_when_booked = []
+
+    async def parts():
+        for n in range(7):
+            start, end = _slot(n)
+            row = {"client_id": CLIENT_ID, "summary": "Corte", "start_time": start, "end_time": end}
+            if n == 4:
+                row = {"summary": "Sin horario"}
+            sent.append(n)
+            yield (json.dumps(row) + "\n").encode()
+
+    async def book_many(request):
+        sent_when_booked.append(len(sent))
+        return await booking.book_many(request)
+
+    fake_postgrest.route("POST rpc/book_appointments", book_many)
+
+    response = asyncio.run(_call(
+        "POST", "/appointment/import",
+        content=parts(),
+        headers={"content-type": "application/x-ndjson"},
+    ))
+
+    report = response.json()
+    assert [len(batch) for batch in booking.batches] == [3, 2, 1]
+    # La primera tanda se guarda antes de que llegue la última fila
+    assert sent_when_booked[0] < 7
+    # La numeración sigue entre tandas
+    assert [result["row"] for result in report["results"]] == list(range(1, 8))
+    assert report["results"][4]["status"] == "error"
+    assert report["created"] == 6
+
+
+def test_unreadable_csv_reports_where_it_stopped(fake_postgrest, monkeypatch):
+    monkeypatch.setattr(appointment_route, "IMPORT_CHUNK_SIZE", 2)
+    booking = Booking(fake_postgrest)
+    body = _csv(3, description="x" * 100) + _csv(2, description="x" * 1000).split("\r\n", 1)[1]
+
+    limit = csv.field_size_limit(500)
+    try:
+        response = asyncio.run(_call(
+            "POST", "/appointment/import", content=body.encode(), headers={"content-type": "text/csv"}
+        ))
+    finally:
+        csv.field_size_limit(limit)
+
+    report = response.json()
+    assert response.status_code == 200
+    assert [len(batch) for batch in booking.batches] == [2, 1]
+    assert report["results"][-1]["row"] == 4
+    assert "No se pudo leer el CSV" in report["results"][-1]["error"]
+
+
+@pytest.mark.parametrize("content_type", ["application/json", ""])
+def test_import_rejects_other_content_types(fake_postgrest, content_type):
+    response = asyncio.run(_call(
+        "POST", "/appointment/import", content=b"[]", headers={"content-type": content_type}
+    ))
+
+    assert response.status_code == 415
+
+
+def test_benchmark_import_10k_rows(fake_postgrest):
+    booking = Booking(fake_postgrest, request_seconds=REQUEST_SECONDS)
+
+    async def single_creates():
+        for n in range(SINGLE_CREATES):
+            start, end = _slot(n)
+            response = await _call("POST", "/appointment/create", json={
+                "client_id": CLIENT_ID, "summary": "Corte", "start_time": start, "end_time": end,
+            })
+            assert response.status_code == 200
+
+    started = time.perf_counter()
+    asyncio.run(single_creates())
+    per_create = (time.perf_counter() - started) / SINGLE_CREATES
+    create_requests = len(fake_postgrest.requests)
+
+    fake_postgrest.requests.clear()
+    body = _csv(ROWS).encode()
+
+    async def parts():
+        for i in range(0, len(body), 64 * 1024):
+            yield body[i:i + 64 * 1024]
+
+    started = time.perf_counter()
+    response = asyncio.run(_call(
+        "POST", "/appointment/import", content=parts(), headers={"content-type": "text/csv"}
+    ))
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"\n{ROWS} citas con {REQUEST_SECONDS * 1000:.0f}ms por consulta: "
+        f"import={elapsed:.2f}s ({len(fake_postgrest.requests)} consultas), "
+        f"create de a una ~{per_create * ROWS:.1f}s "
+        f"({create_requests // SINGLE_CREATES * ROWS} consultas)"
+    )
+    assert response.json()["created"] == ROWS
+    assert len(booking.batches) == ROWS // appointment_route.IMPORT_CHUNK_SIZE
+    # Una consulta de clientes y un alta por tanda
+    assert len(fake_postgrest.requests) == 2 * len(booking.batches)
+    assert elapsed < 10
+    assert elapsed < per_create * ROWS / 5
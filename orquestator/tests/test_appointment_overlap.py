@@ -0,0 +1,149 @@
+import asyncio
+from datetime import datetime
+
+import httpx
+from fastapi import FastAPI
+
+from routes import appointment_route
+from tests.conftest import CLIENT_ID, api_error, appointment_row, json_response, request_json
+
+app = FastAPI()
+app.include_router(appointment_route.router)
+
+
+def _booking(start: str, end: str) -> dict:
+    return {
+        "client_id": CLIENT_ID,
+        "summary": "Corte",
+        "start_time": start,
+        "end_time": end,
+    }
+
+
+def _overlaps(a_start: str, a_end: str, b_start: str, b_end: str) -> bool:
+    parse = datetime.fromisoformat
+    return parse(a_start) < parse(b_end) and parse(b_start) < parse(a_end)
+
+
+def _fake_booking_db(fake_postgrest, checks_before_booking: int) -> list[dict]:
+    """
+    Simula `find_overlapping_appointment` y `book_appointment` sobre una lista.
+
+    El chequeo previo espera a que lleguen `checks_before_booking` consultas,
+    así todas ven la agenda vacía, como dos reservas que llegan a la vez. La
+    reserva aplica la restricción de exclusión: si el turno ya está tomado
+    responde 23P01, como la base con migrations/002.
+    """
+    booked: list[dict] = []
+    arrived = asyncio.Event()
+    checks = 0
+
+    async def find_overlapping(request):
+        nonlocal checks
+        checks += 1
+        if checks >= checks_before_booking:
+            arrived.set()
+        await arrived.wait()
+        params = request_json(request)
+        return json_response([
+            row for row in booked
+            if _overlaps(row["start_time"], row["end_time"], params["p_start_time"], params["p_end_time"])
+        ])
+
+    async def book(request):
+        params = request_json(request)
+        if any(
+            _overlaps(row["start_time"], row["end_time"], params["p_start_time"], params["p_end_time"])
+            for row in booked
+        ):
+            return api_error("23P01", 'conflicting key value violates exclusion constraint "appointments_no_overlap"')
+        row = appointment_row(f"appt-{len(booked) + 1}", params)
+        booked.append(row)
+        return json_response(row)
+
+    fake_postgrest.route("POST rpc/find_overlapping_appointment", find_overlapping)
+    fake_postgrest.route("POST rpc/book_appointment", book)
+    return booked
+
+
+async def _post_all(path: str, payloads: list[dict]) -> list[httpx.Response]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(*(client.post(path, json=payload) for payload in payloads))
+
+
+def test_simultaneous_bookings_for_the_same_slot(fake_postgrest):
+    attempts = 5
+    booked = _fake_booking_db(fake_postgrest, checks_before_booking=attempts)
+
+    responses = asyncio.run(_post_all(
+        "/appointment/create",
+        [_booking("2026-03-02T10:00:00", "2026-03-02T10:30:00")] * attempts,
+    ))
+
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [200] + [409] * (attempts - 1)
+    assert len(booked) == 1
+    conflict = next(response for response in responses if response.status_code == 409)
+    assert conflict.json()["detail"] == "El horario se superpone con otro turno."
+
+
+def test_simultaneous_bookings_for_adjacent_slots_both_succeed(fake_postgrest):
+    booked = _fake_booking_db(fake_postgrest, checks_before_booking=2)
+
+    responses = asyncio.run(_post_all("/appointment/create", [
+        _booking("2026-03-02T10:00:00", "2026-03-02T10:30:00"),
+        _booking("2026-03-02T10:30:00", "2026-03-02T11:00:00"),
+    ]))
+
+    assert [response.status_code for response in responses] == [200, 200]
+    assert len(booked) == 2
+
+
+def test_create_rejects_an_occupied_slot_before_writing(fake_postgrest):
+    booked = _fake_booking_db(fake_postgrest, checks_before_booking=1)
+    booked.append(appointment_row("existing", {
+        "p_client_id": CLIENT_ID,
+        "p_start_time": "2026-03-02T10:00:00+00:00",
+        "p_end_time": "2026-03-02T11:00:00+00:00",
+    }))
+
+    [response] = asyncio.run(_post_all(
+        "/appointment/create",
+        [_booking("2026-03-02T10:30:00", "2026-03-02T11:30:00")],
+    ))
+
+    assert response.status_code == 409
+    assert "POST rpc/book_appointment" not in fake_postgrest.requests
+
+
+def test_update_that_loses_the_race_returns_409(fake_postgrest):
+    current = appointment_row("appt-1", {
+        "p_client_id": CLIENT_ID,
+        "p_start_time": "2026-03-02T09:00:00+00:00",
+        "p_end_time": "2026-03-02T09:30:00+00:00",
+    })
+
+    async def get_appointment(request):
+        return json_response(current)
+
+    async def find_overlapping(request):
+        # El chequeo previo no ve la reserva concurrente
+        return json_response([])
+
+    async def upsert_appointment(request):
+        return api_error("23P01", 'conflicting key value violates exclusion constraint "appointments_no_overlap"')
+
+    fake_postgrest.route("GET appointments", get_appointment)
+    fake_postgrest.route("POST rpc/find_overlapping_appointment", find_overlapping)
+    fake_postgrest.route("POST appointments", upsert_appointment)
+
+    [response] = asyncio.run(_post_all("/appointment/update", [{
+        "id": "appt-1",
+        "start_time": "2026-03-02T10:00:00",
+        "end_time": "2026-03-02T10:30:00",
+    }]))
+
+    assert response.status_code == 409
+    # El evento se escribe recién cuando la cita quedó guardada
+    assert "POST calendar_events" not in fake_postgrest.requests
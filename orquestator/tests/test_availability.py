@@ -0,0 +1,183 @@
+import random
+import time as time_module
+from datetime import date, datetime, time, timedelta
+
+import pytz
+
+from services.availability import AvailabilityEngine, IntervalIndex
+
+TZ = pytz.timezone("America/Argentina/Buenos_Aires")
+
+
+def at(day: int, hour: int, minute: int = 0) -> datetime:
+    return TZ.localize(datetime(2026, 3, day, hour, minute))
+
+
+def test_empty_index_has_no_overlaps():
+    assert not IntervalIndex(TZ).overlaps(at(2, 10), at(2, 11))
+
+
+def test_ranges_are_half_open():
+    index = IntervalIndex(TZ)
+    index.add(at(2, 10), at(2, 11))
+
+    assert not index.overlaps(at(2, 9), at(2, 10))
+    assert not index.overlaps(at(2, 11), at(2, 12))
+    assert index.overlaps(at(2, 10, 59), at(2, 12))
+    assert index.overlaps(at(2, 9), at(2, 10, 1))
+
+
+def test_range_inside_and_around_a_busy_interval():
+    index = IntervalIndex(TZ)
+    index.add(at(2, 10), at(2, 12))
+
+    assert index.overlaps(at(2, 10, 30), at(2, 11))
+    assert index.overlaps(at(2, 9), at(2, 13))
+
+
+def test_long_interval_hidden_behind_a_later_short_one():
+    # El intervalo largo empieza antes y termina después que el corto: el
+    # máximo acumulado tiene que seguir viéndolo
+    index = IntervalIndex(TZ)
+    index.add(at(2, 9), at(2, 17))
+    index.add(at(2, 10), at(2, 10, 30))
+
+    assert index.overlaps(at(2, 15), at(2, 16))
+    assert not index.overlaps(at(2, 17), at(2, 18))
+
+
+def test_interval_crossing_midnight_blocks_both_days():
+    index = IntervalIndex(TZ)
+    index.add(at(2, 23), at(3, 1))
+
+    assert index.overlaps(at(2, 23, 30), at(2, 23, 45))
+    assert index.overlaps(at(3, 0, 30), at(3, 0, 45))
+    assert not index.overlaps(at(3, 1), at(3, 2))
+
+
+def test_interval_ending_at_midnight_does_not_touch_next_day():
+    index = IntervalIndex(TZ)
+    index.add(at(2, 22), at(3, 0))
+
+    assert len(index) == 1
+    assert not index.overlaps(at(3, 0), at(3, 1))
+
+
+def test_accepts_iso_strings_in_other_offsets():
+    index = IntervalIndex(TZ)
+    # 13:00-14:00 UTC son 10:00-11:00 en Buenos Aires
+    index.add("2026-03-02T13:00:00Z", "2026-03-02T14:00:00+00:00")
+
+    assert index.overlaps(at(2, 10, 15), at(2, 10, 45))
+    assert not index.overlaps(at(2, 11), at(2, 12))
+
+
+def test_free_slots_skip_busy_and_past_slots():
+    engine = AvailabilityEngine(
+        timezone=TZ,
+        open_time="09:00",
+        close_time="12:00",
+        business_days=[0, 1, 2, 3, 4],
+        slot_minutes=60,
+    )
+    index = engine.build_index([
+        {"start_time": at(2, 10).isoformat(), "end_time": at(2, 11).isoformat()},
+    ])
+
+    # 2026-03-02 es lunes; "ahora" es 09:30, así que el turno de las 9 ya pasó
+    slots = engine.free_slots(index, date(2026, 3, 2), date(2026, 3, 2), now=at(2, 9, 30))
+
+    assert [slot["from"] for slot in slots] == [at(2, 11).isoformat()]
+
+
+def test_free_slots_skip_non_business_days():
+    engine = AvailabilityEngine(
+        timezone=TZ,
+        open_time="09:00",
+        close_time="10:00",
+        business_days=[0],
+        slot_minutes=30,
+    )
+    index = engine.build_index([])
+
+    slots = engine.free_slots(
+        index, date(2026, 3, 3), date(2026, 3, 9), now=at(2, 0)
+    )
+
+    assert {slot["from"][:10] for slot in slots} == {"2026-03-09"}
+    assert len(slots) == 2
+    assert all(
+        datetime.fromisoformat(slot["to"]) - datetime.fromisoformat(slot["from"])
+        == timedelta(minutes=30)
+        for slot in slots
+    )
+
+
+def _year_of_bookings(occupancy: float = 0.9) -> list[dict]:
+    """Un año de agenda de 9 a 18 en turnos de 30 minutos, ocupada al `occupancy`."""
+    rng = random.Random(2026)
+    rows = []
+    day = date(2026, 1, 1)
+    while day.year == 2026:
+        if day.weekday() < 5:
+            for slot in range(18):
+                if rng.random() < occupancy:
+                    start = TZ.localize(datetime.combine(day, time(9))) + timedelta(minutes=30 * slot)
+                    rows.append({
+                        "start_time": start.isoformat(),
+                        "end_time": (start + timedelta(minutes=30)).isoformat(),
+                    })
+        day += timedelta(days=1)
+    return rows
+
+
+def test_benchmark_year_of_dense_bookings():
+    engine = AvailabilityEngine(
+        timezone=TZ,
+        open_time="09:00",
+        close_time="18:00",
+        business_days=[0, 1, 2, 3, 4],
+        slot_minutes=30,
+    )
+    rows = _year_of_bookings()
+    busy = [(datetime.fromisoformat(r["start_time"]), datetime.fromisoformat(r["end_time"])) for r in rows]
+
+    started = time_module.perf_counter()
+    index = engine.build_index(rows)
+    build_seconds = time_module.perf_counter() - started
+
+    new_year = TZ.localize(datetime(2026, 1, 1))
+    rng = random.Random(7)
+    queries = []
+    for _ in range(200):
+        start = busy[rng.randrange(len(busy))][0] + timedelta(minutes=rng.choice([-45, -15, 0, 10, 20]))
+        queries.append((start, start + timedelta(minutes=30)))
+
+    started = time_module.perf_counter()
+    indexed = [index.overlaps(start, end) for start, end in queries]
+    index_seconds = time_module.perf_counter() - started
+
+    started = time_module.perf_counter()
+    linear = [any(s < end and start < e for s, e in busy) for start, end in queries]
+    linear_seconds = time_module.perf_counter() - started
+
+    started = time_module.perf_counter()
+    year = engine.free_slots(index, date(2026, 1, 1), date(2026, 12, 31), now=new_year)
+    year_seconds = time_module.perf_counter() - started
+
+    started = time_module.perf_counter()
+    for month in range(1, 13):
+        engine.free_slots(index, date(2026, month, 1), date(2026, 12, 31), limit=5, now=new_year)
+    next_seconds = (time_module.perf_counter() - started) / 12
+
+    print(
+        f"\n{len(rows)} turnos en un año: índice armado en {build_seconds * 1000:.0f}ms; "
+        f"{len(queries)} chequeos de choque {index_seconds * 1000:.1f}ms con índice vs "
+        f"{linear_seconds * 1000:.0f}ms recorriendo la lista; "
+        f"libres del año ({len(year)}) en {year_seconds * 1000:.0f}ms; "
+        f"próximos 5 libres en {next_seconds * 1000:.2f}ms"
+    )
+    assert indexed == linear
+    assert len(index) == len(rows)
+    assert index_seconds * 20 < linear_seconds
+    assert len(year) == 261 * 18 - len(rows)
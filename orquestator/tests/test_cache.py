@@ -0,0 +1,275 @@
+import asyncio
+import statistics
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from routes import appointment_route
+from services import appointment_service, client_service
+from tests.conftest import CLIENT_ID, appointment_row, json_response, request_json
+from utils import cache as cache_module
+from utils.cache import RangeCache, TTLCache
+
+DAY_2 = ("2026-03-02T00:00:00+00:00", "2026-03-02T23:59:59+00:00")
+DAY_3 = ("2026-03-03T00:00:00+00:00", "2026-03-03T23:59:59+00:00")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock.monotonic)
+    cache = TTLCache(maxsize=10, ttl=5)
+
+    cache.set("a", 1)
+    clock.now += 4.9
+    assert cache.get("a") == 1
+    clock.now += 0.2
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.peek("b") is None
+    assert cache.peek("a") == 1
+    assert cache.peek("c") == 3
+
+
+def test_ttl_cache_disabled_with_zero_size():
+    cache = TTLCache(maxsize=0, ttl=60)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+CLIENT = {
+    "id": CLIENT_ID,
+    "name": "Ana",
+    "phone": "+5491144445555",
+    "created_at": "2026-01-01T00:00:00+00:00",
+    "updated_at": "2026-01-01T00:00:00+00:00",
+}
+
+
+@pytest.fixture
+def empty_client_cache(monkeypatch):
+    monkeypatch.setattr(client_service, "client_cache", TTLCache(maxsize=10, ttl=60))
+
+
+def test_repeat_caller_is_served_from_the_cache(fake_postgrest, empty_client_cache):
+    async def get_client(request):
+        return json_response(CLIENT)
+
+    fake_postgrest.route("GET clients", get_client)
+
+    async def main():
+        first = await client_service.get_client(phone="+54 9 11 4444-5555")
+        again = await client_service.get_client(phone="0054 9 11 4444 5555")
+        by_id = await client_service.get_client(id=CLIENT_ID)
+        return first, again, by_id
+
+    first, again, by_id = asyncio.run(main())
+
+    assert first == again == by_id == CLIENT
+    assert fake_postgrest.requests == ["GET clients"]
+
+
+def test_upsert_forgets_the_old_phone(fake_postgrest, empty_client_cache):
+    async def get_client(request):
+        return json_response(CLIENT)
+
+    async def upsert(request):
+        return json_response([{**CLIENT, **request_json(request)}])
+
+    fake_postgrest.route("GET clients", get_client)
+    fake_postgrest.route("POST clients", upsert)
+
+    async def main():
+        await client_service.get_client(id=CLIENT_ID)
+        await client_service.upsert_client(id=CLIENT_ID, name="Ana", phone="+5491155556666")
+        return (
+            await client_service.get_client(phone="+5491155556666"),
+            client_service.client_cache.peek("phone:+5491144445555"),
+        )
+
+    by_new_phone, old_key = asyncio.run(main())
+
+    assert by_new_phone["phone"] == "+5491155556666"
+    assert old_key is None
+    # La búsqueda por el teléfono nuevo sale del cache que dejó el upsert
+    assert fake_postgrest.requests == ["GET clients", "POST clients"]
+
+
+def test_range_cache_roundtrip():
+    cache = RangeCache()
+    cache.set(*DAY_2, [{"id": "a"}], cache.generation)
+    assert cache.get(*DAY_2) == [{"id": "a"}]
+
+
+def test_set_after_concurrent_write_is_dropped():
+    cache = RangeCache()
+    generation = cache.generation
+    # Una escritura llega mientras el listado se lee de la base
+    cache.invalidate(at="2026-03-03T10:00:00+00:00")
+    cache.set(*DAY_2, [{"id": "a"}], generation)
+
+    assert cache.get(*DAY_2) is None
+
+
+def test_invalidate_by_time_only_drops_ranges_that_contain_it():
+    cache = RangeCache()
+    cache.set(*DAY_2, [], cache.generation)
+    cache.set(*DAY_3, [], cache.generation)
+
+    cache.invalidate(at="2026-03-03T10:00:00+00:00")
+
+    assert cache.get(*DAY_2) == []
+    assert cache.get(*DAY_3) is None
+    assert cache.invalidations == 1
+
+
+def test_invalidate_by_id_drops_the_day_the_appointment_left():
+    cache = RangeCache()
+    cache.set(*DAY_2, [{"id": "a"}], cache.generation)
+    cache.set(*DAY_3, [{"id": "b"}], cache.generation)
+
+    # La cita "a" se movió del día 2 al 3: los dos listados quedan viejos
+    cache.invalidate(id="a", at="2026-03-03T10:00:00+00:00")
+
+    assert cache.get(*DAY_2) is None
+    assert cache.get(*DAY_3) is None
+
+
+def test_invalidate_by_id_forgets_dropped_ranges():
+    cache = RangeCache()
+    cache.set(*DAY_2, [{"id": "a"}, {"id": "b"}], cache.generation)
+    cache.invalidate(id="a")
+    cache.set(*DAY_2, [{"id": "b"}], cache.generation)
+
+    # "a" ya no está en ningún listado: invalidarla no toca el día 2
+    cache.invalidate(id="a")
+
+    assert cache.get(*DAY_2) == [{"id": "b"}]
+
+
+def test_invalidate_accepts_datetimes_in_other_offsets():
+    cache = RangeCache()
+    cache.set(*DAY_2, [], cache.generation)
+
+    # 2026-03-02 22:00 en Buenos Aires es el 3 a la 01:00 UTC
+    cache.invalidate(at="2026-03-02T22:00:00-03:00")
+
+    assert cache.get(*DAY_2) == []
+
+
+def test_clear_bumps_generation():
+    cache = RangeCache()
+    generation = cache.generation
+    cache.set(*DAY_2, [{"id": "a"}], generation)
+    cache.clear()
+    cache.set(*DAY_3, [{"id": "b"}], generation)
+
+    assert cache.get(*DAY_2) is None
+    assert cache.get(*DAY_3) is None
+
+
+def test_lru_eviction_prunes_bounds_and_ids():
+    cache = RangeCache(maxsize=1)
+    cache.set(*DAY_2, [{"id": "a"}], cache.generation)
+    cache.set(*DAY_3, [{"id": "b"}], cache.generation)
+
+    assert cache.get(*DAY_2) is None
+    assert list(cache._bounds) == [DAY_3]
+    assert "a" not in cache._by_id
+
+
+QUERY_SECONDS = 0.02
+REPEATS = 20
+
+
+async def _repeated_day(booking_day: str) -> list[float]:
+    """
+    Lista el mismo día `REPEATS` veces, como el agente durante una llamada.
+
+    A mitad de camino se reserva un turno en `booking_day`.
+    """
+    app = FastAPI()
+    app.include_router(appointment_route.router)
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for n in range(REPEATS):
+            if n == REPEATS // 2:
+                await appointment_service.book_appointment(
+                    client_id=CLIENT_ID,
+                    start_time=f"{booking_day}T15:00:00-03:00",
+                    end_time=f"{booking_day}T15:30:00-03:00",
+                    summary="Corte",
+                )
+            started = time.perf_counter()
+            response = await client.post("/appointment/list", json={"day": "2026-03-02"})
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200
+    return latencies
+
+
+@pytest.fixture
+def slow_day_listing(fake_postgrest):
+    async def list_day(request):
+        await asyncio.sleep(QUERY_SECONDS)
+        return json_response([
+            {"id": f"appt-{n}", "start_time": f"2026-03-02T1{n}:00:00-03:00",
+             "end_time": f"2026-03-02T1{n}:30:00-03:00", "client": None, "calendar_events": []}
+            for n in range(5)
+        ])
+
+    async def book(request):
+        return json_response(appointment_row("appt-new", request_json(request)))
+
+    fake_postgrest.route("GET appointments", list_day)
+    fake_postgrest.route("POST rpc/book_appointment", book)
+    return fake_postgrest
+
+
+def test_benchmark_repeated_day_listing(slow_day_listing, monkeypatch):
+    results = {}
+    for name, cache in (("sin cache", RangeCache(maxsize=0)), ("con cache", RangeCache())):
+        monkeypatch.setattr(appointment_service, "day_cache", cache)
+        slow_day_listing.requests.clear()
+        latencies = asyncio.run(_repeated_day(booking_day="2026-03-02"))
+        results[name] = (latencies, slow_day_listing.requests.count("GET appointments"), cache)
+
+    print("\n" + "; ".join(
+        f"{name}: p50={statistics.median(latencies) * 1000:.1f}ms, "
+        f"{queries} consultas para {REPEATS} listados"
+        for name, (latencies, queries, _) in results.items()
+    ))
+    _, uncached_queries, _ = results["sin cache"]
+    latencies, cached_queries, cache = results["con cache"]
+    assert uncached_queries == REPEATS
+    # Una lectura inicial y otra después de la reserva, que invalida el día
+    assert cached_queries == 2
+    assert cache.stats()["hits"] == REPEATS - 2
+    assert statistics.median(latencies) < QUERY_SECONDS / 4
+
+
+def test_booking_another_day_keeps_the_listing_cached(slow_day_listing, monkeypatch):
+    monkeypatch.setattr(appointment_service, "day_cache", RangeCache())
+
+    asyncio.run(_repeated_day(booking_day="2026-03-03"))
+
+    assert slow_day_listing.requests.count("GET appointments") == 1
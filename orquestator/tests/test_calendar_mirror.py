@@ -0,0 +1,131 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httplib2
+import httpx
+from fastapi import FastAPI
+from googleapiclient.errors import HttpError
+
+from routes import google_calendar_route
+from services.calendar_mirror import CalendarMirror
+
+NOW = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _event(id: str, days: int, status: str = "confirmed") -> dict:
+    start = NOW + timedelta(days=days)
+    return {
+        "id": id,
+        "status": status,
+        "summary": id,
+        "start": {"dateTime": start.isoformat()},
+        "end": {"dateTime": (start + timedelta(minutes=30)).isoformat()},
+    }
+
+
+def _iso(days: int) -> str:
+    return (NOW + timedelta(days=days)).isoformat()
+
+
+class FakeCalendar:
+    """`sync_events` de Google: la próxima respuesta se arma en cada test."""
+
+    def __init__(self, items: list[dict]):
+        self.items = items
+        self.gone = False
+        self.tokens: list = []
+
+    def sync_events(self, sync_token=None):
+        self.tokens.append(sync_token)
+        if sync_token and self.gone:
+            self.gone = False
+            raise HttpError(httplib2.Response({"status": "410"}), b"Gone")
+        items, self.items = self.items, []
+        return items, f"token-{len(self.tokens)}"
+
+
+def _ids(mirror: CalendarMirror, time_min: str, time_max: str) -> list[str]:
+    return [item["id"] for item in mirror.list_events(time_min, time_max)["items"]]
+
+
+def test_over_the_limit_drops_far_future_events_first():
+    calendar = FakeCalendar([_event(f"d{days}", days) for days in range(10)])
+    mirror = CalendarMirror(calendar, max_events=6)
+
+    asyncio.run(mirror.refresh())
+
+    # Los próximos días son los que más se consultan: quedan en el espejo
+    assert _ids(mirror, _iso(-1), _iso(6)) == [f"d{days}" for days in range(6)]
+    assert mirror.horizon == NOW + timedelta(days=6)
+    assert mirror.covers(_iso(0), _iso(6))
+    assert not mirror.covers(_iso(0), _iso(7))
+
+
+def test_changes_after_the_horizon_are_ignored_and_moves_out_are_removed():
+    calendar = FakeCalendar([_event(f"d{days}", days) for days in range(4)])
+    mirror = CalendarMirror(calendar, max_events=3)
+    asyncio.run(mirror.refresh())
+
+    calendar.items = [
+        _event("nuevo-lejos", 5),
+        _event("nuevo-cerca", 1),
+        # d1 se reprograma más allá del horizonte
+        _event("d1", 8),
+    ]
+    asyncio.run(mirror.refresh())
+
+    assert _ids(mirror, _iso(-1), _iso(3)) == ["d0", "nuevo-cerca", "d2"]
+    assert "nuevo-lejos" not in mirror._events
+
+
+def test_full_resync_resets_the_horizon():
+    calendar = FakeCalendar([_event(f"d{days}", days) for days in range(4)])
+    mirror = CalendarMirror(calendar, max_events=3)
+    asyncio.run(mirror.refresh())
+    mirror.max_events = 10
+
+    calendar.gone = True
+    calendar.items = [_event(f"d{days}", days) for days in range(4)]
+    asyncio.run(mirror.refresh())
+
+    assert mirror.horizon is None
+    assert mirror.full_syncs == 2
+    assert _ids(mirror, _iso(-1), _iso(5)) == ["d0", "d1", "d2", "d3"]
+
+
+def test_ranges_before_the_retention_are_not_covered():
+    mirror = CalendarMirror(FakeCalendar([]), retention_days=30)
+
+    assert mirror.covers(_iso(-29), _iso(1))
+    assert not mirror.covers(_iso(-31), _iso(1))
+
+
+class GoogleList:
+    def __init__(self):
+        self.calls = []
+
+    def list_events(self, **kwargs):
+        self.calls.append(kwargs)
+        return {"items": [{"id": "desde-google"}]}
+
+
+def test_list_endpoint_asks_google_outside_the_mirror_window(monkeypatch):
+    mirror = CalendarMirror(FakeCalendar([_event(f"d{days}", days) for days in range(4)]), max_events=3)
+    asyncio.run(mirror.refresh())
+    google = GoogleList()
+    monkeypatch.setattr(google_calendar_route, "CALENDAR_MIRROR", mirror)
+    monkeypatch.setattr(google_calendar_route, "CALENDAR_ENDPOINT_CLIENT", google)
+    app = FastAPI()
+    app.include_router(google_calendar_route.router)
+
+    async def list_range(time_min: str, time_max: str) -> list[str]:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get(
+                "/google-calendar/list", params={"time_min": time_min, "time_max": time_max}
+            )
+        return [item["id"] for item in response.json()["items"]]
+
+    assert asyncio.run(list_range(_iso(0), _iso(2))) == ["d0", "d1"]
+    assert google.calls == []
+    assert asyncio.run(list_range(_iso(0), _iso(10))) == ["desde-google"]
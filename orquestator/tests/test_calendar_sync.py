@@ -0,0 +1,207 @@
+import asyncio
+import math
+import time
+from urllib.parse import parse_qs
+
+from services.calendar_sync import CalendarSyncWorker
+from services.google_calendar import BATCH_MAX_SIZE
+from tests.conftest import json_response, request_json
+
+
+class FakeCalendar:
+    """
+    Cliente de Google Calendar que responde cada operación con un id nuevo.
+
+    Cada request batch (hasta `BATCH_MAX_SIZE` operaciones) tarda
+    `request_seconds`, como la llamada HTTP a Google.
+    """
+
+    def __init__(self, on_call=None, request_seconds: float = 0.0):
+        self.operations: list[dict] = []
+        self.on_call = on_call
+        self.request_seconds = request_seconds
+        self.requests = 0
+
+    def batch_execute(self, operations: list[dict]):
+        first = len(self.operations)
+        self.operations.extend(operations)
+        requests = math.ceil(len(operations) / BATCH_MAX_SIZE)
+        self.requests += requests
+        time.sleep(requests * self.request_seconds)
+        if self.on_call:
+            self.on_call()
+        return [({"id": f"google-{first + i}"}, None) for i, _ in enumerate(operations)]
+
+
+def _pending_row(external_event_id: str = None, sync_version: int = 3) -> dict:
+    return {
+        "id": "ev-1",
+        "appointment_id": "appt-1",
+        "external_event_id": external_event_id,
+        "summary": "Corte",
+        "description": None,
+        "sync_status": "pending",
+        "sync_version": sync_version,
+        "appointment": {
+            "start_time": "2026-03-02T10:00:00+00:00",
+            "end_time": "2026-03-02T10:30:00+00:00",
+            "status": "confirmed",
+            "client": {"name": "Ana", "phone": "+5491144445555"},
+        },
+    }
+
+
+def _table(fake_postgrest, row: dict) -> list[dict]:
+    """
+    Simula calendar_events y appointments sobre una fila.
+
+    Los PATCH con filtro `sync_version` solo aplican si la versión coincide,
+    como el update condicional de `mark_synced`.
+    """
+    patches = []
+
+    async def list_pending(request):
+        return json_response([dict(row)] if row["sync_status"] == "pending" else [])
+
+    async def patch_event(request):
+        filters = parse_qs(request.url.query.decode())
+        body = request_json(request)
+        patches.append({"table": "calendar_events", "filters": filters, "body": body})
+        version = filters.get("sync_version")
+        if version and version != [f"eq.{row['sync_version']}"]:
+            return json_response([])
+        row.update(body)
+        return json_response([dict(row)])
+
+    async def patch_appointment(request):
+        patches.append({"table": "appointments", "body": request_json(request)})
+        return json_response([{}])
+
+    fake_postgrest.route("GET calendar_events", list_pending)
+    fake_postgrest.route("PATCH calendar_events", patch_event)
+    fake_postgrest.route("PATCH appointments", patch_appointment)
+    return patches
+
+
+def test_synced_when_nothing_changed_during_the_google_call(fake_postgrest):
+    row = _pending_row()
+    patches = _table(fake_postgrest, row)
+    worker = CalendarSyncWorker(FakeCalendar())
+
+    assert asyncio.run(worker.run_once()) == 1
+
+    assert row["sync_status"] == "synced"
+    assert row["external_event_id"] == "google-0"
+    assert {"table": "appointments", "body": {"sync_status": "synced"}} in patches
+
+
+def test_row_re_marked_pending_during_the_google_call_stays_pending(fake_postgrest):
+    row = _pending_row()
+    patches = _table(fake_postgrest, row)
+
+    def reschedule():
+        # /appointment/update marca la fila pendiente otra vez: el trigger sube la versión
+        row["sync_version"] += 1
+
+    worker = CalendarSyncWorker(FakeCalendar(on_call=reschedule))
+    asyncio.run(worker.run_once())
+
+    assert row["sync_status"] == "pending"
+    # El id de Google se guarda igual, así la próxima pasada actualiza en vez de duplicar
+    assert row["external_event_id"] == "google-0"
+    assert not any(patch["table"] == "appointments" for patch in patches)
+
+    # La próxima pasada envía el cambio como update del mismo evento
+    calendar = FakeCalendar()
+    worker.calendar = calendar
+    asyncio.run(worker.run_once())
+    assert calendar.operations[0]["op"] == "update"
+    assert calendar.operations[0]["event_id"] == "google-0"
+    assert row["sync_status"] == "synced"
+
+
+GOOGLE_REQUEST_SECONDS = 0.05
+QUERY_SECONDS = 0.002
+PENDING = 300
+
+
+def _pending_table(fake_postgrest, count: int) -> dict[str, dict]:
+    """`count` eventos pendientes; cada consulta tarda `QUERY_SECONDS`."""
+    rows = {}
+    for n in range(count):
+        row = _pending_row()
+        row["id"] = f"ev-{n}"
+        row["appointment_id"] = f"appt-{n}"
+        rows[row["id"]] = row
+
+    async def list_pending(request):
+        await asyncio.sleep(QUERY_SECONDS)
+        limit = int(request.url.params["limit"])
+        pending = [dict(row) for row in rows.values() if row["sync_status"] == "pending"]
+        return json_response(pending[:limit])
+
+    async def patch_event(request):
+        await asyncio.sleep(QUERY_SECONDS)
+        row = rows[request.url.params["id"].removeprefix("eq.")]
+        row.update(request_json(request))
+        return json_response([dict(row)])
+
+    async def patch_appointment(request):
+        await asyncio.sleep(QUERY_SECONDS)
+        return json_response([{}])
+
+    fake_postgrest.route("GET calendar_events", list_pending)
+    fake_postgrest.route("PATCH calendar_events", patch_event)
+    fake_postgrest.route("PATCH appointments", patch_appointment)
+    return rows
+
+
+def test_benchmark_drain_throughput(fake_postgrest):
+    rows = _pending_table(fake_postgrest, PENDING)
+    calendar = FakeCalendar(request_seconds=GOOGLE_REQUEST_SECONDS)
+    worker = CalendarSyncWorker(calendar, concurrency=4, batch_size=100)
+
+    async def drain() -> int:
+        synced = 0
+        while True:
+            batch = await worker.run_once()
+            if not batch:
+                return synced
+            synced += batch
+
+    started = time.perf_counter()
+    synced = asyncio.run(drain())
+    elapsed = time.perf_counter() - started
+
+    # Inline, cada cita esperaba su propia llamada a Google
+    inline = PENDING * GOOGLE_REQUEST_SECONDS
+    print(
+        f"\n{PENDING} eventos sincronizados en {elapsed:.2f}s "
+        f"({PENDING / elapsed:.0f} eventos/s, {calendar.requests} requests a Google); "
+        f"una llamada por evento serían {inline:.0f}s"
+    )
+    assert synced == PENDING
+    assert all(row["sync_status"] == "synced" for row in rows.values())
+    assert calendar.requests == math.ceil(100 / BATCH_MAX_SIZE) * math.ceil(PENDING / 100)
+    assert elapsed < inline / 3
+
+
+def test_one_batch_carries_inserts_updates_and_deletes(fake_postgrest):
+    rows = _pending_table(fake_postgrest, 4)
+    rows["ev-1"]["external_event_id"] = "google-old-1"
+    rows["ev-2"]["external_event_id"] = "google-old-2"
+    rows["ev-2"]["appointment"]["status"] = "deleted"
+    # Borrada antes de llegar a Google: no hay nada que enviar
+    rows["ev-3"]["appointment"]["status"] = "deleted"
+    calendar = FakeCalendar()
+
+    synced = asyncio.run(CalendarSyncWorker(calendar).run_once())
+
+    assert synced == 4
+    assert calendar.requests == 1
+    assert [(op["op"], op.get("event_id")) for op in calendar.operations] == [
+        ("insert", None),
+        ("update", "google-old-1"),
+        ("delete", "google-old-2"),
+    ]
+    assert rows["ev-0"]["external_event_id"] == "google-0"
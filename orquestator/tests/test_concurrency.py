@@ -0,0 +1,89 @@
+import asyncio
+import time
+from datetime import date, timedelta
+
+import httpx
+from fastapi import FastAPI
+
+from routes import appointment_route
+from services.appointment_service import day_cache
+from tests.conftest import CLIENT_ID, appointment_row, json_response, request_json
+
+# Latencia de cada consulta a Supabase
+QUERY_SECONDS = 0.02
+REQUESTS = 50
+
+app = FastAPI()
+app.include_router(appointment_route.router)
+
+
+def _slow(handler):
+    async def slow_handler(request):
+        await asyncio.sleep(QUERY_SECONDS)
+        return await handler(request)
+    return slow_handler
+
+
+async def _post_concurrently(path: str, payloads: list[dict]) -> tuple[list[httpx.Response], float]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(client.post(path, json=payload) for payload in payloads))
+        return responses, time.perf_counter() - started
+
+
+def _report(name: str, queries_per_request: int, elapsed: float) -> None:
+    serial = REQUESTS * queries_per_request * QUERY_SECONDS
+    print(
+        f"\n{name}: {REQUESTS} requests concurrentes en {elapsed * 1000:.0f}ms "
+        f"({REQUESTS / elapsed:.0f} req/s; en serie serían {serial * 1000:.0f}ms)"
+    )
+
+
+def test_benchmark_concurrent_list(fake_postgrest):
+    day_cache.clear()
+
+    async def list_day(request):
+        return json_response([])
+
+    fake_postgrest.route("GET appointments", _slow(list_day))
+    # Un día distinto por request, así ninguno sale del cache
+    days = [date(2026, 3, 2) + timedelta(days=n) for n in range(REQUESTS)]
+
+    responses, elapsed = asyncio.run(_post_concurrently(
+        "/appointment/list", [{"day": day.isoformat()} for day in days]
+    ))
+
+    _report("/appointment/list", 1, elapsed)
+    assert all(response.status_code == 200 for response in responses)
+    assert fake_postgrest.requests.count("GET appointments") == REQUESTS
+    # Las consultas se solapan en vez de bloquear el event loop una tras otra
+    assert elapsed < REQUESTS * QUERY_SECONDS / 5
+
+
+def test_benchmark_concurrent_create(fake_postgrest):
+    async def no_overlap(request):
+        return json_response([])
+
+    async def book(request):
+        params = request_json(request)
+        return json_response(appointment_row(f"appt-{params['p_start_time']}", params))
+
+    fake_postgrest.route("POST rpc/find_overlapping_appointment", _slow(no_overlap))
+    fake_postgrest.route("POST rpc/book_appointment", _slow(book))
+    starts = [date(2026, 3, 2) + timedelta(days=n) for n in range(REQUESTS)]
+
+    responses, elapsed = asyncio.run(_post_concurrently("/appointment/create", [
+        {
+            "client_id": CLIENT_ID,
+            "summary": "Corte",
+            "start_time": f"{day.isoformat()}T10:00:00",
+            "end_time": f"{day.isoformat()}T10:30:00",
+        }
+        for day in starts
+    ]))
+
+    _report("/appointment/create", 2, elapsed)
+    assert all(response.status_code == 200 for response in responses)
+    assert len(fake_postgrest.requests) == 2 * REQUESTS
+    assert elapsed < REQUESTS * 2 * QUERY_SECONDS / 5
@@ -0,0 +1,227 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+from urllib.parse import urlparse
+
+import httpx
+import httplib2
+import pytest
+from fastapi import FastAPI
+from googleapiclient.discovery import build
+
+from routes import google_calendar_route
+from services.google_calendar import EventConflictError, GoogleCalendarClient
+
+CALENDAR_ID = "agenda@test"
+REQUEST_SECONDS = 0.02
+UPDATES = 20
+
+
+class FakeCalendarServer:
+    """
+    API de Google Calendar en memoria, detrás de la interfaz de `httplib2`.
+
+    `googleapiclient` arma los requests reales (URL, método, cuerpo, If-Match)
+    y este objeto los atiende: get, insert, update (PUT) y patch de eventos,
+    con etags que cambian en cada escritura. Cada request tarda
+    `request_seconds`, como un viaje a Google.
+    """
+
+    def __init__(self, request_seconds: float = 0.0):
+        self.request_seconds = request_seconds
+        self.events: dict[str, dict] = {}
+        self.requests: list[str] = []
+        self.bodies: list[dict] = []
+        self._next_id = 0
+
+    def add_event(self, **fields) -> dict:
+        self._next_id += 1
+        event = {"id": f"ev-{self._next_id}", **fields}
+        return self._store(event)
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        time.sleep(self.request_seconds)
+        path = urlparse(uri).path
+        self.requests.append(f"{method} {path.split('/events')[-1] or '/'}")
+        payload = json.loads(body) if body else None
+        if payload is not None:
+            self.bodies.append(payload)
+
+        if method == "POST":
+            self._next_id += 1
+            return self._respond(200, self._store({"id": f"ev-{self._next_id}", **payload}))
+
+        event_id = path.rsplit("/", 1)[-1]
+        event = self.events.get(event_id)
+        if event is None:
+            return self._respond(404, {"error": {"code": 404, "message": "Not Found"}})
+        if method == "GET":
+            return self._respond(200, event)
+
+        expected = (headers or {}).get("If-Match")
+        if expected and expected != event["etag"]:
+            return self._respond(412, {"error": {"code": 412, "message": "Precondition Failed"}})
+        if method == "PATCH":
+            return self._respond(200, self._store({**event, **payload}))
+        if method == "PUT":
+            return self._respond(200, self._store({**payload, "id": event_id}))
+        return self._respond(405, {"error": {"code": 405, "message": method}})
+
+    def _store(self, event: dict) -> dict:
+        previous = self.events.get(event["id"], {}).get("etag", '"0"')
+        event["etag"] = f'"{int(previous.strip(chr(34))) + 1}"'
+        self.events[event["id"]] = event
+        return event
+
+    def _respond(self, status: int, data: dict):
+        return httplib2.Response({"status": str(status)}), json.dumps(data).encode()
+
+
+def _client(server: FakeCalendarServer) -> GoogleCalendarClient:
+    service = build("calendar", "v3", http=server, static_discovery=True)
+    return GoogleCalendarClient(service=service, calendar_id=CALENDAR_ID)
+
+
+def _get_then_update(client: GoogleCalendarClient, event_id: str, summary: str) -> dict:
+    # La versión anterior de update_event: leer el evento completo y reenviarlo
+    events = client.service.events()
+    event = events.get(calendarId=client.calendar_id, eventId=event_id).execute()
+    event["summary"] = summary
+    return events.update(calendarId=client.calendar_id, eventId=event_id, body=event).execute()
+
+
+def test_update_patches_only_the_changed_fields():
+    server = FakeCalendarServer()
+    event = server.add_event(summary="Corte", description="Nombre: Ana")
+    client = _client(server)
+
+    updated = client.update_event(event["id"], summary="Corte y barba")
+
+    assert server.requests == [f"PATCH /{event['id']}"]
+    assert server.bodies == [{"summary": "Corte y barba"}]
+    assert updated["summary"] == "Corte y barba"
+    assert updated["description"] == "Nombre: Ana"
+
+
+def test_update_with_a_stale_etag_raises_conflict():
+    server = FakeCalendarServer()
+    event = server.add_event(summary="Corte")
+    client = _client(server)
+    # Alguien editó el evento en Google después de que lo leímos
+    client.update_event(event["id"], description="Editado a mano")
+
+    with pytest.raises(EventConflictError):
+        client.update_event(event["id"], summary="Corte y barba", etag=event["etag"])
+    assert server.events[event["id"]]["summary"] == "Corte"
+
+
+def test_update_with_the_current_etag_succeeds():
+    server = FakeCalendarServer()
+    event = server.add_event(summary="Corte")
+    client = _client(server)
+
+    updated = client.update_event(event["id"], summary="Corte y barba", etag=event["etag"])
+
+    assert updated["summary"] == "Corte y barba"
+    assert updated["etag"] != event["etag"]
+
+
+def test_benchmark_update_latency_patch_vs_get_then_update():
+    server = FakeCalendarServer(request_seconds=REQUEST_SECONDS)
+    client = _client(server)
+    ids = [server.add_event(summary="Corte", description="x" * 500)["id"] for _ in range(UPDATES)]
+
+    def timed(update) -> list[float]:
+        latencies = []
+        for n, event_id in enumerate(ids):
+            started = time.perf_counter()
+            update(event_id, f"Turno {n}")
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    server.requests.clear()
+    legacy = timed(lambda event_id, summary: _get_then_update(client, event_id, summary))
+    legacy_requests = len(server.requests)
+    server.requests.clear()
+    patched = timed(lambda event_id, summary: client.update_event(event_id, summary=summary))
+    patch_requests = len(server.requests)
+
+    print(
+        f"\nupdate_event, {UPDATES} updates con {REQUEST_SECONDS * 1000:.0f}ms por request: "
+        f"get+update p50={statistics.median(legacy) * 1000:.1f}ms ({legacy_requests} requests), "
+        f"patch p50={statistics.median(patched) * 1000:.1f}ms ({patch_requests} requests)"
+    )
+    assert legacy_requests == 2 * UPDATES
+    assert patch_requests == UPDATES
+    assert statistics.median(patched) < statistics.median(legacy) * 0.75
+
+
+class BlockingCalendar:
+    """Cliente de Google cuyas llamadas bloquean el hilo, como googleapiclient."""
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def create_event(self, **fields):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.05)
+        with self._lock:
+            self.active -= 1
+        return {"id": "ev-1", **fields}
+
+
+def test_endpoints_call_google_off_the_event_loop_one_at_a_time(monkeypatch):
+    calendar = BlockingCalendar()
+    monkeypatch.setattr(google_calendar_route, "CALENDAR_ENDPOINT_CLIENT", calendar)
+    app = FastAPI()
+    app.include_router(google_calendar_route.router)
+    payload = {
+        "summary": "Corte",
+        "start_rfc3339": "2026-03-02T10:00:00-03:00",
+        "end_rfc3339": "2026-03-02T10:30:00-03:00",
+    }
+
+    async def main():
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        beat = asyncio.create_task(heartbeat())
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(*(
+                client.post("/google-calendar/create", json=payload) for _ in range(3)
+            ))
+        beat.cancel()
+        return responses, ticks
+
+    responses, ticks = asyncio.run(main())
+
+    assert [response.status_code for response in responses] == [200] * 3
+    # El cliente no es thread-safe: nunca dos llamadas a la vez
+    assert calendar.max_active == 1
+    # Mientras Google responde (~150ms en total) el event loop sigue atendiendo
+    assert ticks >= 10
+
+
+def test_endpoints_without_google_configured_return_404(monkeypatch):
+    monkeypatch.setattr(google_calendar_route, "CALENDAR_ENDPOINT_CLIENT", None)
+    app = FastAPI()
+    app.include_router(google_calendar_route.router)
+
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.delete("/google-calendar/delete/ev-1")
+
+    assert asyncio.run(main()).status_code == 404
@@ -0,0 +1,183 @@
+import asyncio
+import base64
+import json
+import re
+from datetime import date
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from routes import client_route
+from tests.conftest import json_response
+from utils.pagination import (
+    after_cursor,
+    decode_cursor,
+    encode_cursor,
+    ndjson_lines,
+    next_cursor,
+)
+
+app = FastAPI()
+app.include_router(client_route.router)
+
+
+def test_cursor_roundtrip():
+    cursor = encode_cursor("2026-03-02T10:00:00+00:00", "abc")
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == ("2026-03-02T10:00:00+00:00", "abc")
+
+
+@pytest.mark.parametrize("cursor", [
+    "no es base64!",
+    encode_cursor("a", "b")[:-2],
+    "WzFd",  # [1]
+])
+def test_decode_cursor_rejects_garbage(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("value", ['a"b', "a\\b"])
+def test_decode_cursor_rejects_values_that_break_the_filter(value):
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(value, "id"))
+
+
+def test_decode_cursor_rejects_non_string_parts():
+    raw = base64.urlsafe_b64encode(json.dumps([1, "id"]).encode()).decode()
+    with pytest.raises(ValueError):
+        decode_cursor(raw)
+
+
+def test_after_cursor_ascending():
+    cursor = encode_cursor("2026-03-02", "id-1")
+    assert after_cursor("created_at", cursor) == (
+        'created_at.gt."2026-03-02",and(created_at.eq."2026-03-02",id.gt."id-1")'
+    )
+
+
+def test_after_cursor_descending():
+    cursor = encode_cursor("Ana", "id-1")
+    assert after_cursor("name", cursor, desc=True) == (
+        'name.lt."Ana",and(name.eq."Ana",id.lt."id-1")'
+    )
+
+
+def test_after_cursor_keeps_commas_and_parentheses_quoted():
+    cursor = encode_cursor("Pérez, Ana (hija)", "id-1")
+    assert '"Pérez, Ana (hija)"' in after_cursor("name", cursor)
+
+
+def test_next_cursor_points_at_the_last_row_of_a_full_page():
+    rows = [{"id": "1", "name": "Ana"}, {"id": "2", "name": "Beto"}]
+    assert decode_cursor(next_cursor(rows, "name", limit=2)) == ("Beto", "2")
+
+
+@pytest.mark.parametrize("rows, limit", [
+    ([{"id": "1", "name": "Ana"}], 2),
+    ([], 2),
+    ([{"id": "1", "name": "Ana"}], None),
+    ([{"id": "1", "name": "Ana"}], 0),
+])
+def test_next_cursor_is_none_on_the_last_page(rows, limit):
+    assert next_cursor(rows, "name", limit) is None
+
+
+def test_ndjson_lines():
+    async def rows():
+        yield {"id": 1, "name": "Ñandú"}
+        yield {"id": 2, "when": date(2026, 3, 2)}
+
+    async def collect():
+        return [line async for line in ndjson_lines(rows())]
+
+    lines = asyncio.run(collect())
+    assert lines == [
+        '{"id": 1, "name": "Ñandú"}\n',
+        '{"id": 2, "when": "2026-03-02"}\n',
+    ]
+
+
+class KeysetClients:
+    """
+    Tabla `clients` falsa que aplica el filtro de cursor y el `offset`.
+
+    Varios clientes comparten `created_at` para que el desempate por id
+    importe. `queries` guarda los parámetros de cada consulta.
+    """
+
+    def __init__(self, count: int):
+        self.rows = sorted(
+            (
+                {
+                    "id": f"{n:05d}",
+                    "name": f"Cliente {n}",
+                    "phone": f"+54911{n:08d}",
+                    "created_at": f"2026-01-{n // 100 + 1:02d}T00:00:00+00:00",
+                    "updated_at": "2026-01-01T00:00:00+00:00",
+                }
+                for n in range(count)
+            ),
+            key=lambda row: (row["created_at"], row["id"]),
+            reverse=True,
+        )
+        self.queries: list[dict] = []
+
+    async def __call__(self, request):
+        params = dict(request.url.params)
+        self.queries.append(params)
+        rows = self.rows
+        if "or" in params:
+            value = re.search(r'created_at\.lt\."([^"]*)"', params["or"]).group(1)
+            id = re.search(r'id\.lt\."([^"]*)"', params["or"]).group(1)
+            rows = [row for row in rows if (row["created_at"], row["id"]) < (value, id)]
+        offset = int(params.get("offset", 0))
+        limit = int(params.get("limit", len(rows)))
+        return json_response(rows[offset:offset + limit])
+
+
+async def _call(method: str, path: str, **kwargs) -> httpx.Response:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.request(method, path, **kwargs)
+
+
+def test_client_list_pages_by_cursor_without_offset(fake_postgrest):
+    table = KeysetClients(250)
+    fake_postgrest.route("GET clients", table)
+
+    ids = []
+    cursor = None
+    while True:
+        params = {"limit": 30, **({"cursor": cursor} if cursor else {})}
+        page = asyncio.run(_call("POST", "/client/list", params=params)).json()
+        ids.extend(client["id"] for client in page["clients"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    assert ids == [row["id"] for row in table.rows]
+    # Después de la primera página nunca se salta filas con offset
+    assert all("or" in query and "offset" not in query for query in table.queries[1:])
+
+
+def test_client_export_streams_every_client_once(fake_postgrest):
+    table = KeysetClients(2500)
+    fake_postgrest.route("GET clients", table)
+
+    response = asyncio.run(_call("GET", "/client/export"))
+
+    lines = response.text.splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [row["id"] for row in table.rows]
+    # Páginas de 1000: la última trae 500 y corta sin otra consulta
+    assert len(table.queries) == 3
+
+
+def test_client_list_with_an_invalid_cursor_returns_400(fake_postgrest):
+    fake_postgrest.route("GET clients", KeysetClients(10))
+
+    response = asyncio.run(_call("POST", "/client/list", params={"cursor": "no es un cursor"}))
+
+    assert response.status_code == 400
+    assert fake_postgrest.requests == []
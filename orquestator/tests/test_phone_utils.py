@@ -0,0 +1,55 @@
+import re
+from pathlib import Path
+
+import pytest
+
+from utils.phone_utils import DEFAULT_COUNTRY_CODE, normalize_phone, phone_digits
+
+MIGRATION = Path(__file__).parents[1] / "migrations" / "003_clients_phone_search.sql"
+
+
+@pytest.mark.parametrize("phone, expected", [
+    ("+54 9 11 4444-5555", "+5491144445555"),
+    ("0054 9 11 4444 5555", "+5491144445555"),
+    ("011 4444-5555", "+541144445555"),
+    ("(11) 4444-5555", "+541144445555"),
+    ("  +1 (415) 555-0100 ", "+14155550100"),
+    ("00 1 415 555 0100", "+14155550100"),
+])
+def test_normalize_phone(phone, expected):
+    assert normalize_phone(phone) == expected
+
+
+@pytest.mark.parametrize("phone", [None, "", "   ", "sin número", "+-()"])
+def test_normalize_phone_without_digits(phone):
+    assert normalize_phone(phone) is None
+
+
+def test_same_number_in_different_formats_matches():
+    assert normalize_phone("011 4444-5555") == normalize_phone("+54 11 4444 5555")
+
+
+def test_country_code_argument():
+    assert normalize_phone("099 123 456", country_code="598") == "+59899123456"
+
+
+@pytest.mark.parametrize("term, expected", [
+    ("4444-5555", "44445555"),
+    ("+54 (11) 4444", "54114444"),
+    ("11.4444", "114444"),
+    ("Ana", None),
+    ("Ana 4444", None),
+    ("", None),
+    ("- ()", None),
+])
+def test_phone_digits(term, expected):
+    assert phone_digits(term) == expected
+
+
+def test_migration_uses_the_same_default_country_code():
+    # phone_e164 la calcula la base: si los códigos difieren, get_client no
+    # encuentra a los clientes cargados sin código de país
+    sql = MIGRATION.read_text()
+    codes = re.findall(r"else '\+(\d+)' \|\| ltrim", sql)
+
+    assert codes == [DEFAULT_COUNTRY_CODE]
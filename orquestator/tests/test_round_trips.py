@@ -0,0 +1,209 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from routes import appointment_route, client_route
+from services import client_service
+from services.appointment_service import CLIENT_NOT_FOUND
+from supabase_conn import connection
+from tests.conftest import CLIENT_ID, api_error, appointment_row, json_response, request_json
+from utils.cache import TTLCache
+from utils.request_stats import endpoint_stats, request_stats_middleware
+
+app = FastAPI()
+app.middleware("http")(request_stats_middleware)
+app.include_router(appointment_route.router)
+app.include_router(client_route.router)
+
+
+async def _call(method: str, path: str, **kwargs) -> httpx.Response:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.request(method, path, **kwargs)
+
+
+def _echo_first(request):
+    data = request_json(request)
+    row = data[0] if isinstance(data, list) else data
+    return {
+        "created_at": "2026-01-01T00:00:00+00:00",
+        "updated_at": "2026-01-01T00:00:00+00:00",
+        **row,
+    }
+
+
+def test_create_is_two_round_trips(fake_postgrest):
+    params = {
+        "p_client_id": CLIENT_ID,
+        "p_start_time": "2026-03-02T10:00:00+00:00",
+        "p_end_time": "2026-03-02T10:30:00+00:00",
+    }
+
+    async def no_overlap(request):
+        return json_response([])
+
+    async def book(request):
+        return json_response(appointment_row("appt-1", params))
+
+    fake_postgrest.route("POST rpc/find_overlapping_appointment", no_overlap)
+    fake_postgrest.route("POST rpc/book_appointment", book)
+
+    response = asyncio.run(_call("POST", "/appointment/create", json={
+        "client_id": CLIENT_ID,
+        "summary": "Corte",
+        "start_time": "2026-03-02T10:00:00",
+        "end_time": "2026-03-02T10:30:00",
+    }))
+
+    assert response.status_code == 200
+    assert fake_postgrest.requests == [
+        "POST rpc/find_overlapping_appointment",
+        "POST rpc/book_appointment",
+    ]
+
+
+def test_create_with_unknown_client_writes_nothing_else(fake_postgrest):
+    async def no_overlap(request):
+        return json_response([])
+
+    async def unknown_client(request):
+        return api_error(CLIENT_NOT_FOUND, "Cliente no encontrado", status_code=400)
+
+    fake_postgrest.route("POST rpc/find_overlapping_appointment", no_overlap)
+    fake_postgrest.route("POST rpc/book_appointment", unknown_client)
+
+    response = asyncio.run(_call("POST", "/appointment/create", json={
+        "client_id": CLIENT_ID,
+        "summary": "Corte",
+        "start_time": "2026-03-02T10:00:00",
+        "end_time": "2026-03-02T10:30:00",
+    }))
+
+    assert response.status_code == 404
+    # La cita y su evento se crean dentro de la RPC: no hay escrituras sueltas
+    # que puedan quedar a medias
+    assert fake_postgrest.requests == [
+        "POST rpc/find_overlapping_appointment",
+        "POST rpc/book_appointment",
+    ]
+
+
+def test_update_without_moving_is_three_round_trips(fake_postgrest):
+    current = appointment_row("appt-1", {
+        "p_client_id": CLIENT_ID,
+        "p_start_time": "2026-03-02T10:00:00+00:00",
+        "p_end_time": "2026-03-02T10:30:00+00:00",
+    })
+
+    async def get_appointment(request):
+        return json_response(current)
+
+    async def upsert(request):
+        return json_response([_echo_first(request)])
+
+    fake_postgrest.route("GET appointments", get_appointment)
+    fake_postgrest.route("POST appointments", upsert)
+    fake_postgrest.route("POST calendar_events", upsert)
+
+    response = asyncio.run(_call("POST", "/appointment/update", json={
+        "id": "appt-1",
+        "summary": "Corte y barba",
+    }))
+
+    assert response.status_code == 200
+    # Sin re-lecturas después de escribir: una lectura y dos upserts
+    assert sorted(fake_postgrest.requests) == [
+        "GET appointments",
+        "POST appointments",
+        "POST calendar_events",
+    ]
+
+
+def test_moving_update_is_four_round_trips(fake_postgrest):
+    current = appointment_row("appt-1", {
+        "p_client_id": CLIENT_ID,
+        "p_start_time": "2026-03-02T10:00:00+00:00",
+        "p_end_time": "2026-03-02T10:30:00+00:00",
+    })
+
+    async def get_appointment(request):
+        return json_response(current)
+
+    async def no_overlap(request):
+        return json_response([])
+
+    async def upsert(request):
+        return json_response([_echo_first(request)])
+
+    fake_postgrest.route("GET appointments", get_appointment)
+    fake_postgrest.route("POST rpc/find_overlapping_appointment", no_overlap)
+    fake_postgrest.route("POST appointments", upsert)
+    fake_postgrest.route("POST calendar_events", upsert)
+
+    response = asyncio.run(_call("POST", "/appointment/update", json={
+        "id": "appt-1",
+        "start_time": "2026-03-02T11:00:00",
+        "end_time": "2026-03-02T11:30:00",
+    }))
+
+    assert response.status_code == 200
+    # La cita se escribe antes que el evento, sin re-leer ninguno de los dos
+    assert fake_postgrest.requests[2:] == ["POST appointments", "POST calendar_events"]
+    assert sorted(fake_postgrest.requests[:2]) == [
+        "GET appointments",
+        "POST rpc/find_overlapping_appointment",
+    ]
+
+
+def _client_with_appointments(request):
+    return json_response([{
+        "id": CLIENT_ID,
+        "name": "Ana",
+        "phone": "+5491144445555",
+        "created_at": "2026-01-01T00:00:00+00:00",
+        "updated_at": "2026-01-01T00:00:00+00:00",
+        "appointments": [{
+            "id": "appt-1",
+            "start_time": "2026-03-02T10:00:00+00:00",
+            "end_time": "2026-03-02T10:30:00+00:00",
+            "status": "confirmed",
+            "calendar_events": [{"summary": "Corte", "description": "Nombre: Ana"}],
+        }],
+    }])
+
+
+def test_client_with_appointments_is_one_round_trip(fake_postgrest, monkeypatch):
+    monkeypatch.setattr(client_service, "client_cache", TTLCache())
+
+    async def get_client(request):
+        return _client_with_appointments(request)
+
+    fake_postgrest.route("GET clients", get_client)
+
+    response = asyncio.run(_call(
+        "GET", "/client/get-with-appointments", params={"id": CLIENT_ID}
+    ))
+
+    assert response.status_code == 200
+    assert fake_postgrest.requests == ["GET clients"]
+    appointments = response.json()["appointments"]
+    assert [(a["id"], a["summary"], a["description"]) for a in appointments] == [
+        ("appt-1", "Corte", "Nombre: Ana"),
+    ]
+
+
+def test_endpoint_report_counts_supabase_round_trips(fake_postgrest, monkeypatch):
+    monkeypatch.setattr(endpoint_stats, "_endpoints", {})
+    monkeypatch.setattr(client_service, "client_cache", TTLCache())
+    connection._instrument(connection._client.postgrest.session)
+
+    async def get_client(request):
+        return _client_with_appointments(request)
+
+    fake_postgrest.route("GET clients", get_client)
+
+    asyncio.run(_call("GET", "/client/get-with-appointments", params={"id": CLIENT_ID}))
+
+    report = endpoint_stats.report()
+    assert report["GET /client/get-with-appointments"]["last_round_trips"] == 1
@@ -0,0 +1,72 @@
+import asyncio
+
+import httpx
+
+from supabase_conn import connection
+from tests.conftest import BASE_URL, json_response
+from utils.tracing import recent_spans, span, start_trace
+
+
+def _instrumented_session(handler) -> httpx.AsyncClient:
+    session = httpx.AsyncClient(base_url=BASE_URL, transport=httpx.MockTransport(handler))
+    connection._instrument(session)
+    return session
+
+
+def test_each_query_is_a_span_of_the_current_trace():
+    async def handler(request):
+        if request.url.path.endswith("/rpc/book_appointment"):
+            return json_response({"code": "23P01", "message": "overlap"}, status_code=409)
+        return json_response([])
+
+    async def main():
+        async with _instrumented_session(handler) as session:
+            with start_trace() as trace_id, span("appointment.create"):
+                await session.get("/clients")
+                await session.post("/rpc/book_appointment", json={})
+        return trace_id
+
+    spans = recent_spans(asyncio.run(main()))
+
+    parent, select, book = spans
+    assert [s["name"] for s in spans] == [
+        "appointment.create",
+        "supabase.GET clients",
+        "supabase.POST rpc/book_appointment",
+    ]
+    assert select["parent_span_id"] == book["parent_span_id"] == parent["span_id"]
+    assert select["attributes"] == {"http.status_code": 200}
+    assert select["error"] is None
+    assert book["error"] == "HTTP 409"
+
+
+def test_hooks_do_not_change_the_current_span():
+    async def handler(request):
+        return json_response([])
+
+    async def main():
+        async with _instrumented_session(handler) as session:
+            with start_trace() as trace_id, span("outer"):
+                await session.get("/clients")
+                with span("after"):
+                    pass
+        return trace_id
+
+    spans = {s["name"]: s for s in recent_spans(asyncio.run(main()))}
+
+    # El span de la consulta no queda como padre de lo que viene después
+    assert spans["after"]["parent_span_id"] == spans["outer"]["span_id"]
+
+
+def test_queries_outside_a_trace_are_not_recorded():
+    async def handler(request):
+        return json_response([])
+
+    async def main():
+        async with _instrumented_session(handler) as session:
+            response = await session.get("/clients")
+        return response
+
+    response = asyncio.run(main())
+
+    assert "span" not in response.request.extensions
@@ -0,0 +1,166 @@
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Cache en memoria con vencimiento por tiempo y descarte LRU.
+
+    Cada entrada vence `ttl` segundos después de guardarse. Si se supera
+    `maxsize` se descarta la usada hace más tiempo. Lleva la cuenta de
+    aciertos y fallos para exponerla en los endpoints de estado.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # clave -> (vencimiento, valor), del menos al más usado
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Devuelve el valor guardado o None si no está o ya venció."""
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Como `get`, pero sin contar en las métricas ni mover la entrada."""
+        entry = self._data.get(key)
+        return entry[1] if entry is not None else None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, *keys: Hashable) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+def _parse_time(value: datetime | str) -> datetime:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return value
+
+
+class RangeCache:
+    """
+    Cache de listados por rango de tiempo (por ejemplo, las citas de un día).
+
+    Cada listado se guarda con su rango `[inicio, fin]` y los ids que
+    contiene, así una escritura invalida solo los listados que toca: los
+    que contienen el nuevo horario y los que ya incluían ese id. Un número
+    de generación evita guardar un listado que se leyó antes de una
+    escritura concurrente.
+    """
+
+    def __init__(self, maxsize: int = 64, ttl: float = 60):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.invalidations = 0
+        self._generation = 0
+        self._bounds: dict[tuple[str, str], tuple[datetime, datetime]] = {}
+        self._by_id: dict[str, set[tuple[str, str]]] = {}
+
+    @property
+    def generation(self) -> int:
+        """Tomarla antes de leer de la base y pasarla a `set`."""
+        return self._generation
+
+    def get(self, start_iso: str, end_iso: str) -> Optional[list[dict]]:
+        return self.entries.get((start_iso, end_iso))
+
+    def set(
+        self,
+        start_iso: str,
+        end_iso: str,
+        rows: list[dict],
+        generation: int
+    ) -> None:
+        """Guarda el listado si no hubo escrituras desde `generation`."""
+        if generation != self._generation:
+            return
+
+        key = (start_iso, end_iso)
+        self.entries.set(key, rows)
+        self._bounds[key] = (_parse_time(start_iso), _parse_time(end_iso))
+        for row in rows:
+            self._by_id.setdefault(row["id"], set()).add(key)
+        self._prune()
+
+    def invalidate(self, *, id: str = None, at: datetime | str = None) -> None:
+        """Descarta los listados que incluyen `id` o cuyo rango contiene `at`."""
+        self._generation += 1
+        keys = set(self._by_id.get(id, ())) if id else set()
+        if at is not None:
+            at = _parse_time(at)
+            keys.update(
+                key for key, (start, end) in self._bounds.items()
+                if start <= at <= end
+            )
+        for key in keys:
+            self._drop(key)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self.invalidations += len(self._bounds)
+        self.entries.clear()
+        self._bounds.clear()
+        self._by_id.clear()
+
+    def stats(self) -> dict:
+        return {**self.entries.stats(), "invalidations": self.invalidations}
+
+    def _drop(self, key: tuple[str, str]) -> None:
+        if self._bounds.pop(key, None) is None:
+            return
+        self.entries.delete(key)
+        self.invalidations += 1
+        for id in [id for id, keys in self._by_id.items() if key in keys]:
+            keys = self._by_id[id]
+            keys.discard(key)
+            if not keys:
+                del self._by_id[id]
+
+    def _prune(self) -> None:
+        # Quita las referencias de los listados que el LRU ya descartó
+        evicted = [key for key in self._bounds if self.entries.peek(key) is None]
+        if not evicted:
+            return
+        for key in evicted:
+            del self._bounds[key]
+        for id in list(self._by_id):
+            self._by_id[id].difference_update(evicted)
+            if not self._by_id[id]:
+                del self._by_id[id]
@@ -0,0 +1,58 @@
+import base64
+import json
+from typing import AsyncIterator, Optional
+
+# Para los endpoints que devuelven una lista y no pueden sumar `next_cursor` al cuerpo
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(value: str, id: str) -> str:
+    """Cursor opaco con el valor de orden y el id de la última fila de la página."""
+    raw = json.dumps([value, id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """
+    Inverso de `encode_cursor`.
+
+    Raises:
+        ValueError: Si el cursor no es válido.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, id = json.loads(raw)
+    except Exception as e:
+        raise ValueError("Cursor inválido") from e
+    # Los valores van entre comillas en el filtro de PostgREST
+    for part in (value, id):
+        if not isinstance(part, str) or '"' in part or "\\" in part:
+            raise ValueError("Cursor inválido")
+    return value, id
+
+
+def after_cursor(column: str, cursor: str, desc: bool = False) -> str:
+    """
+    Filtro de PostgREST (para `or_`) que deja solo las filas posteriores al cursor.
+
+    Compara por (`column`, id), que es el orden de la paginación; con un
+    índice sobre esas columnas la página N cuesta lo mismo que la primera,
+    a diferencia de `offset`.
+    """
+    value, id = decode_cursor(cursor)
+    op = "lt" if desc else "gt"
+    return f'{column}.{op}."{value}",and({column}.eq."{value}",id.{op}."{id}")'
+
+
+def next_cursor(rows: list[dict], key: str, limit: Optional[int]) -> Optional[str]:
+    """Cursor de la página siguiente, o None si esta fue la última."""
+    if not limit or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(last[key], last["id"])
+
+
+async def ndjson_lines(rows: AsyncIterator[dict]) -> AsyncIterator[str]:
+    """Una línea JSON por fila, para exportar con `StreamingResponse`."""
+    async for row in rows:
+        yield json.dumps(row, ensure_ascii=False, default=str) + "\n"
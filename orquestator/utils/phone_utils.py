@@ -0,0 +1,46 @@
+import re
+from typing import Optional
+
+# Código de país que se asume para los números cargados sin prefijo
+# internacional. Es fijo a propósito: la columna `phone_e164` la calcula
+# `normalize_phone` en migrations/003_clients_phone_search.sql con el mismo
+# valor, y si no coinciden las búsquedas por teléfono no encuentran nada.
+# Para cambiarlo hay que cambiar los dos y recalcular la columna.
+DEFAULT_COUNTRY_CODE = "54"
+
+
+def normalize_phone(phone: str, country_code: str = DEFAULT_COUNTRY_CODE) -> Optional[str]:
+    """
+    Convierte un teléfono a formato E.164 (`+<código de país><número>`).
+
+    Se descartan espacios, guiones y paréntesis. Los números que empiezan
+    con `+` o `00` ya traen el código de país; al resto se le quitan los
+    ceros iniciales y se les antepone `country_code`.
+
+    Returns:
+        Optional[str]: El teléfono normalizado, o None si no tiene dígitos.
+    """
+    if not phone:
+        return None
+
+    digits = re.sub(r"\D", "", phone)
+    if not digits:
+        return None
+
+    if phone.strip().startswith("+"):
+        return f"+{digits}"
+    if digits.startswith("00"):
+        return f"+{digits[2:]}"
+    return f"+{country_code}{digits.lstrip('0')}"
+
+
+def phone_digits(term: str) -> Optional[str]:
+    """
+    Dígitos de un término de búsqueda si parece un teléfono (o parte de uno).
+
+    Returns:
+        Optional[str]: Solo los dígitos, o None si el término tiene letras.
+    """
+    if not re.fullmatch(r"[\d\s()+.-]+", term or ""):
+        return None
+    return re.sub(r"\D", "", term) or None
@@ -0,0 +1,75 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import Request
+
+# Contador de consultas a Supabase del request en curso. Es una lista para
+# que las tareas de asyncio.gather (que copian el contexto) sumen en el mismo
+_round_trips: ContextVar[Optional[list[int]]] = ContextVar("round_trips", default=None)
+
+
+def count_round_trip() -> None:
+    """Suma una consulta a Supabase al request en curso, si hay uno."""
+    counter = _round_trips.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+class EndpointStats:
+    """
+    Latencia y cantidad de consultas a Supabase por endpoint.
+
+    Sirve para ver el camino crítico de cada endpoint: con consultas en
+    paralelo la latencia baja aunque la cantidad de consultas sea la misma.
+    """
+
+    def __init__(self):
+        self._endpoints: dict[str, dict] = {}
+
+    def record(self, endpoint: str, elapsed_ms: float, round_trips: int) -> None:
+        stats = self._endpoints.setdefault(endpoint, {
+            "requests": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+            "round_trips": 0,
+        })
+        stats["requests"] += 1
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+        stats["round_trips"] += round_trips
+        stats["last_ms"] = elapsed_ms
+        stats["last_round_trips"] = round_trips
+
+    def report(self) -> dict:
+        return {
+            endpoint: {
+                "requests": stats["requests"],
+                "avg_ms": round(stats["total_ms"] / stats["requests"], 1),
+                "max_ms": round(stats["max_ms"], 1),
+                "last_ms": round(stats["last_ms"], 1),
+                "avg_round_trips": round(stats["round_trips"] / stats["requests"], 2),
+                "last_round_trips": stats["last_round_trips"],
+            }
+            for endpoint, stats in sorted(self._endpoints.items())
+        }
+
+
+endpoint_stats = EndpointStats()
+
+
+async def request_stats_middleware(request: Request, call_next):
+    """Mide cada request y cuenta sus consultas a Supabase."""
+    counter = [0]
+    token = _round_trips.set(counter)
+    started = time.perf_counter()
+    try:
+        return await call_next(request)
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        _round_trips.reset(token)
+
+        # Las rutas inexistentes se agrupan para no crear una entrada por URL
+        route = request.scope.get("route")
+        path = route.path if route else "<sin ruta>"
+        endpoint_stats.record(f"{request.method} {path}", elapsed_ms, counter[0])
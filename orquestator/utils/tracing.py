@@ -0,0 +1,346 @@
+# Cada servicio tiene su copia (como date_utils): se despliegan por separado
+# y no comparten paquete. El orquestador recibe la traza del agente y mide
+# Supabase y Google; no deriva trace ids de un call_sid.
+import asyncio
+import functools
+import json
+import re
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+
+import httpx
+from fastapi import Request
+
+# Cabeceras con las que se propaga la traza entre servicios (W3C y simple)
+TRACEPARENT_HEADER = "traceparent"
+TRACE_ID_HEADER = "X-Trace-Id"
+
+_trace_id: ContextVar[Optional[str]] = ContextVar("trace_id", default=None)
+_span_id: ContextVar[Optional[str]] = ContextVar("span_id", default=None)
+
+# Spans terminados: los últimos para consultar por traza y los pendientes de exportar
+_recent: deque = deque(maxlen=10_000)
+_pending: deque = deque(maxlen=50_000)
+_dropped = 0
+_exporting = False
+_lock = threading.Lock()
+_listeners: list[Callable[[dict], None]] = []
+
+
+def trace_headers() -> dict:
+    """Cabeceras para propagar la traza actual en un request saliente."""
+    trace_id = _trace_id.get()
+    if not trace_id:
+        return {}
+    span_id = _span_id.get() or secrets.token_hex(8)
+    return {
+        TRACEPARENT_HEADER: f"00-{trace_id}-{span_id}-01",
+        TRACE_ID_HEADER: trace_id,
+    }
+
+
+def _parse_traceparent(value: str) -> tuple[Optional[str], Optional[str]]:
+    parts = value.split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None, None
+    return parts[1], parts[2]
+
+
+@contextmanager
+def start_trace(trace_id: str = None, parent_span_id: str = None) -> Iterator[str]:
+    """Activa una traza para el código dentro del bloque (un request, una tarea)."""
+    trace_id = trace_id or secrets.token_hex(16)
+    trace_token = _trace_id.set(trace_id)
+    span_token = _span_id.set(parent_span_id)
+    try:
+        yield trace_id
+    finally:
+        _span_id.reset(span_token)
+        _trace_id.reset(trace_token)
+
+
+@contextmanager
+def span(name: str, activate: bool = True, **attributes) -> Iterator[dict]:
+    """
+    Mide el bloque como un span hijo del span actual.
+
+    Si no hay una traza activa no se registra nada. Con `activate=False` el
+    span no pasa a ser el actual: sirve dentro de generadores, que pueden
+    reanudarse en otro contexto. Los atributos se pueden completar desde
+    dentro del bloque con el dict que devuelve.
+    """
+    record = start_span(name, **attributes)
+    if record is None:
+        yield {}
+        return
+
+    token = _span_id.set(record["span_id"]) if activate else None
+    error = None
+    try:
+        yield record["attributes"]
+    except GeneratorExit:
+        raise
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        if token is not None:
+            _span_id.reset(token)
+        end_span(record, error)
+
+
+def start_span(name: str, **attributes) -> Optional[dict]:
+    """
+    Abre un span hijo del span actual sin activarlo; None si no hay traza.
+
+    Para medir algo que empieza y termina en callbacks distintos (por
+    ejemplo, los event hooks de httpx). Se cierra con `end_span`.
+    """
+    trace_id = _trace_id.get()
+    if trace_id is None:
+        return None
+    return {
+        "trace_id": trace_id,
+        "span_id": secrets.token_hex(8),
+        "parent_span_id": _span_id.get(),
+        "name": name,
+        "attributes": dict(attributes),
+        "start_ns": time.time_ns(),
+    }
+
+
+def end_span(record: Optional[dict], error: str = None) -> None:
+    """Cierra y registra un span abierto con `start_span`."""
+    if record is None:
+        return
+    record["error"] = error
+    record["end_ns"] = time.time_ns()
+    _record(record)
+
+
+def traced(prefix: str, **attributes):
+    """
+    Decorador que mide cada llamada a la función como un span `<prefix>.<nombre>`.
+
+    Funciona con funciones normales y con corrutinas.
+    """
+    def decorator(func):
+        name = f"{prefix}.{func.__name__}"
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, **attributes):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def add_span_listener(listener: Callable[[dict], None]) -> None:
+    """Registra una función que recibe cada span terminado (por ejemplo, métricas)."""
+    _listeners.append(listener)
+
+
+def _record(record: dict) -> None:
+    global _dropped
+    for listener in _listeners:
+        listener(record)
+    with _lock:
+        _recent.append(record)
+        if not _exporting:
+            return
+        if len(_pending) == _pending.maxlen:
+            _dropped += 1
+        _pending.append(record)
+
+
+def recent_spans(trace_id: str) -> list[dict]:
+    """Spans recientes de una traza, en orden de inicio, con su duración."""
+    with _lock:
+        spans = [record for record in _recent if record["trace_id"] == trace_id]
+    return [
+        {
+            "name": record["name"],
+            "span_id": record["span_id"],
+            "parent_span_id": record["parent_span_id"],
+            "start_ns": record["start_ns"],
+            "duration_ms": round((record["end_ns"] - record["start_ns"]) / 1_000_000, 2),
+            "attributes": record["attributes"],
+            "error": record["error"],
+        }
+        for record in sorted(spans, key=lambda record: record["start_ns"])
+    ]
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(record: dict) -> dict:
+    """Span en el formato JSON de OTLP (OpenTelemetry)."""
+    otlp = {
+        "traceId": record["trace_id"],
+        "spanId": record["span_id"],
+        "name": record["name"],
+        "kind": 1,
+        "startTimeUnixNano": str(record["start_ns"]),
+        "endTimeUnixNano": str(record["end_ns"]),
+        "attributes": [
+            {"key": key, "value": _otlp_value(value)}
+            for key, value in record["attributes"].items()
+            if value is not None
+        ],
+        "status": {"code": 2, "message": record["error"]} if record["error"] else {"code": 1},
+    }
+    if record["parent_span_id"]:
+        otlp["parentSpanId"] = record["parent_span_id"]
+    return otlp
+
+
+class SpanExporter:
+    """
+    Exporta los spans terminados en segundo plano.
+
+    Cada `flush_interval` segundos toma los spans pendientes y los escribe
+    como JSON lines en `file_path` (un span OTLP por línea) y/o los envía a
+    un collector OTLP/HTTP en `endpoint` (por ejemplo
+    `http://localhost:4318/v1/traces`). Sin destino configurado los spans
+    solo quedan en memoria para `recent_spans`.
+    """
+
+    def __init__(
+        self,
+        service_name: str,
+        file_path: str = None,
+        endpoint: str = None,
+        flush_interval: float = 5,
+    ):
+        self.service_name = service_name
+        self.file_path = file_path
+        self.endpoint = endpoint
+        self.flush_interval = flush_interval
+        self.exported = 0
+        self.failed = 0
+        self._task: Optional[asyncio.Task] = None
+        self._http: Optional[httpx.AsyncClient] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.file_path or self.endpoint)
+
+    async def start(self) -> None:
+        global _exporting
+        if self.enabled and self._task is None:
+            _exporting = True
+            if self.endpoint:
+                self._http = httpx.AsyncClient(timeout=10)
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        global _exporting
+        _exporting = False
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            await self.flush()
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "pending": len(_pending),
+            "exported": self.exported,
+            "failed": self.failed,
+            "dropped": _dropped,
+        }
+
+    async def flush(self) -> None:
+        with _lock:
+            records = list(_pending)
+            _pending.clear()
+        if not records:
+            return
+
+        spans = [_otlp_span(record) for record in records]
+        try:
+            if self.file_path:
+                await asyncio.to_thread(self._write_file, spans)
+            if self.endpoint and self._http is not None:
+                response = await self._http.post(self.endpoint, json=self._otlp_payload(spans))
+                response.raise_for_status()
+            self.exported += len(spans)
+        except Exception as e:
+            self.failed += len(spans)
+            print(f"Error exportando {len(spans)} spans: {e}")
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def _write_file(self, spans: list[dict]) -> None:
+        service = {"key": "service.name", "value": {"stringValue": self.service_name}}
+        with open(self.file_path, "a", encoding="utf-8") as f:
+            for otlp in spans:
+                line = {**otlp, "resource": {"attributes": [service]}}
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+    def _otlp_payload(self, spans: list[dict]) -> dict:
+        return {
+            "resourceSpans": [{
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": self.service_name}}
+                    ]
+                },
+                "scopeSpans": [{"scope": {"name": "sistemaai"}, "spans": spans}],
+            }]
+        }
+
+
+async def tracing_middleware(request: Request, call_next):
+    """
+    Abre una traza por request y la cierra con un span del endpoint.
+
+    El trace id sale de la cabecera `traceparent` o `X-Trace-Id` si vino de
+    otro servicio (el agente deriva el de cada llamada de su `call_sid`) y
+    si no se genera uno. Se devuelve en la cabecera `X-Trace-Id`.
+    """
+    trace_id, parent_span_id = _parse_traceparent(request.headers.get(TRACEPARENT_HEADER, ""))
+    if not trace_id:
+        header = request.headers.get(TRACE_ID_HEADER, "").lower()
+        trace_id = header if re.fullmatch(r"[0-9a-f]{32}", header) else None
+
+    with start_trace(trace_id, parent_span_id) as trace_id:
+        with span(f"{request.method} {request.url.path}") as attributes:
+            response = await call_next(request)
+            route = request.scope.get("route")
+            attributes["http.route"] = route.path if route else None
+            attributes["http.status_code"] = response.status_code
+
+    response.headers[TRACE_ID_HEADER] = trace_id
+    return response